@@ -2,26 +2,71 @@
 
 Single file so Vercel's @vercel/python adapter can route `/(.*) → app.py`.
 All routes are prefixed with /api/* to match the frontend client.
+
+`pipeline`, `sentiment` and `datasources` (pandas, numpy, lightgbm, httpx)
+are imported on first use, so a cold start that only serves /api/health or
+a cached payload never loads them. `python -m benchmarks -k startup` checks
+the import budget.
 """
 from __future__ import annotations
 import os
+import json
+import time
+import importlib
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+
+from rhymewatch import cache, metrics, __version__
+
+
+class _Lazy:
+    """Module proxy that imports `name` on first attribute access."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
 
-from rhymewatch import pipeline, sentiment, datasources, cache, __version__
+
+pipeline = _Lazy("rhymewatch.pipeline")
+sentiment = _Lazy("rhymewatch.sentiment")
+datasources = _Lazy("rhymewatch.datasources")
 
 ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "https://rhymewatch.netlify.app",
     "https://rhymewatch.vercel.app",
 ]
+SENTIMENT_BATCH_MAX = int(os.getenv("RW_SENTIMENT_BATCH_MAX", "256"))
+ANALYZE_BATCH_MAX = int(os.getenv("RW_ANALYZE_BATCH_MAX", "20"))
+ANALYZE_BATCH_CONCURRENCY = int(os.getenv("RW_ANALYZE_BATCH_CONCURRENCY", "4"))
+# (fresh, served-stale-until) TTLs, seconds; see rhymewatch.cache
+PREDICT_TTL, PREDICT_MAX_AGE = 12 * 3600, 36 * 3600
+MOVERS_TTL, MOVERS_MAX_AGE = 15 * 60, 2 * 3600
+
 extra = os.getenv("CORS_EXTRA_ORIGINS", "")
 if extra:
     ALLOWED_ORIGINS.extend([o.strip() for o in extra.split(",") if o.strip()])
 
-app = FastAPI(title="RhymeWatch API", version=__version__)
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Warm tier 1 off the request path so the first /api/sentiment after a
+    # cold start doesn't pay for download + session build + first inference.
+    if os.getenv("RW_PRELOAD_ONNX", "1") != "0" and os.getenv("ONNX_SENTIMENT_MODEL_URL"):
+        sentiment.preload()
+    yield
+
+
+app = FastAPI(title="RhymeWatch API", version=__version__, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -30,9 +75,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
 
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """Per-request stage spans → `Server-Timing` header + route histogram."""
+    if not metrics.ENABLED:
+        return await call_next(request)
+    t0 = time.perf_counter()
+    with metrics.request_scope() as spans:
+        response = await call_next(request)
+    total = time.perf_counter() - t0
+    route = request.scope.get("route")
+    metrics.observe("rw_http_request_seconds", total,
+                    route=getattr(route, "path", "unmatched"), method=request.method)
+    response.headers["Server-Timing"] = metrics.server_timing(spans, total)
+    return response
+
+
 @app.get("/")
 def root():
     return {
@@ -52,31 +114,115 @@ def health():
     return {"status": "ok", "version": __version__, "time": _now_iso()}
 
 
+@app.get("/api/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """Prometheus text exposition of this instance's histograms and counters."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+def _valid_symbol(symbol: str) -> bool:
+    return symbol.isalpha() and len(symbol) <= 6
+
+
 @app.get("/api/analyze")
 def analyze(
     symbol: str = Query(..., description="Ticker symbol"),
     days: int = Query(180, ge=7, le=365),
 ):
     symbol = symbol.upper().strip()
-    if not symbol.isalpha() or len(symbol) > 6:
+    if not _valid_symbol(symbol):
         raise HTTPException(400, "invalid ticker")
+    hit = cache.get_stale(f"rw:analyze:{symbol}:{days}")
+    if hit[1]:
+        return hit[0]  # no pipeline import on a fresh hit
     try:
-        return pipeline.analyze(symbol, days)
+        return pipeline.analyze(symbol, days, hit=hit)
     except Exception as e:
         raise HTTPException(500, f"analyze failed: {e}")
 
 
+@app.get("/api/analyze/stream")
+def analyze_stream(
+    request: Request,
+    symbol: str = Query(..., description="Ticker symbol"),
+    days: int = Query(180, ge=7, le=365),
+):
+    """`/api/analyze` delivered stage by stage: prices, news batches,
+    sentiment counts, nextDay, done. NDJSON by default; Server-Sent Events
+    when the client sends `Accept: text/event-stream`. The `Server-Timing`
+    header goes out with the first byte, so the `done` event carries the
+    whole stream's breakdown as `serverTiming`."""
+    symbol = symbol.upper().strip()
+    if not _valid_symbol(symbol):
+        raise HTTPException(400, "invalid ticker")
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    def frames():
+        t0 = time.perf_counter()
+        spans = metrics.request_spans()
+        try:
+            for ev in pipeline.analyze_stream(symbol, days):
+                if ev["event"] == "done" and spans is not None:
+                    ev = {**ev, "serverTiming": metrics.server_timing(spans, time.perf_counter() - t0)}
+                yield _frame(ev, sse)
+        except Exception as e:
+            yield _frame({"event": "error", "detail": f"analyze failed: {e}"}, sse)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _frame(event: dict, sse: bool) -> str:
+    body = json.dumps(event, default=str)
+    if sse:
+        return f"event: {event['event']}\ndata: {body}\n\n"
+    return body + "\n"
+
+
+@app.post("/api/analyze/batch")
+def analyze_batch(payload: dict):
+    """{"symbols": [...], "days": 180} → one result per symbol, in order:
+    {"symbol", "data"} or {"symbol", "error"}. At most RW_ANALYZE_BATCH_MAX
+    symbols; misses are computed RW_ANALYZE_BATCH_CONCURRENCY at a time."""
+    symbols = (payload or {}).get("symbols")
+    if not isinstance(symbols, list) or not symbols:
+        raise HTTPException(400, "symbols required")
+    if len(symbols) > ANALYZE_BATCH_MAX:
+        raise HTTPException(413, f"at most {ANALYZE_BATCH_MAX} symbols per batch")
+    days = (payload or {}).get("days", 180)
+    if not isinstance(days, int) or not 7 <= days <= 365:
+        raise HTTPException(400, "days must be an integer in [7, 365]")
+
+    names = [s.upper().strip() if isinstance(s, str) else "" for s in symbols]
+    valid = [s for s in names if _valid_symbol(s)]
+    done = pipeline.analyze_many(valid, days, ANALYZE_BATCH_CONCURRENCY) if valid else {}
+    results = []
+    for raw, symbol in zip(symbols, names):
+        if not _valid_symbol(symbol):
+            results.append({"symbol": raw, "error": "invalid ticker"})
+        elif isinstance(done[symbol], Exception):
+            results.append({"symbol": symbol, "error": f"analyze failed: {done[symbol]}"})
+        else:
+            results.append({"symbol": symbol, "data": done[symbol]})
+    return {"days": days, "results": results}
+
+
 @app.get("/api/predict/{symbol}")
 def predict(symbol: str):
     symbol = symbol.upper().strip()
-    cached = cache.get(f"rw:predict:{symbol}")
-    if cached:
-        return cached
-    data = pipeline.analyze(symbol, days=180)
-    out = {"symbol": symbol, "nextDay": data["nextDay"],
-           "generatedAt": data["generatedAt"]}
-    cache.set(f"rw:predict:{symbol}", out, ex=12 * 3600)
-    return out
+
+    def compute():
+        # Joins any in-flight /api/analyze?symbol=X&days=180 computation;
+        # a stale analyze payload would be stored as a fresh prediction.
+        data = pipeline.analyze(symbol, days=180, serve_stale=False)
+        return {"symbol": symbol, "nextDay": data["nextDay"],
+                "generatedAt": data["generatedAt"]}
+
+    return cache.get_or_compute(f"rw:predict:{symbol}", compute,
+                                ex=PREDICT_MAX_AGE, stale_after=PREDICT_TTL)
 
 
 @app.post("/api/sentiment")
@@ -90,17 +236,44 @@ def sentiment_endpoint(payload: dict):
     return result.to_dict()
 
 
-@app.get("/api/movers")
-def movers():
-    cached = cache.get("rw:movers")
-    if cached:
-        return cached
+@app.post("/api/sentiment/batch")
+def sentiment_batch(payload: dict):
+    """{"texts": [...], "escalate": false} → one result per text, in order;
+    an invalid item gets {"error"} without failing the rest. At most
+    RW_SENTIMENT_BATCH_MAX texts, classified as one batch."""
+    texts = (payload or {}).get("texts")
+    if not isinstance(texts, list) or not texts:
+        raise HTTPException(400, "texts required")
+    if len(texts) > SENTIMENT_BATCH_MAX:
+        raise HTTPException(413, f"at most {SENTIMENT_BATCH_MAX} texts per batch")
+    ok = [i for i, t in enumerate(texts) if isinstance(t, str) and t]
+    results = [{"error": "text required"} for _ in texts]
     try:
-        data = datasources.apewisdom("wallstreetbets")
+        classified = sentiment.classify_many(
+            [texts[i] for i in ok], force_escalate=bool((payload or {}).get("escalate"))
+        )
     except Exception as e:
-        raise HTTPException(502, f"apewisdom: {e}")
-    cache.set("rw:movers", data, ex=15 * 60)
-    return data
+        for i in ok:
+            results[i] = {"error": f"classification failed: {e}"}
+    else:
+        if len(ok) == len(texts):
+            return Response('{"results":' + classified.to_json() + "}",
+                            media_type="application/json")
+        for i, r in zip(ok, classified.to_dicts()):
+            results[i] = r
+    return {"results": results}
+
+
+@app.get("/api/movers")
+def movers():
+    def compute():
+        try:
+            return datasources.apewisdom("wallstreetbets")
+        except Exception as e:
+            raise HTTPException(502, f"apewisdom: {e}")
+
+    return cache.get_or_compute("rw:movers", compute,
+                                ex=MOVERS_MAX_AGE, stale_after=MOVERS_TTL)
 
 
 @app.get("/api/stocktwits/{symbol}")
@@ -165,21 +338,17 @@ def cron_recompute():
         "RW_CRON_TICKERS",
         "AAPL,MSFT,NVDA,TSLA,AMZN,GOOGL,META,AMD,JPM,XOM,JNJ,WMT",
     ).split(",")
-    updated, errors = [], []
-    for t in tickers:
-        t = t.strip().upper()
-        if not t:
-            continue
-        try:
-            data = pipeline.analyze(t, days=365)
-            cache.set(f"rw:predict:{t}",
-                      {"symbol": t, "nextDay": data["nextDay"],
-                       "generatedAt": data["generatedAt"]},
-                      ex=36 * 3600)
-            updated.append(t)
-        except Exception as e:
-            errors.append({"symbol": t, "error": str(e)})
-    return {"updated": updated, "errors": errors, "at": _now_iso()}
+    tickers = [t.strip().upper() for t in tickers if t.strip()]
+    processes = os.getenv("RW_CRON_PROCESSES")
+    result = pipeline.recompute(
+        tickers,
+        days=365,
+        concurrency=int(os.getenv("RW_CRON_CONCURRENCY", "4")),
+        timeout=float(os.getenv("RW_CRON_TIMEOUT", "120")),
+        processes=int(processes) if processes else None,
+        panel=os.getenv("RW_CRON_PANEL", "0") == "1",
+    )
+    return {**result, "at": _now_iso()}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,9 @@
+"""Offline benchmark suite for RhymeWatch's hot paths.
+
+    python -m benchmarks                 # full run, compare with baseline.json
+    python -m benchmarks --quick         # smaller inputs, fewer samples
+    python -m benchmarks -k features     # only benchmarks whose name matches
+    python -m benchmarks --save-baseline # record this run as the baseline
+
+See `run.py` for the options and the JSON layout.
+"""
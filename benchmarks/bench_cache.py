@@ -0,0 +1,86 @@
+"""`cache` against the in-process backend (no Upstash credentials)."""
+from __future__ import annotations
+import time
+
+from rhymewatch import cache
+
+from . import fixtures
+from .harness import Bench, check, suite
+
+_PAYLOAD = {"symbol": "AAPL", "priceHistory": [round(100 + i * 0.1, 4) for i in range(250)],
+            "news": [{"headline": f"headline {i}", "sentiment": "neutral"} for i in range(40)]}
+
+
+@suite
+def cache_suite(ctx):
+    keys = [f"rw:bench:{i}" for i in range(100)]
+    cache.set_many({k: _PAYLOAD for k in keys}, ex=3600)
+    yield Bench("cache.set", lambda: cache.set("rw:bench:one", _PAYLOAD, ex=3600))
+    yield Bench("cache.get.hit", lambda: cache.get(keys[0]))
+    yield Bench("cache.get.miss", lambda: cache.get("rw:bench:absent"))
+    yield Bench("cache.set_many.100", lambda: cache.set_many({k: _PAYLOAD for k in keys}, ex=3600),
+                items=len(keys), unit="key")
+    yield Bench("cache.get_many.100", lambda: cache.get_many(keys), items=len(keys), unit="key")
+    yield Bench("cache.get_or_compute.hit",
+                lambda: cache.get_or_compute(keys[0], lambda: _PAYLOAD, ex=3600))
+    cache.set("rw:bench:swr", _PAYLOAD, ex=3600, stale_after=1800)
+    yield Bench("cache.get_or_compute.swr_hit",
+                lambda: cache.get_or_compute("rw:bench:swr", lambda: _PAYLOAD,
+                                             ex=3600, stale_after=1800))
+
+
+@check
+def cache_round_trip(ctx):
+    cache.set("rw:bench:rt", _PAYLOAD, ex=60)
+    assert cache.get("rw:bench:rt") == _PAYLOAD
+    assert cache.get_many(["rw:bench:rt", "rw:bench:absent"]) == [_PAYLOAD, None]
+
+
+@check
+def swr_serves_stale_and_refreshes_once(ctx):
+    key = "rw:bench:swr-check"
+    calls = []
+
+    def compute():
+        calls.append(time.perf_counter())
+        time.sleep(0.1)
+        return {"n": len(calls)}
+
+    def get(**kw):
+        return cache.get_or_compute(key, compute, ex=30, stale_after=0.2, **kw)
+
+    assert get() == {"n": 1}
+    assert cache.get_stale(key) == ({"n": 1}, True)
+    time.sleep(0.25)
+    t0 = time.perf_counter()
+    assert [get() for _ in range(5)] == [{"n": 1}] * 5     # stale, not blocked
+    assert time.perf_counter() - t0 < 0.05
+    deadline = time.time() + 2
+    while cache._REFRESHING and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 2                                  # one refresh for five stale hits
+    assert cache.get_stale(key) == ({"n": 2}, True)
+    time.sleep(0.25)
+    assert get(serve_stale=False) == {"n": 3}               # blocks instead
+
+
+@check
+def swr_sees_other_workers_refresh(ctx):
+    """A value kept in L1 for its hard TTL must not outlive its freshness
+    marker: once that lapses, another worker's refresh in L2 wins."""
+    key = "rw:bench:swr-l2"
+    fake = fixtures.FakeUpstash()
+    real = cache._client
+    cache._client = lambda: fake
+    try:
+        cache.set(key, "V1", ex=30, stale_after=0.2)
+        assert cache.get_stale(key) == ("V1", True)
+        time.sleep(0.25)
+        assert cache.get_stale(key) == ("V1", False)
+        fake.set(key, '"V2"', ex=30)                        # worker B's refresh
+        fake.set(cache._fresh_key(key), "1", ex=30)
+        assert cache.get_stale(key) == ("V2", True)
+    finally:
+        cache._client = real
+        cache._L1.delete(key)
+        cache._L1.delete(cache._fresh_key(key))
@@ -0,0 +1,120 @@
+"""Near-duplicate headline clustering and the classification work it saves."""
+from __future__ import annotations
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+import numpy as np
+
+from rhymewatch import cache, dedup, onnx_sentiment, pipeline, sentiment
+
+from . import fixtures
+from .bench_sentiment import _tiny_model
+from .harness import Bench, Skip, check, suite
+
+_SOURCES = ("Reuters", "Yahoo Finance", "MarketWatch", "The Motley Fool", "CNBC", "Benzinga")
+_STORIES = [
+    "{t} beats earnings, raises full-year guidance",
+    "{t} shares slide after revenue miss",
+    "{t} announces $10 billion buyback",
+    "Analysts cut {t} price target on weak demand",
+    "{t} CEO to step down at year end",
+    "{t} recalls 2 million units over safety concerns",
+]
+
+
+def syndicated(n: int, seed: int = 0) -> List[Tuple[str, datetime]]:
+    """`n` headlines where each story is re-published with source suffixes,
+    casing and punctuation changes, mixed with unique WSB posts."""
+    rng = np.random.default_rng(seed)
+    now = datetime.now(timezone.utc)
+    posts = fixtures.wsb_corpus(n, seed=seed)
+    out = []
+    for i in range(n):
+        if rng.random() < 0.6:
+            t = fixtures.TICKERS[int(rng.integers(3))]
+            title = _STORIES[int(rng.integers(len(_STORIES)))].format(t=t)
+            if rng.random() < 0.3:
+                title = title.title()
+            if rng.random() < 0.3:
+                title = title.replace(",", "").replace("$", "USD ")
+            title = f"{title} - {_SOURCES[int(rng.integers(len(_SOURCES)))]}"
+        else:
+            title = posts[i]
+        out.append((title, now - timedelta(minutes=30 * i)))
+    return out
+
+
+@suite
+def dedup_suite(ctx):
+    headlines = syndicated(200 if ctx.quick else 1000)
+    titles = [t for t, _ in headlines]
+    yield Bench("dedup.cluster", lambda: dedup.cluster(titles), items=len(titles), unit="headline")
+    try:
+        onnx_sentiment.ONNXSentiment._instance = _tiny_model(ctx)
+    except Skip:
+        print("  (tier 1 unavailable: classification is lexicon-only)")
+
+    def every_headline():
+        cache._L1.clear()
+        return sentiment.classify_many(titles)
+
+    def clustered():
+        cache._L1.clear()
+        return pipeline._classify_headlines(headlines)
+
+    yield Bench("dedup.classify.every_headline", every_headline, items=len(titles), unit="headline")
+    yield Bench("dedup.classify.clustered", clustered, items=len(titles), unit="headline")
+
+
+@check
+def dedup_merges_syndicated_variants(ctx):
+    titles = [
+        "Apple beats earnings, raises guidance - Reuters",
+        "Apple Beats Earnings; Raises Guidance | Yahoo Finance",
+        "Apple beats earnings and raises guidance",
+        "Tesla recalls 2 million vehicles over Autopilot concerns",
+        "Tesla recalls 2 million vehicles over autopilot concerns - CNBC",
+    ]
+    assert dedup.cluster(titles).tolist() == [0, 0, 0, 3, 3]
+
+
+@check
+def dedup_keeps_distinct_stories_apart(ctx):
+    pairs = [
+        ("Apple shares up 3% after earnings", "Apple shares down 3% after earnings"),
+        ("NVDA beats earnings, raises guidance", "AMD beats earnings, raises guidance"),
+        ("Tesla deliveries beat estimates", "Tesla deliveries miss estimates"),
+    ]
+    for a, b in pairs:
+        assert dedup.cluster([a, b]).tolist() == [0, 1], (a, b)
+
+
+@check
+def dedup_keeps_non_source_suffixes(ctx):
+    # a title-cased clause after " - " is part of the story, not a publisher
+    pairs = [
+        ("Tesla Q3 results - Deliveries Beat Estimates", "Tesla Q3 results - Margins Disappoint"),
+        ("Stocks rally - Dow Jones Jumps 500 Points", "Stocks rally - Nasdaq Slides On Chip Selloff"),
+    ]
+    for a, b in pairs:
+        assert dedup.cluster([a, b]).tolist() == [0, 1], (a, b)
+    assert dedup.normalize("Fed holds rates - finance.yahoo.com") == "fed holds rates"
+
+
+@check
+def dedup_merges_case_variants(ctx):
+    pairs = [
+        ("APPLE BEATS EARNINGS", "Apple beats earnings"),
+        ("NVDA beats earnings, raises guidance", "Nvda Beats Earnings, Raises Guidance"),
+        ("NVDA beats earnings, raises guidance - CNBC", "NVDA beats earnings, raises guidance - Reuters"),
+    ]
+    for a, b in pairs:
+        assert dedup.cluster([a, b]).tolist() == [0, 0], (a, b)
+
+
+@check
+def dedup_cluster_invariants(ctx):
+    ids = dedup.cluster([t for t, _ in syndicated(500, seed=5)])
+    assert (ids <= np.arange(len(ids))).all()
+    assert (ids[ids] == ids).all()      # every id names a representative
+    assert len(dedup.representatives(ids)) < len(ids)
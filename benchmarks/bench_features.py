@@ -0,0 +1,128 @@
+"""Feature construction: batch `build_features`, `IncrementalFeatures` and the
+per-ticker engines `for_symbol` keeps."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from rhymewatch import features
+
+from . import fixtures
+from .harness import Bench, Skip, check, suite
+
+_BARS_PER_YEAR = 252
+
+
+@suite
+def build_features_suite(ctx):
+    years = (1, 2) if ctx.quick else (1, 2, 5, 10)
+    paths = [("fallback", False)]
+    if features._HAS_TA:
+        paths.insert(0, ("pandas_ta", True))
+    for y in years:
+        n = y * _BARS_PER_YEAR
+        df = fixtures.ohlcv(n)
+        vix = fixtures.vix(n)
+        for label, use_ta in paths:
+            yield Bench(f"features.build_features.{label}.{y}y",
+                        lambda df=df, vix=vix, use_ta=use_ta:
+                            features.build_features(df, vix=vix, use_ta=use_ta),
+                        items=n, unit="bar")
+    if not features._HAS_TA:
+        print("  (pandas_ta not installed: only the fallback path was timed)")
+
+
+@suite
+def incremental_suite(ctx):
+    n = 5 * _BARS_PER_YEAR
+    df = fixtures.ohlcv(n)
+    vix = fixtures.vix(n)
+    yield Bench("features.incremental.from_history.5y",
+                lambda: features.IncrementalFeatures.from_history(df, vix=vix),
+                items=n, unit="bar")
+
+    engine = features.IncrementalFeatures.from_history(df, vix=vix)
+    rng = np.random.default_rng(7)
+    state = {"close": float(df["Close"].iloc[-1]), "date": df.index[-1], "vix": 20.0}
+
+    def one_bar():
+        c = state["close"] * float(np.exp(rng.normal(0, 0.015)))
+        state["close"] = c
+        state["date"] = state["date"] + pd.Timedelta(days=1)
+        engine.update(state["date"], c, c * 1.01, c * 0.99, c, 5e6, vix=state["vix"])
+
+    yield Bench("features.incremental.update", one_bar, unit="bar")
+
+
+@suite
+def for_symbol_suite(ctx):
+    if features._HAS_TA:
+        raise Skip("pandas_ta installed: for_symbol takes the batch path")
+    n = _BARS_PER_YEAR
+    df = fixtures.ohlcv(n)
+    vix = fixtures.vix(n)
+
+    def cold():
+        features._KEPT.clear()
+        return features.for_symbol("RWF", df, vix)
+
+    tick = {"i": 0}
+
+    def intraday():
+        # the same window, only today's (last) bar moved: one row is scored
+        tick["i"] += 1
+        moved = df.copy()
+        moved.iloc[-1, moved.columns.get_loc("Close")] *= 1 + 1e-4 * (tick["i"] % 7)
+        return features.for_symbol("RWF", moved, vix)
+
+    yield Bench("features.for_symbol.cold.1y", cold, items=n, unit="bar")
+    features.for_symbol("RWF", df, vix)
+    yield Bench("features.for_symbol.intraday.1y", intraday, items=n, unit="bar")
+
+
+@check
+def incremental_matches_batch(ctx):
+    """`IncrementalFeatures` must reproduce `build_features(use_ta=False)`."""
+    n = 3 * _BARS_PER_YEAR
+    df = fixtures.ohlcv(n, seed=11)
+    df.iloc[100:130, df.columns.get_loc("Volume")] = 5e6  # zero-variance window
+    rng = np.random.default_rng(12)
+    idx = df.index
+    kwargs = dict(
+        vix=fixtures.vix(n).iloc[::2],
+        sector_series=pd.Series(50 * np.exp(np.cumsum(rng.normal(0, 0.01, n))),
+                                index=idx).drop(idx[300:305]),
+        news_velocity=pd.Series(rng.poisson(3, n).astype(float), index=idx)[rng.random(n) > 0.1],
+        event_flags=features.event_flags_for(idx),
+    )
+    for kw in ({}, kwargs):
+        batch = features.build_features(df, use_ta=False, **kw)
+        inc = features.IncrementalFeatures.from_history(df, **kw).frame()
+        pd.testing.assert_frame_equal(batch.astype(float), inc, check_exact=False,
+                                      rtol=1e-9, atol=1e-9, check_freq=False)
+
+
+@check
+def for_symbol_matches_batch(ctx):
+    """The engines `for_symbol` keeps and extends must keep matching the
+    batch output as bars arrive, today's bar moves and history is revised."""
+    if features._HAS_TA:
+        raise Skip("pandas_ta installed: for_symbol takes the batch path")
+    n = 2 * _BARS_PER_YEAR
+    full = fixtures.ohlcv(n, seed=5)
+    vix = fixtures.vix(n).iloc[::3]
+    features._KEPT.clear()
+    moved = full.iloc[:n - 4].copy()
+    moved.iloc[-1, moved.columns.get_loc("Close")] *= 1.02
+    split = full.copy()
+    split[["Open", "High", "Low", "Close"]] /= 4
+    engines = []
+    for df in (full.iloc[:n - 4], moved, full.iloc[:n - 3], full, full, split, full.iloc[10:]):
+        inc = features.for_symbol("RWF", df, vix)
+        pd.testing.assert_frame_equal(features.build_features(df, vix=vix), inc, check_exact=False,
+                                      rtol=1e-9, atol=1e-9, check_freq=False)
+        key = ("RWF", int(df.index.asi8[0]), True)
+        engines.append(features._KEPT[key][0])
+    # appended / re-scored on one engine; a split rebuilds it; a later window has its own
+    assert all(e is engines[0] for e in engines[:5]) and engines[5] is not engines[4]
+    assert len(features._KEPT) == 2
@@ -0,0 +1,149 @@
+"""Tier 2 escalation against an offline Gemini stub."""
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+
+from rhymewatch import cache, llm, sentiment
+
+from . import fixtures
+from .harness import Bench, check, suite
+
+_LATENCY = 0.02     # per request; real Flash-Lite round-trips are ~400ms
+_UNLIMITED = dict(rate=0, budget_usd=0, max_requests=0)
+
+
+@contextmanager
+def _gemini(stub, **executor):
+    """Route tier 2 to `stub` through a fresh executor built with `executor`."""
+    saved = llm._CLIENT, llm.EXECUTOR
+    llm._CLIENT = stub
+    llm.EXECUTOR = llm.EscalationExecutor(**{**_UNLIMITED, **executor})
+    try:
+        yield stub
+    finally:
+        llm.EXECUTOR.close()
+        llm._CLIENT, llm.EXECUTOR = saved
+
+
+@suite
+def escalation_suite(ctx):
+    texts = fixtures.wsb_corpus(32, seed=6)
+    with _gemini(fixtures.StubGemini(latency=_LATENCY)):
+        yield Bench("llm.escalate.per_text", lambda: [llm.escalate(t) for t in texts],
+                    items=len(texts), unit="text")
+        for size in (8, 32):
+            yield Bench(f"llm.escalate_batch.batch{size}",
+                        lambda size=size: llm.escalate_batch(texts, batch_size=size),
+                        items=len(texts), unit="text")
+    with _gemini(fixtures.StubGemini(latency=_LATENCY), concurrency=1):
+        yield Bench("llm.escalate_batch.batch8.serial",
+                    lambda: llm.escalate_batch(texts, batch_size=8),
+                    items=len(texts), unit="text")
+
+
+@check
+def escalate_batch_matches_single(ctx):
+    with _gemini(fixtures.StubGemini()) as stub:
+        texts = fixtures.wsb_corpus(40, seed=7)
+        single = [llm.escalate(t) for t in texts]
+        stub.calls.clear()
+        batched = llm.escalate_batch(texts, batch_size=16)
+        assert batched == single
+        assert len(stub.calls) == 3
+        assert llm._client() is stub
+
+
+@check
+def escalate_batch_isolates_bad_items(ctx):
+    texts = ["AAPL beats earnings", "GME to the moon 🚀 /s", "", "TSLA misses on revenue"]
+    with _gemini(fixtures.StubGemini(malformed=("moon",))):
+        out = llm.escalate_batch(texts)
+        assert out[1] is None and out[2] is None
+        assert out[0] is not None and out[3] is not None
+        assert out[0].targets == ["AAPL"] and out[0].aspect == "earnings"
+    with _gemini(fixtures.StubGemini(garbage=True)):
+        assert llm.escalate_batch(texts) == [None] * len(texts)
+
+
+@check
+def executor_bounds_concurrency(ctx):
+    texts = fixtures.wsb_corpus(24, seed=8)
+    with _gemini(fixtures.StubGemini(latency=0.02), concurrency=2) as stub:
+        out = llm.escalate_batch(texts, batch_size=2)
+        assert stub.max_in_flight <= 2 and all(out)
+        assert llm.stats()["ok"] == 12 and llm.stats()["in_flight"] == 0
+
+
+@check
+def executor_deadline_bounds_latency(ctx):
+    texts = fixtures.wsb_corpus(8, seed=9)
+    with _gemini(fixtures.StubGemini(latency=1.0), deadline=0.1, per_text=0.05):
+        t0 = time.perf_counter()
+        out = llm.escalate_batch(texts, batch_size=2)
+        assert time.perf_counter() - t0 < 0.5
+        assert out == [None] * len(texts)
+        assert llm.stats()["rejected"] == {"deadline": 4}
+
+
+@check
+def executor_deadline_scales_with_batch(ctx):
+    texts = fixtures.wsb_corpus(4, seed=9)
+    with _gemini(fixtures.StubGemini(latency=0.25), deadline=0.1, per_text=0.1):
+        assert llm.EXECUTOR.timeout(1) == 0.1 and abs(llm.EXECUTOR.timeout(16) - 1.6) < 1e-9
+        assert llm.escalate(texts[0]) is None
+        assert all(llm.escalate_batch(texts, batch_size=4))
+        assert llm.stats()["rejected"] == {"deadline": 1}
+    default = llm.EscalationExecutor.from_env()
+    assert default.timeout(llm.BATCH) >= default.deadline + 0.3 * (llm.BATCH - 1)
+
+
+@check
+def executor_rate_limit_and_budget_degrade(ctx):
+    texts = fixtures.wsb_corpus(10, seed=10)
+    with _gemini(fixtures.StubGemini(), rate=2, burst=2, deadline=0.2):
+        out = llm.escalate_batch(texts, batch_size=1)
+        assert sum(r is not None for r in out) == 2
+        assert llm.stats()["rejected"] == {"rate_limit": 8}
+    with _gemini(fixtures.StubGemini(), max_requests=3):
+        out = llm.escalate_batch(texts, batch_size=1)
+        assert sum(r is not None for r in out) == 3
+        assert llm.stats()["rejected"] == {"budget": 7}
+        cache._L1.clear()
+        batch = sentiment.classify_many(texts, force_escalate=True)
+        assert set(batch.tier.tolist()) == {1}      # budget spent: tier-1 results
+
+
+@check
+def executor_backs_off_on_429(ctx):
+    with _gemini(fixtures.StubGemini(throttle_first=1), backoff=0.05) as stub:
+        assert llm.escalate("AAPL beats earnings") is not None
+        s = llm.stats()
+        assert s["throttled"] == 1 and s["ok"] == 1 and len(stub.calls) == 2
+
+
+@check
+def executor_refunds_unused_bookings(ctx):
+    with _gemini(fixtures.StubGemini(throttle_first=2), backoff=0.05, budget_usd=1.0):
+        assert llm.escalate("AAPL beats earnings") is None      # 429, retried, 429
+        s = llm.stats()
+        assert s["throttled"] == 2 and s["window_requests"] == 0
+        assert s["window_spend_usd"] == 0
+    assert llm._rate_limited(fixtures.StubAPIError(429, "RESOURCE_EXHAUSTED", ""))
+    assert not llm._rate_limited(RuntimeError("batch 4290 failed"))
+    assert not llm._rate_limited(fixtures.StubAPIError(500, "INTERNAL", "retry after 429 ms"))
+
+
+@check
+def executor_holds_slot_past_deadline(ctx):
+    # a timed-out call keeps its thread; the next request must not get a slot
+    with _gemini(fixtures.StubGemini(latency=0.3), concurrency=1, deadline=0.1,
+                 budget_usd=1.0) as stub:
+        assert llm.escalate("AAPL beats earnings") is None
+        assert llm.escalate("TSLA misses on revenue") is None
+        assert llm.stats()["rejected"] == {"deadline": 1, "concurrency": 1}
+        assert llm.stats()["in_flight"] == 1
+        time.sleep(0.3)
+        assert stub.max_in_flight == 1 and llm.stats()["in_flight"] == 0
+        assert llm.escalate("TSLA misses on revenue") is None   # slot free again: deadline
+        assert llm.stats()["rejected"]["deadline"] == 2
+        assert len(stub.calls) == 2
@@ -0,0 +1,34 @@
+"""Overhead of a `metrics.span`, enabled and disabled."""
+from __future__ import annotations
+
+from rhymewatch import metrics
+
+from .harness import Bench, suite
+
+_N = 1000
+
+
+def _spans():
+    for _ in range(_N):
+        with metrics.span("bench"):
+            pass
+
+
+def _disabled():
+    metrics.ENABLED = False
+    try:
+        _spans()
+    finally:
+        metrics.ENABLED = True
+
+
+@suite
+def span_suite(ctx):
+    enabled = metrics.ENABLED
+    metrics.ENABLED = True
+    try:
+        yield Bench("metrics.span.enabled", _spans, items=_N, unit="span")
+        yield Bench("metrics.span.disabled", _disabled, items=_N, unit="span")
+    finally:
+        metrics.ENABLED = enabled
+        metrics.reset()
@@ -0,0 +1,213 @@
+"""End-to-end `pipeline.analyze` on stubbed prices and headlines."""
+from __future__ import annotations
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from rhymewatch import cache, features, metrics, onnx_sentiment, pipeline, prices, registry
+
+from . import fixtures
+from .bench_sentiment import _tiny_model
+from .harness import Bench, Skip, check, suite
+
+
+def _reset(models: bool):
+    cache._L1.clear()
+    if models:
+        shutil.rmtree(registry._DIR, ignore_errors=True)
+        registry._LOADED.clear()
+
+
+@suite
+def analyze_suite(ctx):
+    fixtures.stub_sources()
+    try:
+        onnx_sentiment.ONNXSentiment._instance = _tiny_model(ctx)
+    except Skip:
+        print("  (tier 1 unavailable: analyze runs lexicon-only sentiment)")
+    days = 365 if ctx.quick else 730
+
+    def cold():
+        _reset(models=True)
+        return pipeline.analyze("AAPL", days)
+
+    def stored_model():
+        _reset(models=False)
+        return pipeline.analyze("AAPL", days)
+
+    yield Bench("pipeline.analyze.cold", cold)
+    yield Bench("pipeline.analyze.stored_model", stored_model)
+    pipeline.analyze("AAPL", days)
+    yield Bench("pipeline.analyze.cached", lambda: pipeline.analyze("AAPL", days))
+
+
+@check
+def stream_news_matches_analyze(ctx):
+    fixtures.stub_sources()
+    _reset(models=True)
+    streamed = [item for event in pipeline.analyze_stream("MSFT", 365, batch=7)
+                if event["event"] == "news" for item in event["items"]]
+    _reset(models=False)
+    payload = pipeline.analyze("MSFT", 365)
+
+    def strip(items):
+        return [{k: v for k, v in item.items() if k != "date"} for item in items]
+
+    assert strip(streamed) == strip(payload["news"])
+    assert any(item["duplicates"] for item in payload["news"])
+
+
+@check
+def analyze_route_looks_up_once(ctx):
+    if not metrics.ENABLED:
+        raise Skip("RW_METRICS=0")
+    import app
+    fixtures.stub_sources()
+    cache.set("rw:analyze:RWSWR:30", {"symbol": "RWSWR"}, ex=60, stale_after=0.05)
+    time.sleep(0.1)
+    before = metrics.value("rw_cache_swr_total", result="stale")
+    assert app.analyze(symbol="RWSWR", days=30) == {"symbol": "RWSWR"}
+    assert metrics.value("rw_cache_swr_total", result="stale") - before == 1
+
+
+@check
+def stale_registry_model_is_retrained(ctx):
+    _reset(models=True)
+    hist = fixtures.ohlcv(400, seed=11)
+    pipeline._train(hist.iloc[:-1], None, "RWREG", 400)
+    stored = registry.load("RWREG", 400).data_hash
+    pipeline._train(hist, None, "RWREG", 400)       # new bar, young model: rescored
+    assert registry.load("RWREG", 400).data_hash == stored
+    max_age, registry.MAX_AGE = registry.MAX_AGE, 0
+    try:
+        pipeline._train(hist, None, "RWREG", 400)   # data changed, model too old
+    finally:
+        registry.MAX_AGE = max_age
+    assert registry.load("RWREG", 400).data_hash != stored
+
+
+@check
+def registry_keeps_one_model_per_window(ctx):
+    _reset(models=True)
+    hist = fixtures.ohlcv(400, seed=11)
+    long = pipeline._train(hist, None, "RWWIN", 365, True)      # the cron's window
+    short = pipeline._train(hist.iloc[-180:], None, "RWWIN", 180)
+    kept = registry.load("RWWIN", 365)
+    assert kept is not None and kept.days == 365
+    assert registry.load("RWWIN", 180).data_hash != kept.data_hash
+    assert pipeline._train(hist, None, "RWWIN", 365, True) == long   # unchanged: rescored
+    assert registry.load("RWWIN", 365).data_hash == kept.data_hash
+    assert short is not None
+
+
+@check
+def stream_coalesces_with_analyze(ctx):
+    fixtures.stub_sources()
+    _reset(models=False)
+    ohlcv, calls = pipeline._ohlcv, []
+
+    def slow_ohlcv(symbol, days):
+        calls.append(symbol)
+        time.sleep(0.2)
+        return ohlcv(symbol, days)
+
+    pipeline._ohlcv = slow_ohlcv
+    try:
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            streams = [pool.submit(lambda: list(pipeline.analyze_stream("NVDA", 365)))
+                       for _ in range(2)]
+            time.sleep(0.05)
+            payload = pool.submit(pipeline.analyze, "NVDA", 365).result()
+            events = [f.result() for f in streams]
+    finally:
+        pipeline._ohlcv = ohlcv
+    assert calls == ["NVDA"], calls
+    for ev in events:
+        assert [e["event"] for e in ev][-1] == "done"
+        assert next(e for e in ev if e["event"] == "nextDay")["nextDay"] == payload["nextDay"]
+
+
+@check
+def price_store_readers_share_lock(ctx):
+    sym = "RWPX"
+    bars = fixtures.ohlcv(30, seed=3)
+    day = pd.DatetimeIndex(bars.index).values.astype("datetime64[D]").astype(np.int64)
+    day = day - day[-1] + prices._today()
+    prices._DIR.mkdir(parents=True, exist_ok=True)
+    prices._write(sym, np.vstack([day.astype(np.float64)] + [bars[c].to_numpy() for c in prices.COLUMNS]))
+    with prices._lock(sym, shared=True), ThreadPoolExecutor(max_workers=1) as pool:
+        # a current series is read under a shared lock: no wait on this reader
+        assert pool.submit(prices.refresh, sym, 20).result(timeout=2).shape == (6, 30)
+
+
+@check
+def yfinance_fallback_aligns_with_vix(ctx):
+    hist = fixtures.ohlcv(300, seed=1)
+    aware = hist.copy()
+    aware.index = pd.DatetimeIndex(hist.index).tz_localize("America/New_York")
+    vix = fixtures.vix(300)
+    expected = features.build_features(hist, vix=vix, use_ta=False)
+    assert features.build_features(prices.naive(aware), vix=vix, use_ta=False).equals(expected)
+    assert prices.naive(aware["Close"]).index.equals(prices.naive(vix).index)
+
+
+@check
+def price_store_refreshes_incrementally(ctx):
+    """A recent listing and a live (intraday) last bar are appended to and
+    replaced in place; only a re-adjusted history is downloaded in full."""
+    sym = "RWIPO"
+    bars = fixtures.ohlcv(30, seed=4)
+    day = pd.DatetimeIndex(bars.index).values.astype("datetime64[D]").astype(np.int64)
+    upstream = {"bars": np.vstack([(day - day[-1] + prices._today()).astype(np.float64)]
+                                  + [bars[c].to_numpy() for c in prices.COLUMNS])}
+    full = []
+
+    def download(symbol, start=None, days=None):
+        arr = upstream["bars"]
+        if start is None:
+            full.append(days)
+            return arr[:, arr[0] >= prices._today() - days]
+        return arr[:, arr[0] >= (start - date(1970, 1, 1)).days]
+
+    real = prices._download, prices._REFRESH
+    prices._download, prices._REFRESH = download, 0
+    try:
+        assert prices.refresh(sym, 365).shape == (6, 30) and full == [365]
+        for move in (1.01, 0.99, 1.02):                  # today's bar keeps moving
+            upstream["bars"] = upstream["bars"].copy()
+            upstream["bars"][4, -1] *= move
+            assert prices.refresh(sym, 365)[4, -1] == upstream["bars"][4, -1]
+        assert full == [365]
+        upstream["bars"] = upstream["bars"].copy()
+        upstream["bars"][1:5] /= 2                       # a 2:1 split re-adjusts history
+        assert np.array_equal(prices.refresh(sym, 365), upstream["bars"]) and len(full) == 2
+    finally:
+        prices._download, prices._REFRESH = real
+
+
+@check
+def cron_pool_survives_held_locks(ctx):
+    """Training workers start while other threads may hold `metrics._LOCK`;
+    a forked worker would inherit it held and hang on its first metric."""
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with metrics._LOCK:
+            held.set()
+            release.wait(60)
+
+    threading.Thread(target=hold, daemon=True).start()
+    held.wait()
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=pipeline._mp_context())
+    try:
+        assert pool.submit(metrics.value, "rw_check_total").result(timeout=60) == 0
+    finally:
+        release.set()
+        for proc in list(getattr(pool, "_processes", {}).values()):
+            proc.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,150 @@
+"""Tier 0 lexicon and tier 1 ONNX classification, columnar results."""
+from __future__ import annotations
+import json
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from rhymewatch import lexicon, sentiment
+
+from . import fixtures
+from .harness import Bench, Skip, check, suite
+
+_ONNX = {}
+
+
+def _tiny_model(ctx):
+    if "inst" not in _ONNX:
+        d = ctx.workdir / "onnx"
+        d.mkdir(exist_ok=True)
+        _ONNX["inst"] = fixtures.tiny_onnx_sentiment(d)
+    if _ONNX["inst"] is None:
+        raise Skip("onnx / onnxruntime / tokenizers not installed")
+    return _ONNX["inst"]
+
+
+@suite
+def lexicon_suite(ctx):
+    corpus = fixtures.wsb_corpus(1000 if ctx.quick else 5000)
+    yield Bench("lexicon.lexicon_score", lambda: [lexicon.lexicon_score(t) for t in corpus],
+                items=len(corpus), unit="text")
+    yield Bench("lexicon.lexicon_score_batch", lambda: lexicon.lexicon_score_batch(corpus),
+                items=len(corpus), unit="text")
+
+
+@suite
+def onnx_suite(ctx):
+    model = _tiny_model(ctx)
+    corpus = fixtures.wsb_corpus(256 if ctx.quick else 1024, seed=1)
+    for size in (1, 8, 32, 128):
+        yield Bench(f"onnx.classify.batch{size}",
+                    lambda size=size: model.classify(corpus, max_batch_size=size),
+                    items=len(corpus), unit="text")
+
+
+def _results(n: int) -> sentiment.SentimentBatch:
+    """`n` lexicon-tier results with a sprinkling of tier-2 side-table rows."""
+    scored = lexicon.lexicon_score_batch(fixtures.wsb_corpus(n, seed=4))
+    batch = sentiment.SentimentBatch(scored.label % 3, scored.score,
+                                     np.zeros(n, dtype=np.int8))
+    for i in range(0, n, 50):
+        batch.tier[i] = 2
+        batch._set_extras(i, "earnings", [fixtures.TICKERS[i % len(fixtures.TICKERS)]], i % 100 == 0)
+    return batch
+
+
+@suite
+def results_suite(ctx):
+    batch = _results(10_000 if ctx.quick else 50_000)
+    objects = list(batch)
+    n = len(batch)
+    yield Bench("sentiment.counts.objects",
+                lambda: _loop_counts(objects),
+                items=n, unit="result")
+    yield Bench("sentiment.counts.batch", batch.counts, items=n, unit="result")
+    yield Bench("sentiment.json.objects",
+                lambda: json.dumps([r.to_dict() for r in objects], separators=(",", ":")),
+                items=n, unit="result")
+    yield Bench("sentiment.json.batch", batch.to_json, items=n, unit="result")
+    now = datetime(2026, 1, 5)
+    dates = [now - timedelta(minutes=7 * i) for i in range(n)]
+    yield Bench("sentiment.by_date.batch", lambda: batch.by_date(dates), items=n, unit="result")
+
+
+def _loop_counts(results) -> dict:
+    c = {"positive": 0, "neutral": 0, "negative": 0, "escalations": 0}
+    for r in results:
+        c[r.label] += 1
+        if r.tier == 2:
+            c["escalations"] += 1
+    return c
+
+
+@check
+def sentiment_batch_matches_results(ctx):
+    batch = _results(2000)
+    objects = list(batch)
+    again = sentiment.SentimentBatch.from_results(objects)
+    assert again.to_dicts() == batch.to_dicts() == [r.to_dict() for r in objects]
+    assert batch.to_json() == json.dumps(batch.to_dicts(), separators=(",", ":"))
+    assert batch.counts() == _loop_counts(objects)
+    rows = np.array([5, 0, 50, 50, 1999])
+    assert batch.take(rows).to_dicts() == [objects[i].to_dict() for i in rows]
+    halves = sentiment.SentimentBatch.concat([batch.take(np.arange(1000)),
+                                              batch.take(np.arange(1000, 2000))])
+    assert halves.to_dicts() == batch.to_dicts()
+    days = [datetime(2026, 1, 1) + timedelta(days=i % 3) for i in range(len(batch))]
+    per_day = batch.by_date(days)
+    assert sum(d["n"] for d in per_day) == len(batch)
+    for d in per_day:
+        rows = [r for r, day in zip(objects, days) if day.date().isoformat() == d["date"]]
+        assert {k: d[k] for k in ("positive", "neutral", "negative", "escalations")} == _loop_counts(rows)
+
+
+@check
+def lexicon_batch_matches_single(ctx):
+    corpus = fixtures.wsb_corpus(500, seed=2)
+    batch = lexicon.lexicon_score_batch(corpus)
+    for i, text in enumerate(corpus):
+        assert batch.result(i) == lexicon.lexicon_score(text), text
+
+
+@check
+def onnx_bucketing_matches_unbatched(ctx):
+    model = _tiny_model(ctx)
+    corpus = fixtures.wsb_corpus(200, seed=3)
+    one = model.classify(corpus, max_batch_size=1)
+    many = model.classify(corpus, max_batch_size=32)
+    assert [r.label for r in one] == [r.label for r in many]
+    assert np.allclose([r.score for r in one], [r.score for r in many], atol=1e-5)
+
+
+@check
+def onnx_load_publishes_session_last(ctx):
+    """`load` skips the lock once `session` is set, so a request racing the
+    startup preload must never see a session without its tokenizer."""
+    from rhymewatch import onnx_sentiment as onx
+    _tiny_model(ctx)
+    d = ctx.workdir / "onnx"
+
+    class Spy(onx.ONNXSentiment):
+        def __setattr__(self, name, value):
+            if name == "session" and value is not None:
+                assert self.tokenizer is not None and self.input_names, "half-initialised model"
+            super().__setattr__(name, value)
+
+    env = {"ONNX_SENTIMENT_MODEL_URL": (d / "model.onnx").as_uri(),
+           "ONNX_SENTIMENT_TOKENIZER_URL": (d / "tokenizer.json").as_uri()}
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        spy = Spy()
+        spy.load(warmup=True)
+        assert spy.classify(["stocks only go up"])[0].label in ("positive", "negative", "neutral")
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
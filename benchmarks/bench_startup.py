@@ -0,0 +1,16 @@
+"""Cold start of the serverless entry point (fresh interpreter per sample)."""
+from __future__ import annotations
+
+from . import startup
+from .harness import Bench, check, suite
+
+
+@suite
+def startup_suite(ctx):
+    yield Bench("startup.import_app", lambda: startup.probe())
+
+
+@check
+def startup_import_budget(ctx):
+    problems = startup.violations(startup.probe())
+    assert not problems, "; ".join(problems)
@@ -0,0 +1,58 @@
+"""Walk-forward cross-validation, LightGBM and ridge fallback."""
+from __future__ import annotations
+
+import numpy as np
+
+from rhymewatch import features, predictor, validation
+
+from . import fixtures
+from .harness import Bench, Skip, check, suite
+
+# the per-ticker endpoint's settings (`predictor.train_and_report`)
+_CV = dict(initial=250, step=21, embargo=5)
+
+
+def _matrix(years: int):
+    feat = features.build_features(fixtures.ohlcv(years * 252, seed=5), use_ta=False)
+    cols = [c for c in feat.columns if c != "y_logret"]
+    return feat[cols].to_numpy(dtype=np.float64), feat["y_logret"].to_numpy(dtype=np.float64)
+
+
+@suite
+def cross_validate_suite(ctx):
+    X, y = _matrix(2 if ctx.quick else 4)
+    n_folds = len(validation.fold_slices(len(y), **_CV))
+    yield Bench("validation.cross_validate.ridge",
+                lambda: validation.cross_validate(X, y, predictor._fallback_fit_predict,
+                                                  workers=1, **_CV),
+                items=n_folds, unit="fold")
+    if not predictor._HAS_LGBM:
+        raise Skip("lightgbm not installed")
+    yield Bench("validation.cross_validate.lightgbm",
+                lambda: validation.cross_validate(X, y, predictor.fit_predict,
+                                                  workers=1, **_CV),
+                items=n_folds, unit="fold")
+    yield Bench("predictor.BinnedFolds.cross_validate",
+                lambda: predictor.BinnedFolds(X, y).cross_validate(workers=1, **_CV),
+                items=n_folds, unit="fold")
+
+
+@check
+def parallel_folds_match_serial(ctx):
+    X, y = _matrix(2)
+    serial = validation.cross_validate(X, y, predictor._fallback_fit_predict, workers=1, **_CV)
+    pooled = validation.cross_validate(X, y, predictor._fallback_fit_predict, workers=4, **_CV)
+    assert serial == pooled, (serial, pooled)
+
+
+@check
+def binned_folds_bin_on_first_window(ctx):
+    """Rows after a fold's test window must not change that fold's bins."""
+    if not predictor._HAS_LGBM:
+        raise Skip("lightgbm not installed")
+    X, y = _matrix(2)
+    folds = validation.fold_slices(len(y), **_CV)
+    later = X.copy()
+    later[folds[0][1].stop:] *= 3
+    first = [predictor.BinnedFolds(m, y).predict_folds(folds[:1])[0] for m in (X, later)]
+    assert np.array_equal(first[0], first[1])
@@ -0,0 +1,313 @@
+"""Synthetic inputs and offline stand-ins for the benchmark suite.
+
+Nothing here touches the network: OHLCV is a seeded random walk, headlines
+come from a fixed template set, and the tier-1 model is a tiny ONNX graph
+(embedding bag + linear head) generated on the fly with a word-level
+tokenizer over the same vocabulary. `StubGemini` stands in for the
+`genai.Client` behind tier 2.
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import socket
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+TICKERS = ["AAPL", "MSFT", "NVDA", "TSLA", "AMD", "GME", "PLTR", "XOM"]
+
+_WSB = [
+    "{t} to the moon 🚀🚀🚀 diamond hands",
+    "{t} calls printing, tendies tonight",
+    "loaded up on {t} puts, this is a bubble",
+    "{t} getting rekt again 📉 bagholders everywhere",
+    "yolo'd my savings into {t}, short squeeze incoming",
+    "{t} beats earnings, guidance raised",
+    "{t} misses on revenue, shares slip after hours",
+    "is {t} overvalued at these levels?",
+    "{t} and {u} both down big today 💀",
+    "yeah right {t} will hit all time high this week /s",
+    "{t} announces buyback, stock up 3%",
+    "analysts cut {t} price target on weak demand",
+    "{t} breakout above resistance 📈 ✨",
+    "holding {t} through the crash, not selling",
+    "{t} sideways all week, nothing to see",
+]
+
+
+def wsb_corpus(n: int, seed: int = 0) -> List[str]:
+    """`n` WSB-style posts and news headlines mentioning random tickers."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in range(n):
+        t, u = rng.choice(TICKERS, 2, replace=False)
+        text = _WSB[int(rng.integers(len(_WSB)))].format(t=t, u=u)
+        out.append(f"{text} #{i}" if rng.random() < 0.5 else text)
+    return out
+
+
+def vocabulary() -> List[str]:
+    words = set()
+    for tpl in _WSB:
+        words.update(tpl.format(t="", u="").split())
+    return sorted(words | set(TICKERS))
+
+
+def ohlcv(n: int, seed: int = 0, end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """`n` business days of random-walk OHLCV ending at `end` (default today)."""
+    rng = np.random.default_rng(seed)
+    end = end or pd.Timestamp(datetime.now(timezone.utc).date())
+    idx = pd.bdate_range(end=end, periods=n)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n)))
+    open_ = close * (1 + rng.normal(0, 0.003, n))
+    spread = np.abs(rng.normal(0, 0.008, n))
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + spread),
+        "Low": np.minimum(open_, close) * (1 - spread),
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 10_000_000, n).astype(float),
+    }, index=idx)
+
+
+def vix(n: int, seed: int = 1) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end=pd.Timestamp(datetime.now(timezone.utc).date()), periods=n)
+    return pd.Series(np.clip(20 + np.cumsum(rng.normal(0, 0.5, n)), 9, 80), index=idx)
+
+
+def headlines(symbol: str, n: int = 40) -> List[Tuple[str, datetime]]:
+    now = datetime.now(timezone.utc)
+    seed = sum(map(ord, symbol))
+    return [(t, now - timedelta(hours=6 * i))
+            for i, t in enumerate(wsb_corpus(n, seed=seed))]
+
+
+def tiny_onnx_model(directory: Path, hidden: int = 64) -> Optional[Tuple[Path, Path]]:
+    """Write a tiny sentiment-shaped ONNX model + tokenizer.json into
+    `directory`; None if the `onnx` package (build-time only) is missing."""
+    try:
+        import onnx
+        from onnx import TensorProto, helper, numpy_helper
+        from tokenizers import Tokenizer, models, pre_tokenizers
+    except ImportError:
+        return None
+    vocab = {"[PAD]": 0, "[UNK]": 1, "[CLS]": 2, "[SEP]": 3}
+    for w in vocabulary():
+        vocab.setdefault(w, len(vocab))
+    tok = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tok.pre_tokenizer = pre_tokenizers.Whitespace()
+    tok_path = directory / "tokenizer.json"
+    tok.save(str(tok_path))
+
+    rng = np.random.default_rng(0)
+    init = [
+        numpy_helper.from_array(rng.normal(size=(len(vocab), hidden)).astype(np.float32), "emb"),
+        numpy_helper.from_array(rng.normal(size=(hidden, 3)).astype(np.float32), "w"),
+        numpy_helper.from_array(np.array([1], dtype=np.int64), "axis"),
+        numpy_helper.from_array(np.array([-1], dtype=np.int64), "last"),
+    ]
+    nodes = [
+        helper.make_node("Gather", ["emb", "input_ids"], ["e"]),
+        helper.make_node("Cast", ["attention_mask"], ["m"], to=TensorProto.FLOAT),
+        helper.make_node("Unsqueeze", ["m", "last"], ["m3"]),
+        helper.make_node("Mul", ["e", "m3"], ["em"]),
+        helper.make_node("ReduceSum", ["em", "axis"], ["pooled"], keepdims=0),
+        helper.make_node("MatMul", ["pooled", "w"], ["logits"]),
+    ]
+    graph = helper.make_graph(
+        nodes, "tiny_sentiment",
+        [helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "seq"]),
+         helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "seq"])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["batch", 3])],
+        init,
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    model_path = directory / "model.onnx"
+    onnx.save(model, str(model_path))
+    return model_path, tok_path
+
+
+def tiny_onnx_sentiment(directory: Path):
+    """An `ONNXSentiment` wired to the tiny model, or None if unavailable."""
+    paths = tiny_onnx_model(directory)
+    if paths is None:
+        return None
+    try:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+    except ImportError:
+        return None
+    from rhymewatch import onnx_sentiment as onx
+    model_path, tok_path = paths
+    inst = onx.ONNXSentiment()
+    inst._attach(onx._session(ort, model_path), Tokenizer.from_file(str(tok_path)))
+    return inst
+
+
+class _StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubAPIError(Exception):
+    """Shaped like `google.genai.errors.APIError`: `.code` and `.status`."""
+
+    def __init__(self, code: int, status: str, message: str):
+        super().__init__(f"{code} {status}. {message}")
+        self.code = code
+        self.status = status
+
+
+class StubGemini:
+    """Offline `genai.Client` look-alike: `.models.generate_content` answers
+    the prompts `rhymewatch.llm` builds, from the lexicon, after sleeping
+    `latency` seconds per request. Texts containing any of `malformed` get
+    an invalid item; `garbage=True` makes every response unparseable and
+    the first `throttle_first` requests fail with a 429."""
+
+    def __init__(self, latency: float = 0.0, malformed: Sequence[str] = (),
+                 garbage: bool = False, throttle_first: int = 0):
+        self.latency = latency
+        self.malformed = tuple(malformed)
+        self.garbage = garbage
+        self.throttle_first = throttle_first
+        self.calls: List[Dict[str, Any]] = []
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.models = self
+
+    def answer(self, text: str) -> Dict[str, Any]:
+        from rhymewatch import lexicon
+        if any(m in text for m in self.malformed):
+            return {"sentiment": "bullish?", "confidence": 3}
+        r = lexicon.lexicon_score(text)
+        return {"sentiment": r.label, "confidence": round(max(r.score, 0.5), 3),
+                "aspect": "earnings" if "earnings" in text else "rumor",
+                "targets": [w.strip("$") for w in text.split() if w.isupper() and 2 <= len(w) <= 5],
+                "is_sarcastic": "/s" in text, "reasoning": "stub"}
+
+    def generate_content(self, model: str, contents: str, config: Any = None) -> _StubResponse:
+        with self._lock:
+            self.calls.append({"model": model, "contents": contents, "config": config})
+            throttled = len(self.calls) <= self.throttle_first
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if throttled:
+            raise StubAPIError(429, "RESOURCE_EXHAUSTED", "quota exceeded")
+        if self.garbage:
+            return _StubResponse("Sorry, I can't help with that.")
+        if "\nTexts:\n" in contents:
+            items = json.loads(contents.split("\nTexts:\n", 1)[1])
+            return _StubResponse(json.dumps([{"i": it["i"], **self.answer(it["text"])}
+                                             for it in items]))
+        return _StubResponse(json.dumps(self.answer(contents.split("\nText: ", 1)[1])))
+
+
+_OFFLINE_UNSET = (
+    "UPSTASH_REDIS_REST_URL", "UPSTASH_REDIS_REST_TOKEN", "GEMINI_API_KEY",
+    "FINNHUB_KEY", "NEWSAPI_KEY", "ONNX_SENTIMENT_MODEL_URL",
+    "ONNX_SENTIMENT_TOKENIZER_URL",
+)
+
+
+class FakeUpstash:
+    """In-memory stand-in for the Upstash REST client: SET/MGET/TTL with
+    expiry, pipelines run immediately and `exec` returns their replies."""
+
+    def __init__(self):
+        self.data: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._replies: Optional[List[Any]] = None
+
+    def _live(self, k: str):
+        v, exp = self.data.get(k, (None, None))
+        if exp is not None and exp <= time.time():
+            self.data.pop(k, None)
+            return None, None
+        return v, exp
+
+    def _reply(self, value):
+        if self._replies is not None:
+            self._replies.append(value)
+        return value
+
+    def set(self, k: str, v: Any, ex: Optional[float] = None, nx: bool = False):
+        if nx and self._live(k)[0] is not None:
+            return self._reply(None)
+        self.data[k] = (v, time.time() + ex if ex else None)
+        return self._reply(True)
+
+    def mget(self, *keys: str):
+        return self._reply([self._live(k)[0] for k in keys])
+
+    def ttl(self, k: str):
+        v, exp = self._live(k)
+        return self._reply(-2 if v is None else -1 if exp is None else max(1, int(exp - time.time())))
+
+    def eval(self, script: str, keys: Sequence[str] = (), args: Sequence[str] = ()):
+        if self._live(keys[0])[0] == args[0]:
+            self.data.pop(keys[0], None)
+        return 1
+
+    def pipeline(self) -> "FakeUpstash":
+        self._replies = []
+        return self
+
+    def exec(self) -> List[Any]:
+        out, self._replies = self._replies or [], None
+        return out
+
+
+def offline_env(workdir: Path):
+    """Point every store at `workdir`, drop credentials and refuse outbound
+    connections. Must run before `rhymewatch` is imported."""
+    for name in _OFFLINE_UNSET:
+        os.environ.pop(name, None)
+    os.environ["RW_PRICE_DIR"] = str(workdir / "prices")
+    os.environ["RW_MODEL_DIR"] = str(workdir / "models")
+    os.environ.setdefault("RW_PRELOAD_ONNX", "0")
+    tempfile.tempdir = str(workdir)
+
+    real_connect = socket.socket.connect
+
+    def connect(self, address):
+        if self.family == getattr(socket, "AF_UNIX", None):
+            return real_connect(self, address)
+        raise OSError(f"benchmarks run offline (tried to connect to {address!r})")
+
+    socket.socket.connect = connect  # type: ignore[method-assign]
+
+
+def stub_sources(history_days: int = 2000):
+    """Serve prices and headlines in `pipeline` from the synthetic fixtures."""
+    from rhymewatch import pipeline, scraper
+
+    frames = {}
+
+    def fake_ohlcv(symbol: str, days: int):
+        if symbol not in frames:
+            frames[symbol] = ohlcv(history_days, seed=sum(map(ord, symbol)))
+        hist = frames[symbol]
+        return hist[hist.index >= hist.index[-1] - pd.Timedelta(days=days)]
+
+    async def fake_aget_headlines(symbol: str, days: int = 60, **kwargs):
+        return headlines(symbol)
+
+    vix_series = vix(history_days)
+    pipeline._ohlcv = fake_ohlcv
+    pipeline._vix = lambda days: vix_series[vix_series.index >= vix_series.index[-1] - pd.Timedelta(days=days)]
+    scraper.aget_headlines = fake_aget_headlines
+    scraper.get_headlines = lambda symbol, days=60, **kwargs: headlines(symbol)
@@ -0,0 +1,126 @@
+"""Timing, registry and baseline comparison for the benchmark suite.
+
+A benchmark module registers generator functions with `@suite`; each one
+yields `Bench(name, fn, items)` entries (set-up happens in the generator,
+only `fn()` is timed) or raises `Skip` when an optional dependency is
+missing. `@check` functions assert correctness properties the fast paths
+must keep (batched == unbatched, incremental == batch, parallel == serial)
+and run alongside.
+"""
+from __future__ import annotations
+import gc
+import json
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class Skip(Exception):
+    """Raised by a suite or check whose optional dependency is missing."""
+
+
+@dataclass
+class Bench:
+    name: str
+    fn: Callable[[], Any]
+    items: int = 1          # work units per call, for throughput
+    unit: str = "call"
+
+
+@dataclass
+class Context:
+    quick: bool
+    workdir: Any
+
+
+SUITES: List[Callable[[Context], Iterator[Bench]]] = []
+CHECKS: List[Callable[[Context], None]] = []
+
+
+def suite(fn: Callable[[Context], Iterator[Bench]]):
+    SUITES.append(fn)
+    return fn
+
+
+def check(fn: Callable[[Context], None]):
+    CHECKS.append(fn)
+    return fn
+
+
+def measure(b: Bench, quick: bool) -> Dict[str, Any]:
+    """Per-call wall time of `b.fn`. One untimed warm-up call sizes the
+    inner loop so each sample takes at least ~50ms (~200ms in full mode);
+    slow calls get fewer samples."""
+    target = 0.05 if quick else 0.2
+    t0 = time.perf_counter()
+    b.fn()
+    first = time.perf_counter() - t0
+    number = max(1, int(target / first)) if first > 0 else 1000
+    if first > 2.0:
+        repeat = 1 if quick else 3
+    else:
+        repeat = 3 if quick else 7
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            for _ in range(number):
+                b.fn()
+            samples.append((time.perf_counter() - t0) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    median = statistics.median(samples)
+    return {
+        "median_s": median,
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "repeat": repeat,
+        "number": number,
+        "items": b.items,
+        "unit": b.unit,
+        "per_item_us": median / b.items * 1e6,
+        "throughput_per_s": b.items / median if median > 0 else None,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any],
+            tolerance: float) -> Dict[str, Dict[str, Any]]:
+    """Best-sample ratio against the baseline per benchmark (the minimum is
+    far less sensitive to scheduler noise than the median). Slower than
+    `1 + tolerance` is a regression, faster than `1 / (1 + tolerance)` an
+    improvement; benchmarks missing on either side are left out."""
+    base = baseline.get("results", {})
+    out = {}
+    for name, r in results.items():
+        b = base.get(name)
+        if not b or not b.get("min_s"):
+            continue
+        ratio = r["min_s"] / b["min_s"]
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 / (1 + tolerance):
+            status = "improved"
+        else:
+            status = "ok"
+        out[name] = {"baseline_s": b["min_s"], "ratio": round(ratio, 3), "status": status}
+    return out
+
+
+def load_json(path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def fmt_time(s: float) -> str:
+    if s >= 1:
+        return f"{s:8.3f} s "
+    if s >= 1e-3:
+        return f"{s * 1e3:8.3f} ms"
+    return f"{s * 1e6:8.2f} µs"
@@ -0,0 +1,145 @@
+"""Benchmark runner: time every suite, run the checks, write JSON, compare.
+
+Results go to `benchmarks/results/latest.json` (or `--out`):
+
+    {"meta": {...}, "results": {name: {median_s, min_s, max_s, repeat,
+     number, items, unit, per_item_us, throughput_per_s}},
+     "skipped": {suite: reason}, "checks": {name: "ok" | "skipped: …" |
+     "failed: …"}, "comparison": {name: {baseline_s, ratio, status}}}
+
+The exit status is 1 if a check failed or a benchmark is more than
+`--tolerance` (default 25%) slower than the baseline. Quick and full runs
+time different input sizes, so each mode has its own baseline
+(`baseline.quick.json` / `baseline.json`). Baselines are machine-specific:
+record one with `--save-baseline` (and again with `--quick`) on the machine
+you compare on; with `-k` only the matching entries are replaced.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+HERE = Path(__file__).resolve().parent
+BASELINES = {False: HERE / "baseline.json", True: HERE / "baseline.quick.json"}
+RESULTS = HERE / "results" / "latest.json"
+_MODULES = ("bench_sentiment", "bench_llm", "bench_dedup", "bench_features", "bench_validation",
+            "bench_cache", "bench_metrics", "bench_pipeline", "bench_startup")
+
+
+def _meta(quick: bool) -> Dict[str, Any]:
+    import numpy
+    import pandas
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "at": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+        "commit": commit or None,
+        "quick": quick,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--quick", action="store_true", help="smaller inputs, fewer samples")
+    ap.add_argument("-k", dest="pattern", help="regex; only run benchmarks whose name matches")
+    ap.add_argument("--out", type=Path, default=RESULTS, help="results JSON path")
+    ap.add_argument("--baseline", type=Path,
+                    help="baseline JSON path (default benchmarks/baseline[.quick].json)")
+    ap.add_argument("--save-baseline", action="store_true", help="write this run to --baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25,
+                    help="allowed slowdown vs baseline before flagging (default 0.25)")
+    ap.add_argument("--no-checks", action="store_true", help="skip the correctness checks")
+    args = ap.parse_args(argv)
+    if args.baseline is None:
+        args.baseline = BASELINES[args.quick]
+
+    workdir = Path(tempfile.mkdtemp(prefix="rw_bench_"))
+    try:
+        return _run(args, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run(args, workdir: Path) -> int:
+    from . import fixtures
+    fixtures.offline_env(workdir)
+
+    import importlib
+    from . import harness
+    for name in _MODULES:
+        importlib.import_module(f".{name}", __package__)
+    ctx = harness.Context(quick=args.quick, workdir=workdir)
+    pattern = re.compile(args.pattern) if args.pattern else None
+
+    results: Dict[str, Any] = {}
+    skipped: Dict[str, str] = {}
+    for s in harness.SUITES:
+        try:
+            for b in s(ctx):
+                if pattern and not pattern.search(b.name):
+                    continue
+                r = harness.measure(b, args.quick)
+                results[b.name] = r
+                print(f"{b.name:44s} {harness.fmt_time(r['median_s'])}"
+                      f"  ({r['per_item_us']:.2f} µs/{b.unit})")
+        except harness.Skip as e:
+            skipped[s.__name__] = str(e)
+            print(f"{s.__name__:44s} skipped: {e}")
+
+    checks: Dict[str, str] = {}
+    if not args.no_checks:
+        for c in harness.CHECKS:
+            if pattern and not pattern.search(c.__name__):
+                continue
+            try:
+                c(ctx)
+                checks[c.__name__] = "ok"
+            except harness.Skip as e:
+                checks[c.__name__] = f"skipped: {e}"
+            except Exception as e:
+                checks[c.__name__] = f"failed: {type(e).__name__}: {e}"
+            print(f"check {c.__name__:38s} {checks[c.__name__]}")
+
+    doc: Dict[str, Any] = {"meta": _meta(args.quick), "results": results,
+                           "skipped": skipped, "checks": checks}
+    baseline = harness.load_json(args.baseline)
+    if baseline is not None and baseline.get("meta", {}).get("quick") != args.quick:
+        print(f"not comparing: baseline was recorded with quick={baseline['meta'].get('quick')}")
+    elif baseline is not None and not args.save_baseline:
+        doc["comparison"] = harness.compare(results, baseline, args.tolerance)
+        for name, c in doc["comparison"].items():
+            if c["status"] != "ok":
+                print(f"{c['status']:10s} {name}: {c['ratio']:.2f}x baseline")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(doc, indent=2) + "\n")
+    print(f"results written to {args.out}")
+    if args.save_baseline:
+        saved = doc
+        if pattern and baseline is not None and baseline.get("meta", {}).get("quick") == args.quick:
+            saved = dict(doc, results={**baseline.get("results", {}), **results},
+                         skipped={**baseline.get("skipped", {}), **skipped},
+                         checks={**baseline.get("checks", {}), **checks})
+        args.baseline.write_text(json.dumps(saved, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+
+    failed = [n for n, s in checks.items() if s.startswith("failed")]
+    regressed = [n for n, c in doc.get("comparison", {}).items() if c["status"] == "regression"]
+    return 1 if failed or regressed else 0
@@ -0,0 +1,101 @@
+"""Cold-start budget for the serverless entry point.
+
+    python -m benchmarks.startup          # import-time breakdown + budget check
+
+Imports `app` in a fresh interpreter and fails if that loads any of the
+heavy dependencies the routes import lazily, or if it takes more than
+`BUDGET_S` on top of importing FastAPI itself (which the app can't avoid).
+The breakdown is `python -X importtime` folded per top-level package.
+"""
+from __future__ import annotations
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# must stay out of `import app`
+FORBIDDEN = (
+    "numpy", "pandas", "lightgbm", "sklearn", "scipy", "pandas_ta",
+    "onnxruntime", "tokenizers", "yfinance", "httpx", "feedparser",
+    "google.genai", "upstash_redis",
+    "rhymewatch.pipeline", "rhymewatch.sentiment", "rhymewatch.datasources",
+)
+BUDGET_S = 0.25
+
+_PROBE = (
+    "import sys, time, json\n"
+    "t0 = time.perf_counter()\n"
+    "import fastapi\n"
+    "t1 = time.perf_counter()\n"
+    "import app\n"
+    "t2 = time.perf_counter()\n"
+    "print(json.dumps({'fastapi_s': t1 - t0, 'app_s': t2 - t1, 'modules': sorted(sys.modules)}))\n"
+)
+
+
+def probe() -> Dict[str, Any]:
+    """Time `import fastapi` and then `import app` in a fresh interpreter."""
+    out = subprocess.run([sys.executable, "-c", _PROBE], cwd=ROOT, capture_output=True,
+                         text=True, timeout=120, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def violations(result: Dict[str, Any], budget: float = BUDGET_S) -> List[str]:
+    loaded = set(result["modules"])
+    problems = [f"`import app` loaded {m}" for m in FORBIDDEN if m in loaded]
+    if result["app_s"] > budget:
+        problems.append(f"`import app` took {result['app_s']:.3f}s on top of fastapi "
+                        f"(budget {budget:.3f}s)")
+    return problems
+
+
+def breakdown(top: int = 15) -> List[Tuple[str, float]]:
+    """Cumulative time (seconds) of what `import app` imports directly,
+    folded per top-level package."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                         cwd=ROOT, capture_output=True, text=True, timeout=120, check=True)
+    totals: Dict[str, float] = defaultdict(float)
+    children: List[Tuple[str, float]] = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        if depth == 1:
+            children.append((name, int(cumulative) / 1e6))
+        elif depth == 0:
+            # importtime prints children before their parent
+            if name == "app":
+                for child, seconds in children:
+                    totals[child.split(".")[0]] += seconds
+            children = []
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--budget", type=float, default=BUDGET_S,
+                    help=f"seconds allowed on top of `import fastapi` (default {BUDGET_S})")
+    args = ap.parse_args(argv)
+    for name, seconds in breakdown():
+        print(f"{name:32s} {seconds * 1e3:9.1f} ms")
+    result = probe()
+    print(f"\nimport fastapi {result['fastapi_s'] * 1e3:.1f} ms, "
+          f"then import app {result['app_s'] * 1e3:.1f} ms")
+    problems = violations(result, args.budget)
+    for p in problems:
+        print(f"FAIL {p}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
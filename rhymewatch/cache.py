@@ -1,51 +1,175 @@
-"""Upstash Redis wrapper with in-memory fallback for local dev.
+"""Two-level cache: bounded in-process LRU (L1) in front of Upstash Redis (L2).
 
 All values stored as JSON strings. Keys are namespaced `rw:{kind}:{id}`.
 TTLs follow the research doc: 1–6h for sentiment, 24h for predictions.
+
+L1 is capped in bytes (`RW_L1_MAX_BYTES`, default 32 MB) and evicts expired
+entries first, then least-recently-used ones. Its TTLs are taken from L2: a
+write uses the same `ex`, a read-through copies the key's remaining Redis TTL.
+Without Upstash credentials L1 is the whole cache (local dev).
+
+The Upstash client is built once per process and reused, so every call after
+the first rides the same keep-alive HTTP connection. `get_many`/`set_many`
+collapse a batch of keys into one MGET / one pipelined round-trip.
+
+Lookups are counted per level in `rw_cache_requests_total` and timed as
+`cache.*` spans (see `metrics`); L1 size and the overall hit ratio are
+exported as gauges.
+
+`get_or_compute` is single-flight: concurrent misses on one key share a
+single computation inside the process, and across workers the first one to
+take the `rw:lock:{key}` lease computes while the others poll for its result.
+
+Stale-while-revalidate: a write with `stale_after` (soft TTL) also sets a
+`rw:fresh:{key}` marker that expires after it, while the value itself lives
+for `ex` (hard TTL). `get_or_compute(..., stale_after=...)` serves a value
+whose marker is gone immediately and refreshes it on a background thread
+(`revalidate`); only the worker holding the key's lock refreshes, and one
+refresh per key runs per process. Callers block only once the hard TTL is
+up. L1 serves such a value only while it also holds the marker; after that
+both are re-read from L2, so other workers' refreshes are picked up.
+`RW_SWR=0` makes the soft TTL the hard one.
 """
 from __future__ import annotations
 import os
 import json
 import time
-from typing import Any, Optional
+import uuid
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-_MEM: dict = {}
-_MEM_EXPIRY: dict = {}
+from . import metrics
 
+# Per-entry bookkeeping (OrderedDict node, tuple, floats) on top of key+value.
+_ENTRY_OVERHEAD = 96
+# L1 lifetime for L2 keys that have no expiry of their own.
+_NO_EXPIRY_TTL = 3600
+_REQUESTS = "rw_cache_requests_total"
+_SWR = "rw_cache_swr_total"
 
-def _mem_get(k: str) -> Optional[Any]:
-    exp = _MEM_EXPIRY.get(k)
-    if exp and exp < time.time():
-        _MEM.pop(k, None)
-        _MEM_EXPIRY.pop(k, None)
-        return None
-    return _MEM.get(k)
+SWR = os.getenv("RW_SWR", "1") != "0"
+SWR_WORKERS = int(os.getenv("RW_SWR_WORKERS", "2"))
+SWR_LEASE = int(os.getenv("RW_SWR_LEASE", "60"))
+
+
+class _LRU:
+    """Byte-bounded LRU with per-key expiry. Values are JSON strings."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cost(k: str, v: Any) -> int:
+        return len(k) + (len(v) if isinstance(v, (str, bytes)) else 64) + _ENTRY_OVERHEAD
+
+    def _drop(self, k: str):
+        _, _, cost = self._data.pop(k)
+        self.size -= cost
+
+    def get(self, k: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(k)
+            if entry is None:
+                self.misses += 1
+                return None
+            v, exp, _ = entry
+            if exp is not None and exp <= time.time():
+                self._drop(k)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(k)
+            self.hits += 1
+            return v
+
+    def set(self, k: str, v: Any, ex: Optional[float] = None):
+        cost = self._cost(k, v)
+        with self._lock:
+            if k in self._data:
+                self._drop(k)
+            if cost > self.max_bytes:
+                return
+            exp = time.time() + ex if ex else None
+            self._data[k] = (v, exp, cost)
+            self.size += cost
+            if self.size > self.max_bytes:
+                self._shrink()
 
+    def delete(self, k: str):
+        with self._lock:
+            if k in self._data:
+                self._drop(k)
 
-def _mem_set(k: str, v: Any, ex: Optional[int] = None):
-    _MEM[k] = v
-    if ex:
-        _MEM_EXPIRY[k] = time.time() + ex
+    def _shrink(self):
+        now = time.time()
+        for k in [k for k, (_, exp, _) in self._data.items() if exp is not None and exp <= now]:
+            self._drop(k)
+            self.expirations += 1
+        while self.size > self.max_bytes and self._data:
+            k = next(iter(self._data))
+            self._drop(k)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+_L1 = _LRU(int(os.getenv("RW_L1_MAX_BYTES", str(32 * 1024 * 1024))))
+
+_CLIENT = None
+_CLIENT_CFG: Optional[Tuple[str, str]] = None
+_CLIENT_LOCK = threading.Lock()
 
 
 def _client():
+    """Process-wide Upstash client, rebuilt only if the credentials change."""
+    global _CLIENT, _CLIENT_CFG
     url = os.getenv("UPSTASH_REDIS_REST_URL")
     token = os.getenv("UPSTASH_REDIS_REST_TOKEN")
     if not url or not token:
         return None
-    try:
-        from upstash_redis import Redis
-        return Redis(url=url, token=token)
-    except ImportError:
-        return None
+    cfg = (url, token)
+    if _CLIENT is not None and _CLIENT_CFG == cfg:
+        return _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None or _CLIENT_CFG != cfg:
+            try:
+                from upstash_redis import Redis
+            except ImportError:
+                return None
+            _CLIENT = Redis(url=url, token=token)
+            _CLIENT_CFG = cfg
+    return _CLIENT
 
 
-def get(key: str) -> Optional[Any]:
-    r = _client()
-    try:
-        raw = r.get(key) if r else _mem_get(key)
-    except Exception:
-        raw = _mem_get(key)
+def _decode(raw: Any) -> Optional[Any]:
     if raw is None:
         return None
     try:
@@ -54,13 +178,410 @@ def get(key: str) -> Optional[Any]:
         return raw
 
 
-def set(key: str, value: Any, ex: int = 3600):
-    payload = json.dumps(value, default=str)
+def _l1_ttl(ttl: Any) -> Optional[float]:
+    """Map a Redis TTL reply to an L1 lifetime; None means don't keep."""
+    try:
+        ttl = int(ttl)
+    except (TypeError, ValueError):
+        return None
+    if ttl == -1:
+        return _NO_EXPIRY_TTL
+    return ttl if ttl > 0 else None
+
+
+def _l2_fetch(r, keys: List[str]) -> List[Any]:
+    """MGET plus each key's TTL in one pipelined round-trip; fills L1."""
+    pipe = r.pipeline()
+    pipe.mget(*keys)
+    for k in keys:
+        pipe.ttl(k)
+    res = pipe.exec()
+    raws, ttls = res[0], res[1:]
+    for k, raw, ttl in zip(keys, raws, ttls):
+        if raw is None:
+            continue
+        ex = _l1_ttl(ttl)
+        if ex:
+            _L1.set(k, raw, ex=ex)
+    return raws
+
+
+def _count(level: str, hits: int, misses: int):
+    metrics.inc(_REQUESTS, hits, level=level, result="hit")
+    metrics.inc(_REQUESTS, misses, level=level, result="miss")
+
+
+def get(key: str) -> Optional[Any]:
+    with metrics.span("cache.get"):
+        raw = _L1.get(key)
+        if raw is not None:
+            _count("l1", 1, 0)
+            return _decode(raw)
+        _count("l1", 0, 1)
+        r = _client()
+        if not r:
+            return None
+        try:
+            raw = _l2_fetch(r, [key])[0]
+        except Exception:
+            metrics.inc(_REQUESTS, level="l2", result="error")
+            return None
+        _count("l2", raw is not None, raw is None)
+        return _decode(raw)
+
+
+def get_many(keys: List[str]) -> List[Optional[Any]]:
+    """Values for `keys` in order, None for misses. L1 first, then one
+    pipelined MGET round-trip for whatever L1 doesn't hold."""
+    with metrics.span("cache.get_many"):
+        keys = list(keys)
+        raws = [_L1.get(k) for k in keys]
+        missing = [i for i, raw in enumerate(raws) if raw is None]
+        _count("l1", len(keys) - len(missing), len(missing))
+        r = _client() if missing else None
+        if r:
+            try:
+                fetched = _l2_fetch(r, [keys[i] for i in missing])
+                for i, raw in zip(missing, fetched):
+                    raws[i] = raw
+                found = sum(raw is not None for raw in fetched)
+                _count("l2", found, len(fetched) - found)
+            except Exception:
+                metrics.inc(_REQUESTS, len(missing), level="l2", result="error")
+        return [_decode(raw) for raw in raws]
+
+
+def _fresh_key(key: str) -> str:
+    return f"rw:fresh:{key}"
+
+
+def _ttls(ex: int, stale_after: Optional[int]) -> Tuple[int, Optional[int]]:
+    """(hard, soft) TTLs; without SWR, or with soft >= hard, only a hard one."""
+    if not stale_after:
+        return ex, None
+    if not SWR or stale_after >= ex:
+        return stale_after, None
+    return ex, stale_after
+
+
+def set(key: str, value: Any, ex: int = 3600, stale_after: Optional[int] = None):
+    """Store `value` for `ex` seconds; with `stale_after`, it counts as fresh
+    for that long and as stale (served while refreshed) after."""
+    with metrics.span("cache.set"):
+        _write([(key, value)], ex, stale_after)
+
+
+def set_many(items: Union[Dict[str, Any], Iterable[Tuple[str, Any]]], ex: int = 3600,
+             stale_after: Optional[int] = None):
+    """Write several keys with one TTL in a single pipelined round-trip."""
+    pairs = list(items.items() if isinstance(items, dict) else items)
+    if not pairs:
+        return
+    with metrics.span("cache.set_many"):
+        _write(pairs, ex, stale_after)
+
+
+def _write(pairs: List[Tuple[str, Any]], ex: int, stale_after: Optional[int]):
+    ex, stale_after = _ttls(ex, stale_after)
+    payloads = [(k, json.dumps(v, default=str)) for k, v in pairs]
+    for k, payload in payloads:
+        _L1.set(k, payload, ex=ex)
+        if stale_after:
+            _L1.set(_fresh_key(k), "1", ex=stale_after)
     r = _client()
+    if not r:
+        return
     try:
+        if len(payloads) == 1 and not stale_after:
+            r.set(payloads[0][0], payloads[0][1], ex=ex)
+            return
+        pipe = r.pipeline()
+        for k, payload in payloads:
+            pipe.set(k, payload, ex=ex)
+            if stale_after:
+                pipe.set(_fresh_key(k), "1", ex=stale_after)
+        pipe.exec()
+    except Exception:
+        pass  # L1 still holds it for this worker
+
+
+def get_stale(key: str) -> Tuple[Optional[Any], bool]:
+    """(value, fresh) for a key written with `stale_after`; a value without
+    its freshness marker is stale. (None, False) on a miss."""
+    return get_stale_many([key])[0]
+
+
+def get_stale_many(keys: List[str]) -> List[Tuple[Optional[Any], bool]]:
+    """`get_stale` for several keys, in one lookup."""
+    out = _stale_many(keys)
+    if metrics.ENABLED:
+        stale = sum(v is not None and not fresh for v, fresh in out)
+        metrics.inc(_SWR, sum(fresh for _, fresh in out), result="fresh")
+        metrics.inc(_SWR, stale, result="stale")
+    return out
+
+
+def _stale_many(keys: List[str]) -> List[Tuple[Optional[Any], bool]]:
+    keys = list(keys)
+    if not SWR:
+        return [(v, v is not None) for v in get_many(keys)]
+    with metrics.span("cache.get_many"):
+        # L1 answers only while it also holds the marker: once that lapses,
+        # value and marker are re-read from L2 together, so a refresh by
+        # another worker replaces the copy this one kept for the hard TTL.
+        marks = [_fresh_key(k) for k in keys]
+        out: List[Tuple[Optional[Any], bool]] = []
+        missing = []
+        for i, (k, m) in enumerate(zip(keys, marks)):
+            raw = _L1.get(k) if _L1.get(m) is not None else None
+            if raw is None:
+                missing.append(i)
+            out.append((_decode(raw), raw is not None))
+        _count("l1", len(keys) - len(missing), len(missing))
+        r = _client() if missing else None
+        fetched = None
         if r:
-            r.set(key, payload, ex=ex)
-        else:
-            _mem_set(key, payload, ex=ex)
+            try:
+                fetched = _l2_fetch(r, [keys[i] for i in missing] + [marks[i] for i in missing])
+            except Exception:
+                metrics.inc(_REQUESTS, len(missing), level="l2", result="error")
+        if fetched is None:
+            # No L2 (or it failed): whatever L1 still holds, as stale.
+            for i in missing:
+                out[i] = (_decode(_L1.get(keys[i])), False)
+            return out
+        values, fresh = fetched[:len(missing)], fetched[len(missing):]
+        found = sum(v is not None for v in values)
+        _count("l2", found, len(missing) - found)
+        for i, raw, mark in zip(missing, values, fresh):
+            out[i] = (_decode(raw), raw is not None and mark is not None)
+        return out
+
+
+def stats() -> Dict[str, Any]:
+    """L1 counters: entries, bytes, hits, misses, hit ratio, evictions."""
+    return _L1.stats()
+
+
+def _gauges() -> Dict[str, float]:
+    l1 = _L1.stats()
+    l1_hits = metrics.value(_REQUESTS, level="l1", result="hit")
+    l1_misses = metrics.value(_REQUESTS, level="l1", result="miss")
+    l2_hits = metrics.value(_REQUESTS, level="l2", result="hit")
+    lookups = l1_hits + l1_misses
+    return {
+        "rw_cache_l1_entries": l1["entries"],
+        "rw_cache_l1_bytes": l1["bytes"],
+        "rw_cache_l1_max_bytes": l1["max_bytes"],
+        "rw_cache_l1_evictions": l1["evictions"],
+        "rw_cache_hit_ratio": (l1_hits + l2_hits) / lookups if lookups else 0.0,
+    }
+
+
+metrics.register_gauges(_gauges)
+
+
+_UNLOCK_LUA = (
+    "if redis.call('get', KEYS[1]) == ARGV[1] then "
+    "return redis.call('del', KEYS[1]) else return 0 end"
+)
+
+
+def acquire_lock(name: str, lease: int = 60) -> Optional[str]:
+    """Take a cross-worker lease; returns a release token or None if held.
+
+    Without Redis there is only this process, so the lock always succeeds.
+    A Redis error also counts as acquired: better a duplicate computation
+    than a request that never runs.
+    """
+    token = uuid.uuid4().hex
+    r = _client()
+    if not r:
+        return token
+    try:
+        return token if r.set(name, token, nx=True, ex=lease) else None
     except Exception:
-        _mem_set(key, payload, ex=ex)
+        return token
+
+
+def release_lock(name: str, token: str):
+    r = _client()
+    if not r:
+        return
+    try:
+        r.eval(_UNLOCK_LUA, keys=[name], args=[token])
+    except Exception:
+        pass  # the lease runs out on its own
+
+
+class _Abandoned(Exception):
+    """A `lead` holder stopped before publishing; its waiters compute."""
+
+
+_FLIGHTS: Dict[str, Future] = {}
+_FLIGHTS_LOCK = threading.Lock()
+_REFRESHING: Dict[str, Future] = {}
+_REFRESH_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def get_or_compute(key: str, compute: Callable[[], Any], ex: int = 3600,
+                   lease: int = 120, wait: float = 30.0, poll: float = 0.25,
+                   stale_after: Optional[int] = None, serve_stale: bool = True,
+                   hit: Optional[Tuple[Optional[Any], bool]] = None) -> Any:
+    """Cached value of `key`, computing and storing it at most once.
+
+    Callers in this process that miss while a computation is running wait on
+    it. Across workers the holder of `rw:lock:{key}` computes; the others
+    poll the cache for up to `wait` seconds, then compute themselves.
+
+    With `stale_after`, `ex` is the hard TTL: a stale value is returned
+    as is and refreshed in the background (`revalidate`), unless
+    `serve_stale=False`, which treats it as a miss. A caller that already
+    did the `get_stale` lookup passes its result as `hit` to skip a second.
+    """
+    ex, stale_after = _ttls(ex, stale_after)
+    if stale_after:
+        cached, fresh = hit if hit is not None else get_stale(key)
+        if cached is not None and (fresh or serve_stale):
+            if not fresh:
+                revalidate(key, compute, ex, stale_after)
+            return cached
+
+        def lookup():
+            value, fresh = _stale_many([key])[0]
+            return value if fresh else None
+    else:
+        cached = get(key)
+        if cached is not None:
+            return cached
+        lookup = partial(get, key)
+    with _FLIGHTS_LOCK:
+        flight = _FLIGHTS.get(key)
+        leader = flight is None
+        if leader:
+            flight = _FLIGHTS[key] = Future()
+    if not leader:
+        try:
+            return flight.result()
+        except _Abandoned:
+            return get_or_compute(key, compute, ex, lease, wait, poll, stale_after, serve_stale)
+    try:
+        value = _compute_locked(key, compute, ex, stale_after, lookup, lease, wait, poll)
+    except BaseException as e:
+        flight.set_exception(e)
+        raise
+    else:
+        flight.set_result(value)
+        return value
+    finally:
+        with _FLIGHTS_LOCK:
+            _FLIGHTS.pop(key, None)
+
+
+def _compute_locked(key: str, compute: Callable[[], Any], ex: int,
+                    stale_after: Optional[int], lookup: Callable[[], Optional[Any]],
+                    lease: int, wait: float, poll: float) -> Any:
+    name = f"rw:lock:{key}"
+    token = acquire_lock(name, lease)
+    if token is None:
+        stop = time.time() + wait
+        while time.time() < stop:
+            time.sleep(poll)
+            cached = lookup()
+            if cached is not None:
+                return cached
+        token = acquire_lock(name, lease)
+    try:
+        cached = lookup()  # the previous holder may have just finished
+        if cached is not None:
+            return cached
+        value = compute()
+        set(key, value, ex=ex, stale_after=stale_after)
+        return value
+    finally:
+        if token:
+            release_lock(name, token)
+
+
+@contextmanager
+def lead(key: str, ex: int = 3600, stale_after: Optional[int] = None,
+         lease: int = 120) -> Iterator[Optional[Callable[[Any], None]]]:
+    """Claim the computation of `key` for a caller that builds the value
+    itself, stage by stage, instead of through a `get_or_compute` callable.
+
+    Yields `publish(value)`, which stores the value and hands it to the
+    callers waiting on it in this process (and, through the key's lock and
+    the cache, in other workers). Yields None if the key is being computed
+    here or in another worker, or was stored meanwhile: use
+    `get_or_compute`, which waits for it. Leaving without publishing (an
+    error, a closed stream) lets the waiters compute it themselves.
+    """
+    ex, stale_after = _ttls(ex, stale_after)
+    with _FLIGHTS_LOCK:
+        flight = None if key in _FLIGHTS else _FLIGHTS.setdefault(key, Future())
+    if flight is None:
+        yield None
+        return
+    name = f"rw:lock:{key}"
+    token = acquire_lock(name, lease)
+
+    def publish(value: Any):
+        set(key, value, ex=ex, stale_after=stale_after)
+        flight.set_result(value)
+
+    try:
+        if token is None or (_stale_many([key])[0][1] if stale_after else get(key) is not None):
+            yield None
+        else:
+            yield publish
+    finally:
+        if token:
+            release_lock(name, token)
+        with _FLIGHTS_LOCK:
+            _FLIGHTS.pop(key, None)
+        if not flight.done():
+            flight.set_exception(_Abandoned(key))
+
+
+def revalidate(key: str, compute: Callable[[], Any], ex: int,
+               stale_after: Optional[int], lease: int = SWR_LEASE) -> Optional[Future]:
+    """Recompute `key` on a background thread and store it with the given
+    TTLs. Skipped (None) if this process is already computing or refreshing
+    it; the refresh itself is skipped if another worker holds the key's
+    lock (for at most `lease` seconds) or refreshed it in the meantime."""
+    global _REFRESH_POOL
+    with _FLIGHTS_LOCK:
+        if key in _FLIGHTS or key in _REFRESHING:
+            return None
+        if _REFRESH_POOL is None:
+            _REFRESH_POOL = ThreadPoolExecutor(max_workers=max(1, SWR_WORKERS),
+                                               thread_name_prefix="rw-swr")
+        fut = _REFRESHING[key] = _REFRESH_POOL.submit(
+            _refresh, key, compute, ex, stale_after, lease)
+    return fut
+
+
+def _refresh(key: str, compute: Callable[[], Any], ex: int,
+             stale_after: Optional[int], lease: int) -> bool:
+    name = f"rw:lock:{key}"
+    token = None
+    try:
+        token = acquire_lock(name, lease)
+        if token is None:
+            metrics.inc(_SWR, result="refresh_skipped")
+            return False
+        if stale_after and _stale_many([key])[0][1]:
+            return False  # refreshed by someone else meanwhile
+        with metrics.span("cache.refresh"):
+            set(key, compute(), ex=ex, stale_after=stale_after)
+        metrics.inc(_SWR, result="refreshed")
+        return True
+    except Exception as e:
+        print(f"cache: background refresh of {key} failed: {e}")
+        metrics.inc(_SWR, result="refresh_error")
+        return False
+    finally:
+        if token:
+            release_lock(name, token)
+        with _FLIGHTS_LOCK:
+            _REFRESHING.pop(key, None)
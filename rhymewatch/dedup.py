@@ -0,0 +1,158 @@
+"""Near-duplicate headline clustering.
+
+Syndicated stories arrive several times: with a source suffix ("... -
+Reuters", "... | Yahoo Finance"), with different punctuation or casing, or
+with a word changed. `cluster(titles)` groups them so the pipeline can
+classify one representative per cluster and fan its label out:
+
+1. `normalize`: strip a trailing publisher suffix (a name in `SOURCES` or a
+   bare domain, never an arbitrary " - Title Cased Clause"), NFKC,
+   lowercase, drop punctuation. Identical normalized titles are one cluster.
+2. Otherwise MinHash over character 4-gram shingles; LSH banding picks
+   candidate representatives and an exact Jaccard check (at least
+   `RW_DEDUP_THRESHOLD`, default 0.75) decides.
+
+Titles with different lexicon polarity hit counts, or where one mentions a
+ticker-like token ("NVDA", "$AMD") the other does not contain in any case,
+are never merged ("NVDA beats" / "AMD beats", "shares up" / "shares
+down"); "NVDA beats" / "Nvda Beats" are. Both guards look at the whole
+title, suffix included, ignoring publisher names such as "CNBC". A title
+joins the first matching representative in input order (headlines come
+newest first) and never chains through other members. `RW_DEDUP=0` puts
+every title in its own cluster.
+"""
+from __future__ import annotations
+import os
+import re
+import zlib
+import unicodedata
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from . import lexicon
+
+ENABLED = os.getenv("RW_DEDUP", "1") != "0"
+THRESHOLD = float(os.getenv("RW_DEDUP_THRESHOLD", "0.75"))
+
+_SHINGLE = 4
+_BANDS, _ROWS = 8, 4          # 32 MinHash values; P(candidate | J=0.75) ≈ 0.95
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, 2**63, _BANDS * _ROWS, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2**63, _BANDS * _ROWS, dtype=np.uint64)
+
+SOURCES = (
+    "Reuters", "Bloomberg", "Yahoo Finance", "Yahoo", "MarketWatch", "CNBC", "CNN",
+    "CNN Business", "Fox Business", "The Motley Fool", "Motley Fool", "Benzinga",
+    "Barron's", "The Wall Street Journal", "Wall Street Journal", "WSJ",
+    "Financial Times", "FT", "Forbes", "Fortune", "Business Insider", "Insider",
+    "Seeking Alpha", "Zacks", "Zacks Investment Research", "TipRanks", "TheStreet",
+    "Investopedia", "InvestorPlace", "Investor's Business Daily", "IBD", "Nasdaq",
+    "Simply Wall St", "GuruFocus", "Insider Monkey", "Morningstar", "Axios",
+    "Associated Press", "AP", "AP News", "BBC", "BBC News", "The Guardian",
+    "The New York Times", "Kiplinger", "Quartz", "Fast Company",
+)
+# " - Reuters", " | Yahoo Finance", " — finance.yahoo.com"
+_SUFFIX = re.compile(
+    r"\s+[-–—|]\s+(?:%s|(?:www\.)?[\w-]+(?:\.[\w-]+)*\.(?:com|net|org|io|co|co\.uk))\.?\s*$"
+    % "|".join(re.escape(s) for s in sorted(SOURCES, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+_PUNCT = re.compile(r"[^\w\s$%.]+|(?<!\d)\.|\.(?!\d)")
+_TICKER = re.compile(r"\$?\b[A-Z]{2,5}\b")
+_NOT_TICKERS = frozenset(s.lower() for s in SOURCES if _TICKER.fullmatch(s))
+
+
+def strip_source(title: str) -> str:
+    return _SUFFIX.sub("", unicodedata.normalize("NFKC", title or ""))
+
+
+def normalize(title: str) -> str:
+    """Lowercased, punctuation-free title without its source suffix."""
+    return _words(strip_source(title))
+
+
+def _words(text: str) -> str:
+    return " ".join(_PUNCT.sub(" ", text.lower()).split())
+
+
+def _shingles(text: str) -> np.ndarray:
+    padded = f" {text} "
+    grams = {padded[i:i + _SHINGLE] for i in range(max(1, len(padded) - _SHINGLE + 1))}
+    crc = zlib.crc32
+    return np.fromiter((crc(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash(shingles: Sequence[np.ndarray]) -> np.ndarray:
+    """(n, 32) MinHash signatures, one multiply-shift hash family per column."""
+    if not len(shingles):
+        return np.empty((0, _BANDS * _ROWS), dtype=np.uint64)
+    flat = np.concatenate(shingles)
+    starts = np.cumsum([0] + [len(s) for s in shingles[:-1]])
+    with np.errstate(over="ignore"):
+        hashed = (flat[:, None] * _A + _B) >> np.uint64(32)
+    return np.minimum.reduceat(hashed, starts, axis=0)
+
+
+def cluster(titles: Sequence[str], threshold: float = THRESHOLD) -> np.ndarray:
+    """Cluster id per title: the index of the cluster's representative,
+    which is always its first member in input order."""
+    n = len(titles)
+    ids = np.arange(n, dtype=np.int32)
+    if not ENABLED or n < 2:
+        return ids
+    raw = [unicodedata.normalize("NFKC", t or "") for t in titles]
+    norms = [normalize(t) for t in raw]
+    lex = lexicon.lexicon_score_batch(raw)
+    polarity = list(zip(lex.hits_pos.tolist(), lex.hits_neg.tolist()))
+    tickers = [frozenset(m.lstrip("$").lower() for m in _TICKER.findall(t)) - _NOT_TICKERS
+               for t in raw]
+    words = [frozenset(w.lstrip("$") for w in _words(t).split()) for t in raw]
+
+    def compatible(i: int, r: int) -> bool:
+        # case-insensitive: "NVDA beats" matches "Nvda Beats", not "AMD beats"
+        return tickers[i] <= words[r] and tickers[r] <= words[i]
+
+    # identical normalized titles: no hashing needed
+    exact: Dict[Tuple, List[int]] = {}
+    for i in range(n):
+        reps = exact.setdefault((polarity[i], norms[i]), [])
+        ids[i] = next((r for r in reps if compatible(i, r)), i)
+        if ids[i] == i:
+            reps.append(i)
+    if threshold > 1:
+        return ids
+    rest = np.flatnonzero(ids == np.arange(n)).tolist()
+    shingles = [_shingles(norms[i]) for i in rest]
+    bands = minhash(shingles).reshape(len(rest), _BANDS, _ROWS)
+
+    buckets: Dict[Tuple, List[int]] = {}
+    sets: Dict[int, set] = {}
+    merged: Dict[int, int] = {}
+    for j, i in enumerate(rest):
+        keys = [(polarity[i], b, bands[j, b].tobytes()) for b in range(_BANDS)]
+        mine = set(shingles[j].tolist())
+        for r in sorted({r for k in keys for r in buckets.get(k, ())}):
+            if not compatible(i, r):
+                continue
+            theirs = sets[r]
+            if len(mine & theirs) >= threshold * len(mine | theirs):
+                merged[i] = r
+                break
+        else:
+            sets[i] = mine
+            for k in keys:
+                buckets.setdefault(k, []).append(i)
+    if merged:
+        ids = np.array([merged.get(int(r), int(r)) for r in ids], dtype=np.int32)
+    return ids
+
+
+def representatives(ids: np.ndarray) -> np.ndarray:
+    """Indices of the cluster representatives, ascending."""
+    return np.flatnonzero(ids == np.arange(len(ids)))
+
+
+def duplicates(ids: np.ndarray) -> np.ndarray:
+    """Per title, how many other titles share its cluster."""
+    return np.bincount(ids, minlength=len(ids))[ids] - 1
@@ -3,17 +3,42 @@
 Uses `pandas-ta` when available (~2MB, Vercel-compatible). Every feature is
 lagged by ≥1 trading day to prevent lookahead. Target is the next-day log
 return, not price.
+
+`IncrementalFeatures` keeps the rolling state per ticker so a new daily bar
+appends one row in O(features) instead of rebuilding the whole matrix;
+`for_symbol` keeps one per ticker and window (`RW_FEATURE_ENGINES`, LRU) and
+is what the pipeline trains and scores on.
 """
 from __future__ import annotations
-from typing import Optional
+import math
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import List, Optional, Sequence, Tuple
 import numpy as np
 import pandas as pd
 
-try:
-    import pandas_ta as ta
-    _HAS_TA = True
-except Exception:
-    _HAS_TA = False
+ENGINES = int(os.getenv("RW_FEATURE_ENGINES", "64"))
+
+_TA = None  # pandas_ta module once imported, False if unavailable
+
+
+def _pandas_ta():
+    """pandas_ta, imported on first use; None if it isn't installed."""
+    global _TA
+    if _TA is None:
+        try:
+            import pandas_ta
+            _TA = pandas_ta
+        except Exception:
+            _TA = False
+    return _TA or None
+
+
+def __getattr__(name: str):
+    if name == "_HAS_TA":
+        return _pandas_ta() is not None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 SECTOR_ETF = {
@@ -41,16 +66,18 @@ def _fallback_atr(high: pd.Series, low: pd.Series, close: pd.Series, length: int
 def build_features(df: pd.DataFrame, vix: Optional[pd.Series] = None,
                    sector_series: Optional[pd.Series] = None,
                    news_velocity: Optional[pd.Series] = None,
-                   event_flags: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+                   event_flags: Optional[pd.DataFrame] = None,
+                   use_ta: Optional[bool] = None) -> pd.DataFrame:
     """Build the feature matrix.
 
     Required df columns: open, high, low, close, volume. Index must be
-    DatetimeIndex at daily frequency (trading days).
+    DatetimeIndex at daily frequency (trading days). `use_ta=False` forces
+    the pure-pandas technicals even when pandas-ta is installed (the path
+    `IncrementalFeatures` reproduces).
     """
-    df = df.copy()
-    df.columns = [c.lower() for c in df.columns]
-    if "adj close" in df.columns and "close" not in df.columns:
-        df["close"] = df["adj close"]
+    if use_ta is None:
+        use_ta = _pandas_ta() is not None
+    df = _lower(df)
 
     close = df["close"]
     high = df["high"]
@@ -66,7 +93,10 @@ def build_features(df: pd.DataFrame, vix: Optional[pd.Series] = None,
     for w in (5, 21, 63):
         f[f"rv_{w}"] = f["ret_1"].rolling(w).std()
     # technicals
-    if _HAS_TA:
+    if use_ta:
+        ta = _pandas_ta()
+        if ta is None:
+            raise RuntimeError("pandas_ta not installed")
         f["rsi_14"] = ta.rsi(close, length=14)
         macd = ta.macd(close)
         if macd is not None:
@@ -161,3 +191,362 @@ def event_flags_for(dates: pd.DatetimeIndex, earnings: Optional[list] = None) ->
             flags.append(near)
         df["is_earnings_window"] = flags
     return df.astype(int)
+
+
+# --------------------------------------------------------------------------
+# Incremental engine
+# --------------------------------------------------------------------------
+
+_NAN = float("nan")
+_INF = float("inf")
+
+
+def _div(a: float, b: float) -> float:
+    """Scalar division with pandas semantics: x/0 → ±inf, 0/0 and NaN → NaN."""
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != a or a == 0:
+            return _NAN
+        return math.copysign(_INF, a) * math.copysign(1.0, b)
+
+
+def _log_ratio(a: float, b: float) -> float:
+    r = _div(a, b)
+    if r > 0:
+        return math.log(r)
+    return -_INF if r == 0 else _NAN
+
+
+class _Rolling:
+    """Fixed-length window with running sum / sum of squares.
+
+    `mean`/`std` are NaN until the window is full or while it holds a NaN,
+    like `Series.rolling(n)` with the default `min_periods`. The sums are
+    rebuilt from the window once per `n` updates so float drift can't build
+    up over years of appends.
+    """
+    __slots__ = ("n", "buf", "sum", "sumsq", "nans", "_since")
+
+    def __init__(self, n: int):
+        self.n = n
+        self.buf: deque = deque()
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.nans = 0
+        self._since = 0
+
+    def push(self, x: float):
+        buf = self.buf
+        buf.append(x)
+        if x != x:
+            self.nans += 1
+        else:
+            self.sum += x
+            self.sumsq += x * x
+        if len(buf) > self.n:
+            old = buf.popleft()
+            if old != old:
+                self.nans -= 1
+            else:
+                self.sum -= old
+                self.sumsq -= old * old
+        self._since += 1
+        if self._since >= self.n:
+            vals = [v for v in buf if v == v]
+            self.sum = math.fsum(vals)
+            self.sumsq = math.fsum([v * v for v in vals])
+            self._since = 0
+
+    def mean(self) -> float:
+        if len(self.buf) < self.n or self.nans:
+            return _NAN
+        return self.sum / self.n
+
+    def std(self) -> float:
+        n = self.n
+        if len(self.buf) < n or self.nans or n < 2:
+            return _NAN
+        mean = self.sum / n
+        var = (self.sumsq - n * mean * mean) / (n - 1)
+        # constant windows: report exactly 0 like pandas does
+        if var <= 1e-14 * (self.sumsq / n):
+            return 0.0
+        return math.sqrt(var)
+
+
+class _Ewm:
+    """`Series.ewm(span=..., adjust=False).mean()` one value at a time."""
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, span: int):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = _NAN
+
+    def push(self, x: float) -> float:
+        if self.value != self.value:
+            self.value = x
+        elif x == x:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class IncrementalFeatures:
+    """Per-ticker streaming version of `build_features`.
+
+    Keeps the rolling state (EWMs, window sums, OBV accumulator, the last 22
+    closes) so a new daily bar costs O(features) instead of a full rebuild.
+    `update` returns the feature row the new bar completes — the previous
+    trading day's row (features as of the day before it, `y_logret` = today's
+    return) — or None while the windows are still warming up. Rows match
+    `build_features(..., use_ta=False)` for the same inputs, to float
+    rounding (rolling sums vs pandas' own rolling kernels).
+
+    Optional inputs mirror `build_features`: enable them at construction and
+    pass the per-bar values to `update` (missing VIX / sector values carry
+    the last one forward, missing news counts are 0).
+    """
+
+    def __init__(self, vix: bool = False, sector: bool = False,
+                 news_velocity: bool = False, event_cols: Sequence[str] = (),
+                 index_name: Optional[str] = None):
+        self.has_vix = vix
+        self.has_sector = sector
+        self.has_news = news_velocity
+        self.event_cols = list(event_cols)
+        self.index_name = index_name
+        cols = ["ret_1", "ret_2", "ret_5", "ret_10", "ret_21",
+                "rv_5", "rv_21", "rv_63",
+                "rsi_14", "macd", "macd_signal", "macd_hist",
+                "bb_lower", "bb_upper", "bb_pos", "atr_14", "obv", "vol_z_21"]
+        if vix:
+            cols += ["vix", "vix_delta"]
+        if sector:
+            cols.append("sector_rs_1")
+        if news_velocity:
+            cols.append("news_velocity_z")
+        cols += self.event_cols
+        cols.append("dow")
+        self.columns = cols + ["y_logret"]
+
+        self._closes: deque = deque(maxlen=22)
+        self._rv = [_Rolling(w) for w in (5, 21, 63)]
+        self._gain = _Rolling(14)
+        self._loss = _Rolling(14)
+        self._ema12 = _Ewm(12)
+        self._ema26 = _Ewm(26)
+        self._signal = _Ewm(9)
+        self._close20 = _Rolling(20)
+        self._tr = _Rolling(14)
+        self._obv = 0.0
+        self._vol21 = _Rolling(21)
+        self._vix = _NAN
+        self._sector = _NAN
+        self._news = _Rolling(30)
+        # raw (unlagged) rows for the last three bars, and their dates
+        self._prev: deque = deque(maxlen=3)
+        self._dates: deque = deque(maxlen=3)
+        # completed rows, one spare slot at the end for `frame(close=...)`
+        self._index: List[pd.Timestamp] = []
+        self._rows = np.empty((256, len(self.columns)), dtype=np.float64)
+        self._n = 0
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, vix: Optional[pd.Series] = None,
+                     sector_series: Optional[pd.Series] = None,
+                     news_velocity: Optional[pd.Series] = None,
+                     event_flags: Optional[pd.DataFrame] = None) -> "IncrementalFeatures":
+        """Warm an engine up on a history, taking the same arguments as
+        `build_features`. Afterwards `frame()` equals the batch output."""
+        df = _lower(df)
+        eng = cls(vix=vix is not None, sector=sector_series is not None,
+                  news_velocity=news_velocity is not None,
+                  event_cols=list(event_flags.columns) if event_flags is not None else (),
+                  index_name=df.index.name)
+        idx = df.index
+        n = len(idx)
+        none = [None] * n
+        vv = vix.reindex(idx).to_numpy(dtype=float).tolist() if vix is not None else none
+        sv = (sector_series.reindex(idx).to_numpy(dtype=float).tolist()
+              if sector_series is not None else none)
+        nv = (news_velocity.reindex(idx).to_numpy(dtype=float).tolist()
+              if news_velocity is not None else none)
+        ev = (event_flags.reindex(idx).fillna(0).astype(int).to_dict("records")
+              if event_flags is not None else none)
+        o, h, l, c, v = (df[k].to_numpy(dtype=float).tolist()
+                         for k in ("open", "high", "low", "close", "volume"))
+        for i, ts in enumerate(idx):
+            eng._push(ts, h[i], l[i], c[i], v[i], vv[i], sv[i], nv[i], ev[i])
+        return eng
+
+    def update(self, date, open_: float, high: float, low: float, close: float,
+               volume: float, vix: Optional[float] = None, sector: Optional[float] = None,
+               news: Optional[float] = None, events: Optional[dict] = None) -> Optional[dict]:
+        """Append one bar (`date` a Timestamp or datetime). Returns the
+        completed feature row as a dict (with `date`), or None if that row
+        would be dropped by `dropna`."""
+        if not self._push(date, float(high), float(low), float(close), float(volume),
+                          None if vix is None else float(vix),
+                          None if sector is None else float(sector),
+                          None if news is None else float(news), events):
+            return None
+        return {"date": self._index[-1], **dict(zip(self.columns, self._rows[self._n - 1].tolist()))}
+
+    def _push(self, date, high: float, low: float, close: float, volume: float,
+              vix: Optional[float], sector: Optional[float], news: Optional[float],
+              events: Optional[dict]) -> bool:
+        closes = self._closes
+        prev_close = closes[-1] if closes else _NAN
+        row: List[float] = []
+
+        ret_1 = _log_ratio(close, prev_close)
+        row.append(ret_1)
+        for lag in (2, 5, 10, 21):
+            row.append(_log_ratio(close, closes[-lag]) if len(closes) >= lag else _NAN)
+        for r in self._rv:
+            r.push(ret_1)
+            row.append(r.std())
+
+        # RSI: NaN deltas count as 0 gain / 0 loss, as in `_fallback_rsi`
+        delta = close - prev_close
+        self._gain.push(delta if delta > 0 else 0.0)
+        self._loss.push(-delta if delta < 0 else 0.0)
+        loss = self._loss.mean()
+        rs = _div(self._gain.mean(), loss) if loss != 0 else _NAN
+        row.append(100 - _div(100.0, 1 + rs))
+
+        macd = self._ema12.push(close) - self._ema26.push(close)
+        signal = self._signal.push(macd)
+        row += [macd, signal, macd - signal]
+
+        self._close20.push(close)
+        sma20, sd20 = self._close20.mean(), self._close20.std()
+        lower, upper = sma20 - 2 * sd20, sma20 + 2 * sd20
+        width = upper - lower
+        row += [lower, upper, _div(close - lower, width) if width != 0 else _NAN]
+
+        # true range: max over the parts that aren't NaN, like `max(axis=1)`
+        tr = [x for x in (high - low, abs(high - prev_close), abs(low - prev_close)) if x == x]
+        self._tr.push(max(tr) if tr else _NAN)
+        row.append(self._tr.mean())
+
+        if delta == delta and delta != 0:
+            self._obv += volume if delta > 0 else -volume
+        row.append(self._obv)
+
+        self._vol21.push(volume)
+        row.append(_div(volume - self._vol21.mean(), self._vol21.std()))
+
+        if self.has_vix:
+            prev_vix = self._vix
+            if vix is not None and vix == vix:
+                self._vix = vix
+            row += [self._vix, self._vix - prev_vix]
+        if self.has_sector:
+            prev_sector = self._sector
+            if sector is not None and sector == sector:
+                self._sector = sector
+            row.append(ret_1 - _log_ratio(self._sector, prev_sector))
+        if self.has_news:
+            nv = news if news is not None and news == news else 0.0
+            self._news.push(nv)
+            row.append(_div(nv - self._news.mean(), self._news.std()))
+        for col in self.event_cols:
+            val = (events or {}).get(col, 0)
+            row.append(float(int(val)) if val == val else 0.0)
+        row.append(float(date.weekday()))
+
+        closes.append(close)
+        self._prev.append(row)
+        self._dates.append(date)
+        if len(self._prev) < 3:
+            return False
+        # yesterday's row: features lagged one bar, target is today's return
+        return self._complete(self._prev[0], ret_1, self._dates[1], advance=True)
+
+    def _complete(self, features: List[float], target: float, date, advance: bool) -> bool:
+        if target != target or any(x != x for x in features):
+            return False
+        n = self._n
+        if n + 1 >= len(self._rows):
+            self._rows = np.concatenate([self._rows, np.empty_like(self._rows)])
+        self._rows[n, :-1] = features
+        self._rows[n, -1] = target
+        if advance:
+            self._index.append(date)
+            self._n = n + 1
+        return True
+
+    def frame(self, close: Optional[float] = None, date=None) -> pd.DataFrame:
+        """Every completed row so far, shaped like `build_features` output.
+
+        With `close` (and its bar's `date`), also the row a next bar closing
+        there would complete, without appending that bar: a bar that is
+        still moving (today's, intraday) can be scored and then replaced.
+        """
+        n = self._n
+        index = self._index
+        if close is not None and len(self._prev) >= 2 and self._closes:
+            if self._complete(self._prev[-2], _log_ratio(float(close), self._closes[-1]),
+                              None, advance=False):
+                n += 1
+                index = index + [self._dates[-1]]
+        return pd.DataFrame(self._rows[:n].copy(), columns=self.columns,
+                            index=pd.DatetimeIndex(index, name=self.index_name))
+
+
+def _lower(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` with lower-case columns and `close` filled from `adj close`."""
+    df = df.copy()
+    df.columns = [c.lower() for c in df.columns]
+    if "adj close" in df.columns and "close" not in df.columns:
+        df["close"] = df["adj close"]
+    return df
+
+
+_KEPT: "OrderedDict[Tuple[str, int, bool], Tuple[IncrementalFeatures, np.ndarray, np.ndarray]]" = OrderedDict()
+_KEPT_LOCK = threading.Lock()
+
+
+def for_symbol(symbol: str, df: pd.DataFrame, vix: Optional[pd.Series] = None) -> pd.DataFrame:
+    """`build_features(df, vix=vix)` for one ticker's price window.
+
+    Without pandas-ta the rows come from an `IncrementalFeatures` kept per
+    (ticker, window start): when `df` repeats the bars it saw last time and
+    adds some, only the new ones are appended. The newest bar is scored but
+    never appended (`frame(close=...)`), so today's bar may keep moving
+    intraday. A history that changed (re-adjusted for a split, VIX revised)
+    rebuilds the engine, which costs about what the batch path does.
+    """
+    if ENGINES <= 0 or _pandas_ta() is not None or len(df) < 2:
+        return build_features(df, vix=vix)
+    low = _lower(df)
+    idx = low.index
+    dates = idx.asi8
+    cols = [low[k].to_numpy(dtype=float) for k in ("high", "low", "close", "volume")]
+    if vix is not None:
+        cols.append(vix.reindex(idx).to_numpy(dtype=float))
+    inputs = np.column_stack(cols)
+    last = len(idx) - 1
+    key = (symbol, int(dates[0]), vix is not None)
+    with _KEPT_LOCK:
+        kept = _KEPT.pop(key, None)  # taken: one caller per engine at a time
+    start = 0
+    if kept is not None:
+        eng, seen_dates, seen_inputs = kept
+        start = len(seen_dates)
+        if not (start <= last and np.array_equal(dates[:start], seen_dates)
+                and np.array_equal(inputs[:start], seen_inputs, equal_nan=True)):
+            kept, start = None, 0
+    if kept is None:
+        eng = IncrementalFeatures(vix=vix is not None, index_name=idx.name)
+    new = inputs[start:last].tolist()
+    for ts, bar in zip(idx[start:last], new):
+        eng._push(ts, bar[0], bar[1], bar[2], bar[3], bar[4] if vix is not None else None,
+                  None, None, None)
+    out = eng.frame(close=inputs[last, 2])
+    with _KEPT_LOCK:
+        _KEPT[key] = (eng, dates[:last], inputs[:last])
+        while len(_KEPT) > ENGINES:
+            _KEPT.popitem(last=False)
+    return out
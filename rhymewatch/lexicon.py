@@ -1,6 +1,8 @@
 """Tier 0 sentiment: regex/lexicon pass for WSB slang + emoji.
 
-Returns a decision in <1ms when the text has a strong short-form signal. The
+Returns a decision in <1ms when the text has a strong short-form signal.
+Words, multi-word phrases and emoji are found in one regex pass; use
+`lexicon_score_batch` to score many texts at once. The
 motivation is that FinBERT and most financial-news-trained classifiers register
 "tendies", "diamond hands", 🚀, 💀 as noise — a retail-focused app needs to
 read those correctly before escalating to a heavier model.
@@ -8,6 +10,9 @@ read those correctly before escalating to a heavier model.
 from __future__ import annotations
 import re
 from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
 
 BULLISH = {
     # WSB / retail
@@ -24,7 +29,32 @@ BEARISH = {
     "down big", "red", "bleeding", "💀", "📉", "🐻", "🧻", "🩸",
 }
 
-_WORD_RE = re.compile(r"[\w']+|[\U0001F300-\U0001FAFF]", re.UNICODE)
+# Counted as bullish by the old phrase scan without being listed in BULLISH.
+_EXTRA_BULLISH = {"all time high"}
+
+_POLARITY = {**{t: -1 for t in BEARISH}, **{t: 1 for t in BULLISH | _EXTRA_BULLISH}}
+
+
+def _compile_matcher() -> "re.Pattern[str]":
+    """One alternation that finds phrases, words and emoji in a single pass.
+
+    Multi-word entries come first (longest first) so "short squeeze" wins
+    over "short"; then plain word tokens; then emoji, including lexicon
+    emoji outside the U+1F300 block (✨).
+    """
+    phrases = sorted((t for t in _POLARITY if " " in t), key=len, reverse=True)
+    symbols = sorted(t for t in _POLARITY if not re.fullmatch(r"[\w' ]+", t))
+    parts = []
+    if phrases:
+        parts.append(r"(?<![\w'])(?:%s)(?![\w'])" % "|".join(map(re.escape, phrases)))
+    parts.append(r"[\w']+")
+    parts.append(r"[\U0001F300-\U0001FAFF]")
+    if symbols:
+        parts.append("|".join(re.escape(e) for e in symbols))
+    return re.compile("|".join(parts), re.UNICODE)
+
+
+_MATCHER = _compile_matcher()
 
 
 @dataclass
@@ -35,17 +65,43 @@ class LexResult:
     hits_neg: int
 
 
+_LABELS = {1: "positive", -1: "negative", 0: "neutral"}
+
+
+@dataclass
+class LexBatch:
+    """Column-wise tier-0 results for a batch of texts."""
+    hits_pos: np.ndarray     # int32
+    hits_neg: np.ndarray     # int32
+    score: np.ndarray        # float64 confidence, as LexResult.score
+    label: np.ndarray        # int8: 1 positive, -1 negative, 0 neutral
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def result(self, i: int) -> LexResult:
+        return LexResult(_LABELS[int(self.label[i])], float(self.score[i]),
+                         int(self.hits_pos[i]), int(self.hits_neg[i]))
+
+
+def _hits(text: str):
+    pos = neg = 0
+    polarity = _POLARITY.get
+    for tok in _MATCHER.findall(text.lower()):
+        p = polarity(tok)
+        if p is None:
+            continue
+        if p > 0:
+            pos += 1
+        else:
+            neg += 1
+    return pos, neg
+
+
 def lexicon_score(text: str) -> LexResult:
     if not text:
         return LexResult("neutral", 0.0, 0, 0)
-    tokens = [t.lower() for t in _WORD_RE.findall(text)]
-    pos = sum(1 for t in tokens if t in BULLISH)
-    neg = sum(1 for t in tokens if t in BEARISH)
-    # also catch multi-word phrases
-    lower = text.lower()
-    for phrase in ("diamond hands", "short squeeze", "down big", "all time high"):
-        if phrase in lower:
-            pos += 1
+    pos, neg = _hits(text)
     total = pos + neg
     if total == 0:
         return LexResult("neutral", 0.0, 0, 0)
@@ -55,6 +111,17 @@ def lexicon_score(text: str) -> LexResult:
     return LexResult(label, confidence, pos, neg)
 
 
+def lexicon_score_batch(texts: Sequence[str]) -> LexBatch:
+    """`lexicon_score` over many texts with the scoring done in NumPy."""
+    counts = np.array([_hits(t) if t else (0, 0) for t in texts], dtype=np.int32).reshape(-1, 2)
+    pos, neg = counts[:, 0], counts[:, 1]
+    total = pos + neg
+    raw = (pos - neg) / np.maximum(total, 1)
+    label = np.where(raw > 0.2, 1, np.where(raw < -0.2, -1, 0)).astype(np.int8)
+    score = np.where(total > 0, np.minimum(1.0, np.abs(raw) + 0.1 * total), 0.0)
+    return LexBatch(hits_pos=pos, hits_neg=neg, score=score, label=label)
+
+
 def is_strong_signal(text: str, threshold: float = 0.6) -> bool:
     """Return True when the lexicon produces a confident enough read to skip
     the heavier ONNX/LLM tiers."""
@@ -6,13 +6,49 @@ explicitly asks for aspect-based sentiment.
 
 Cost: ~$0.000032 per short headline at Flash-Lite pricing. A sane cache
 (Upstash Redis, 1–6h TTL) keeps a hobby project well under $5/mo.
+
+`escalate_batch` packs up to `RW_LLM_BATCH` texts (default 16) into one
+prompt as an indexed JSON array, so a noisy ticker costs one round-trip
+instead of thirty. Each returned item is validated on its own; a missing or
+malformed one comes back as None and the caller keeps its tier-1 result.
+One `genai.Client` is created per process and reused.
+
+Requests go through `EXECUTOR` (`EscalationExecutor`): bounded concurrency
+(RW_LLM_CONCURRENCY), a token-bucket rate limit (RW_LLM_RPS/RW_LLM_BURST),
+a per-request deadline counted from submission, queueing included
+(RW_LLM_DEADLINE, plus RW_LLM_DEADLINE_PER_TEXT for each further text packed
+into the request) and a rolling spend/request budget
+(RW_LLM_BUDGET_USD, RW_LLM_MAX_REQUESTS per RW_LLM_BUDGET_WINDOW seconds;
+the $0.15/day default keeps an instance under $5/mo). Whatever is rejected degrades to the
+tier-1 result, so escalation adds at most the deadline to a request.
+`stats()` and /api/metrics report requests, outcomes and rejections.
 """
 from __future__ import annotations
 import os
 import json
 import re
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future
 from dataclasses import dataclass, asdict
-from typing import List, Optional
+from functools import partial
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from . import metrics
+
+MODEL = "gemini-2.5-flash-lite"
+BATCH = int(os.getenv("RW_LLM_BATCH", "16"))
+
+# Flash-Lite list prices, USD per 1M tokens
+_PRICE_IN, _PRICE_OUT = 0.10, 0.40
+
+SENTIMENTS = ("positive", "negative", "neutral")
+ASPECTS = ("earnings", "guidance", "management", "macro", "product", "legal", "M&A", "rumor")
+
+_CLIENT: Any = None
+_CLIENT_LOCK = threading.Lock()
 
 SARCASM_MARKERS = re.compile(
     r"\b(yeah right|sure jan|lmao|🤡|/s|obviously|this time for sure)\b", re.I
@@ -37,51 +73,452 @@ def needs_escalation(text: str, tier1_confidence: float, n_tickers: int = 0) ->
     return tier1_confidence < 0.70
 
 
-def escalate(text: str) -> Optional[AspectResult]:
-    """Return None if GEMINI_API_KEY is not configured or the call fails."""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key or not text:
+def _client():
+    """The shared `genai.Client`; None if GEMINI_API_KEY or google-genai is
+    missing. Anything with `.models.generate_content` can be put in
+    `_CLIENT` instead (the benchmarks use an offline stub)."""
+    global _CLIENT
+    if _CLIENT is None:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            return None
+        try:
+            from google import genai
+        except ImportError:
+            return None
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                _CLIENT = genai.Client(api_key=api_key)
+    return _CLIENT
+
+
+_FIELDS = (
+    "  sentiment: one of positive, negative, neutral\n"
+    "  confidence: 0-1 float\n"
+    "  aspect: one of earnings, guidance, management, macro, product, legal, M&A, rumor\n"
+    "  targets: array of ticker symbols mentioned (uppercase)\n"
+    "  is_sarcastic: boolean\n"
+    "  reasoning: one sentence\n"
+)
+
+
+def _parse(data: Any) -> Optional[AspectResult]:
+    """An AspectResult from one model output object, None if it's malformed."""
+    if not isinstance(data, dict):
         return None
+    sentiment = data.get("sentiment")
+    targets = data.get("targets", [])
     try:
-        from google import genai
-        from google.genai import types as gt
-    except ImportError:
+        confidence = float(data.get("confidence", 0.5))
+    except (TypeError, ValueError):
         return None
-    client = genai.Client(api_key=api_key)
-    prompt = (
-        "Classify the financial sentiment of the text below. Output JSON only. "
-        "Fields:\n"
-        "  sentiment: one of positive, negative, neutral\n"
-        "  confidence: 0-1 float\n"
-        "  aspect: one of earnings, guidance, management, macro, product, legal, M&A, rumor\n"
-        "  targets: array of ticker symbols mentioned (uppercase)\n"
-        "  is_sarcastic: boolean\n"
-        "  reasoning: one sentence\n\n"
-        f"Text: {text}"
+    if sentiment not in SENTIMENTS or not 0.0 <= confidence <= 1.0:
+        return None
+    if not isinstance(targets, list) or not all(isinstance(t, str) for t in targets):
+        return None
+    aspect = data.get("aspect", "rumor")
+    return AspectResult(
+        sentiment=sentiment,
+        confidence=confidence,
+        aspect=aspect if aspect in ASPECTS else "rumor",
+        targets=[t.upper() for t in targets],
+        is_sarcastic=bool(data.get("is_sarcastic", False)),
+        reasoning=str(data.get("reasoning", "")),
     )
-    try:
-        resp = client.models.generate_content(
-            model="gemini-2.5-flash-lite",
-            contents=prompt,
-            config=gt.GenerateContentConfig(
-                response_mime_type="application/json",
-                temperature=0.0,
-                max_output_tokens=200,
-            ),
-        )
-        raw = resp.text or "{}"
-        data = json.loads(raw)
-        return AspectResult(
-            sentiment=data.get("sentiment", "neutral"),
-            confidence=float(data.get("confidence", 0.5)),
-            aspect=data.get("aspect", "rumor"),
-            targets=list(data.get("targets", [])),
-            is_sarcastic=bool(data.get("is_sarcastic", False)),
-            reasoning=data.get("reasoning", ""),
+
+
+def _cost(tokens_in: int, tokens_out: int) -> float:
+    return (tokens_in * _PRICE_IN + tokens_out * _PRICE_OUT) / 1e6
+
+
+def _usage_cost(resp: Any, estimate: float) -> float:
+    usage = getattr(resp, "usage_metadata", None)
+    tokens_in = getattr(usage, "prompt_token_count", None)
+    tokens_out = getattr(usage, "candidates_token_count", None)
+    if tokens_in is None or tokens_out is None:
+        return estimate
+    return _cost(int(tokens_in), int(tokens_out))
+
+
+def _rate_limited(e: Exception) -> bool:
+    """A 429 from the API: `google.genai.errors.APIError` carries `.code` and
+    `.status`, httpx errors `.response.status_code`. The message is not
+    looked at; any text can contain "429"."""
+    code = getattr(e, "code", None)
+    if code is None:
+        code = getattr(e, "status_code", None)
+    if code is None:
+        code = getattr(getattr(e, "response", None), "status_code", None)
+    return code == 429 or getattr(e, "status", None) == "RESOURCE_EXHAUSTED"
+
+
+class _TokenBucket:
+    """`rate` requests/s refill, up to `burst` banked; rate <= 0 is unlimited."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.t = time.monotonic()
+        self.paused_until = 0.0
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0: take it now)."""
+        if self.rate <= 0:
+            return max(0.0, self.paused_until - now)
+        self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.paused_until - now)
+
+    def take(self):
+        if self.rate > 0:
+            self.tokens -= 1
+
+    def pause(self, now: float, seconds: float):
+        self.paused_until = max(self.paused_until, now + seconds)
+
+
+class _Budget:
+    """Spend and request count over a rolling `window` seconds."""
+
+    def __init__(self, usd: float, requests: int, window: float):
+        self.usd = usd
+        self.requests = requests
+        self.window = window
+        self.entries: Deque[List[float]] = deque()   # [time, cost]
+        self.spent = 0.0
+
+    def _trim(self, now: float):
+        while self.entries and self.entries[0][0] <= now - self.window:
+            self.spent -= self.entries.popleft()[1]
+
+    def reserve(self, now: float, cost: float) -> Optional[List[float]]:
+        """Book a request at its estimated cost; None if that would overrun."""
+        self._trim(now)
+        if self.requests > 0 and len(self.entries) >= self.requests:
+            return None
+        if self.usd > 0 and self.spent + cost > self.usd:
+            return None
+        entry = [now, cost]
+        self.entries.append(entry)
+        self.spent += cost
+        return entry
+
+    def settle(self, entry: List[float], cost: float):
+        """Replace a booking's estimate with the actual cost."""
+        if entry[0] > time.monotonic() - self.window:   # still in the window
+            self.spent += cost - entry[1]
+        entry[1] = cost
+
+    def refund(self, entry: List[float]):
+        """Drop a booking whose request produced no billable response."""
+        for i, e in enumerate(self.entries):
+            if e is entry:
+                del self.entries[i]
+                self.spent -= entry[1]
+                break
+
+
+class EscalationExecutor:
+    """Runs tier-2 requests on a private asyncio loop (one daemon thread).
+
+    Every request has a deadline and, in order, needs: a slot of the
+    `concurrency` semaphore, a token from the `rate` / `burst` bucket, and
+    room in the rolling `budget_usd` / `max_requests` budget (0 disables
+    either), booked at an estimate and settled from the response's token
+    usage. A request that can't get one of these in time is rejected and its
+    texts keep their tier-1 result. A 429 pauses the bucket for `backoff`
+    seconds (doubling, capped at 30s) and the request is retried once if its
+    deadline allows; a 429 or failed call refunds its booking.
+
+    The deadline runs from `submit`, not from getting a slot: it bounds what
+    escalation adds to the caller's latency, so time spent queueing for a
+    slot or a token counts against it. With the 3s default and slow
+    responses, a burst larger than `concurrency` mostly ends in
+    "concurrency" rejections. A batched request has to generate an answer
+    per text, so it gets `per_text` more seconds for every text after the
+    first (3s + 15 * 0.3s for a default batch of 16).
+
+    A call past its deadline is given up on but not abandoned: a blocking
+    client keeps running in its thread, and may still be billed. It keeps its
+    semaphore slot (and `in_flight`) until it returns, then settles or
+    refunds its booking, so the concurrency cap holds for real calls.
+
+    Budget and rate state are per process.
+    """
+
+    def __init__(self, concurrency: int = 4, rate: float = 4.0, burst: int = 8,
+                 deadline: float = 3.0, per_text: float = 0.3, budget_usd: float = 0.15,
+                 max_requests: int = 5000, window: float = 86400.0,
+                 backoff: float = 1.0):
+        self.concurrency = max(1, concurrency)
+        self.deadline = deadline
+        self.per_text = per_text
+        self.backoff = backoff
+        self.bucket = _TokenBucket(rate, burst)
+        self.budget = _Budget(budget_usd, max_requests, window)
+        self._backoff = backoff
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._stats: Dict[str, float] = {"requests": 0, "texts": 0, "ok": 0,
+                                         "errors": 0, "throttled": 0}
+        self._rejected: Dict[str, int] = {}
+
+    @classmethod
+    def from_env(cls) -> "EscalationExecutor":
+        return cls(
+            concurrency=int(os.getenv("RW_LLM_CONCURRENCY", "4")),
+            rate=float(os.getenv("RW_LLM_RPS", "4")),
+            burst=int(os.getenv("RW_LLM_BURST", "8")),
+            deadline=float(os.getenv("RW_LLM_DEADLINE", "3")),
+            per_text=float(os.getenv("RW_LLM_DEADLINE_PER_TEXT", "0.3")),
+            budget_usd=float(os.getenv("RW_LLM_BUDGET_USD", "0.15")),
+            max_requests=int(os.getenv("RW_LLM_MAX_REQUESTS", "5000")),
+            window=float(os.getenv("RW_LLM_BUDGET_WINDOW", "86400")),
         )
-    except Exception:
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="rw-llm", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def close(self):
+        """Stop the loop thread once its calls have returned; a later request
+        starts a new one."""
+        with self._lock:
+            loop, self._loop, self._sem = self._loop, None, None
+        if loop is not None:
+            loop.call_soon_threadsafe(self._stop_when_idle, loop)
+
+    @staticmethod
+    def _stop_when_idle(loop: asyncio.AbstractEventLoop):
+        pending = asyncio.all_tasks(loop)
+        if not pending:
+            loop.stop()
+            return
+        asyncio.gather(*pending, return_exceptions=True).add_done_callback(
+            lambda _: loop.stop())
+
+    def timeout(self, n_texts: int) -> float:
+        """Seconds a job packing `n_texts` texts may take from submission."""
+        return self.deadline + self.per_text * max(0, n_texts - 1)
+
+    def submit(self, client, jobs: Sequence[Tuple[str, int, int]]) -> "Future[List[Any]]":
+        """Schedule (prompt, max_output_tokens, n_texts) jobs; the future
+        resolves to one decoded JSON document (or None) per job."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._gather(client, jobs, time.monotonic()), loop)
+
+    def run(self, client, jobs: Sequence[Tuple[str, int, int]]) -> List[Any]:
+        """`submit` and wait; every job is done or rejected by its deadline."""
+        fut = self.submit(client, jobs)
+        try:
+            return fut.result(timeout=max((self.timeout(n) for _, _, n in jobs), default=0.0) + 1.0)
+        except Exception as e:
+            fut.cancel()
+            print(f"llm executor: {e!r}")
+            return [None] * len(jobs)
+
+    async def _gather(self, client, jobs, start: float) -> List[Any]:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.concurrency)
+        return list(await asyncio.gather(
+            *(self._request(client, prompt, max_tokens, n, start + self.timeout(n))
+              for prompt, max_tokens, n in jobs)))
+
+    def _count(self, key: str, n: int = 1):
+        with self._lock:
+            self._stats[key] = self._stats.get(key, 0) + n
+        metrics.inc("rw_llm_requests_total", n, outcome=key)
+
+    def _reject(self, reason: str) -> None:
+        with self._lock:
+            self._rejected[reason] = self._rejected.get(reason, 0) + 1
+        metrics.inc("rw_llm_rejected_total", reason=reason)
         return None
 
+    async def _request(self, client, prompt: str, max_tokens: int, n: int,
+                       deadline: float) -> Any:
+        sem = self._sem
+        try:
+            await asyncio.wait_for(sem.acquire(), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            return self._reject("concurrency")
+        held = True
+        try:
+            for attempt in (0, 1):
+                while True:
+                    now = time.monotonic()
+                    wait = self.bucket.delay(now)
+                    if wait <= 0:
+                        break
+                    if now + wait >= deadline:
+                        return self._reject("rate_limit")
+                    await asyncio.sleep(wait)
+                self.bucket.take()
+                estimate = _cost(len(prompt) // 4, max_tokens)
+                entry = self.budget.reserve(now, estimate)
+                if entry is None:
+                    return self._reject("budget")
+                self._count("requests")
+                self._count("texts", n)
+                call = asyncio.ensure_future(self._call(client, prompt, max_tokens))
+                with self._lock:
+                    self._in_flight += 1
+                call.add_done_callback(self._call_done)
+                done, _ = await asyncio.wait({call}, timeout=max(0.0, deadline - time.monotonic()))
+                if not done:
+                    held = False    # handed to the call; see _orphan_done
+                    call.add_done_callback(partial(self._orphan_done, sem, entry, estimate))
+                    return self._reject("deadline")
+                try:
+                    resp = call.result()
+                except Exception as e:
+                    self.budget.refund(entry)
+                    if not _rate_limited(e):
+                        self._count("errors")
+                        print(f"llm request failed: {e}")
+                        return None
+                    self._count("throttled")
+                    now = time.monotonic()
+                    self.bucket.pause(now, self._backoff)
+                    retry_at = now + self._backoff
+                    self._backoff = min(30.0, self._backoff * 2)
+                    if attempt or retry_at >= deadline:
+                        return self._reject("rate_limit")
+                    continue
+                self._backoff = self.backoff
+                self.budget.settle(entry, _usage_cost(resp, estimate))
+                try:
+                    data = json.loads(resp.text or "null")
+                except ValueError:
+                    self._count("errors")
+                    return None
+                self._count("ok")
+                return data
+            return None
+        finally:
+            if held:
+                sem.release()
+
+    def _call_done(self, call: "asyncio.Future[Any]"):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _orphan_done(self, sem: asyncio.Semaphore, entry: List[float], estimate: float,
+                     call: "asyncio.Future[Any]"):
+        """A call that outlived its deadline returned: free its slot and
+        settle its booking (refund it if nothing came back)."""
+        sem.release()
+        if call.cancelled() or call.exception() is not None:
+            self.budget.refund(entry)
+        else:
+            self.budget.settle(entry, _usage_cost(call.result(), estimate))
+
+    @staticmethod
+    async def _call(client, prompt: str, max_tokens: int) -> Any:
+        kwargs = dict(
+            model=MODEL,
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json",
+                "temperature": 0.0,
+                "max_output_tokens": max_tokens,
+            },
+        )
+        aio = getattr(client, "aio", None)
+        if aio is not None:
+            return await aio.models.generate_content(**kwargs)
+        return await asyncio.to_thread(client.models.generate_content, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["rejected"] = dict(self._rejected)
+            out["in_flight"] = self._in_flight
+        out["window_spend_usd"] = round(max(0.0, self.budget.spent), 6)
+        out["window_requests"] = len(self.budget.entries)
+        return out
+
+
+EXECUTOR = EscalationExecutor.from_env()
+
+
+def stats() -> Dict[str, Any]:
+    """Tier-2 request counts, rejections by reason and the budget window."""
+    return EXECUTOR.stats()
+
+
+def _gauges() -> Dict[str, float]:
+    s = EXECUTOR.stats()
+    return {"rw_llm_in_flight": s["in_flight"],
+            "rw_llm_window_spend_usd": s["window_spend_usd"],
+            "rw_llm_window_requests": s["window_requests"]}
+
+
+metrics.register_gauges(_gauges)
+
+
+def _prompt_one(text: str) -> str:
+    return (
+        "Classify the financial sentiment of the text below. Output JSON only. "
+        "Fields:\n" + _FIELDS + "\n"
+        f"Text: {text}"
+    )
+
+
+def _prompt_many(texts: Sequence[str]) -> str:
+    items = [{"i": n, "text": t} for n, t in enumerate(texts)]
+    return (
+        "Classify the financial sentiment of each text below. Output JSON "
+        "only: an array with one object per text, each carrying the "
+        "text's index as \"i\" and the fields:\n" + _FIELDS + "\n"
+        "Texts:\n" + json.dumps(items, ensure_ascii=False)
+    )
+
+
+def escalate(text: str) -> Optional[AspectResult]:
+    """Return None if GEMINI_API_KEY is not configured, the call fails or
+    the executor rejects it."""
+    return escalate_batch([text])[0]
+
+
+def escalate_batch(texts: Sequence[str], batch_size: Optional[int] = None) -> List[Optional[AspectResult]]:
+    """`escalate` for many texts, `batch_size` (RW_LLM_BATCH) per request,
+    all requests submitted to `EXECUTOR` at once. Results are in input
+    order; None wherever a text was empty, its request failed or was
+    rejected, or the model's item for it didn't validate."""
+    out: List[Optional[AspectResult]] = [None] * len(texts)
+    client = _client()
+    if client is None:
+        return out
+    todo = [i for i, t in enumerate(texts) if t]
+    size = max(1, batch_size or BATCH)
+    chunks = [todo[start:start + size] for start in range(0, len(todo), size)]
+    jobs = [(_prompt_one(texts[c[0]]), 200, 1) if len(c) == 1
+            else (_prompt_many([texts[i] for i in c]), 150 * len(c) + 50, len(c))
+            for c in chunks]
+    for chunk, data in zip(chunks, EXECUTOR.run(client, jobs) if jobs else []):
+        if len(chunk) == 1:
+            out[chunk[0]] = _parse(data)
+            continue
+        if isinstance(data, dict):   # {"results": [...]} and similar wrappers
+            data = next((v for v in data.values() if isinstance(v, list)), None)
+        if not isinstance(data, list):
+            continue
+        for item in data:
+            n = item.get("i") if isinstance(item, dict) else None
+            if isinstance(n, int) and not isinstance(n, bool) and 0 <= n < len(chunk) \
+                    and out[chunk[n]] is None:
+                out[chunk[n]] = _parse(item)
+    return out
+
 
 def to_dict(r: Optional[AspectResult]) -> Optional[dict]:
     return asdict(r) if r else None
@@ -0,0 +1,233 @@
+"""In-process latency histograms and counters, Prometheus text exposition.
+
+    with metrics.span("headlines"):
+        ...
+    metrics.inc("rw_sentiment_results_total", tier="1")
+
+`span` times a stage into the `rw_stage_seconds{stage=...}` histogram and, if
+a request scope is open (`request_scope()`, opened by the app middleware),
+into that request's `Server-Timing` entries. Scopes live in a contextvar, so
+they follow a request into the threadpool FastAPI runs sync routes on, but
+not into pools the pipeline creates itself (those spans still reach the
+histograms). A streamed response's header only covers the work done
+before its first byte; spans recorded while the body streams still land in
+the scope (`request_spans()`), which is how /api/analyze/stream reports its
+full breakdown in the final `done` event.
+
+`RW_METRICS=0` turns everything into no-ops: `span` hands back one shared
+null context manager and `inc`/`observe` return immediately.
+
+Values are per process. On serverless each instance exposes its own.
+"""
+from __future__ import annotations
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+ENABLED = os.getenv("RW_METRICS", "1") != "0"
+
+# seconds; spans range from µs cache hits to multi-second CV runs
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+           0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_HELP = {
+    "rw_stage_seconds": "Wall time of a pipeline stage.",
+    "rw_http_request_seconds": "Wall time of an HTTP request, by route.",
+    "rw_sentiment_results_total": "Sentiment results by the tier that produced them (cache = served from cache).",
+    "rw_sentiment_escalations_total": "Texts sent to tier-2 LLM escalation.",
+    "rw_cache_requests_total": "Cache lookups by level and result.",
+    "rw_cache_swr_total": "Stale-while-revalidate lookups (fresh, stale) and background refreshes.",
+    "rw_headline_duplicates_total": "Headlines not classified because a near-duplicate was.",
+    "rw_llm_requests_total": "Tier-2 LLM requests, texts sent and request outcomes.",
+    "rw_llm_rejected_total": "Tier-2 LLM requests rejected (concurrency, rate_limit, deadline, budget).",
+}
+
+_LE_INF = 'le="+Inf"'
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float):
+        self.counts[bisect_left(BUCKETS, v)] += 1
+        self.sum += v
+        self.count += 1
+
+
+_LOCK = threading.Lock()
+_HISTOGRAMS: Dict[str, Dict[LabelKey, _Histogram]] = {}
+_COUNTERS: Dict[str, Dict[LabelKey, float]] = {}
+_GAUGES: List[Callable[[], Dict[str, float]]] = []
+_REQUEST: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("rw_request_spans", default=None)
+
+
+def observe(name: str, value: float, **labels: str):
+    if not ENABLED:
+        return
+    key = tuple(sorted(labels.items()))
+    with _LOCK:
+        series = _HISTOGRAMS.setdefault(name, {})
+        h = series.get(key)
+        if h is None:
+            h = series[key] = _Histogram()
+        h.observe(value)
+
+
+def inc(name: str, n: float = 1, **labels: str):
+    if not ENABLED or not n:
+        return
+    key = tuple(sorted(labels.items()))
+    with _LOCK:
+        series = _COUNTERS.setdefault(name, {})
+        series[key] = series.get(key, 0) + n
+
+
+def value(name: str, **labels: str) -> float:
+    """Current value of one counter series (0 if never incremented)."""
+    with _LOCK:
+        return _COUNTERS.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+
+def register_gauges(fn: Callable[[], Dict[str, float]]):
+    """`fn()` is called at scrape time and returns {metric name: value}."""
+    _GAUGES.append(fn)
+
+
+class _Span:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.t0)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage: str):
+    """Context manager timing `stage`; a shared no-op when disabled."""
+    return _Span(stage) if ENABLED else _NO_SPAN
+
+
+def record(stage: str, seconds: float):
+    """Account an already-measured stage duration (histogram + Server-Timing)."""
+    if not ENABLED:
+        return
+    observe("rw_stage_seconds", seconds, stage=stage)
+    spans = _REQUEST.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+def request_spans() -> Optional[List[Tuple[str, float]]]:
+    """The open request scope's spans, None outside one."""
+    return _REQUEST.get()
+
+
+@contextmanager
+def request_scope() -> Iterator[List[Tuple[str, float]]]:
+    """Collect the spans recorded while handling one request."""
+    spans: List[Tuple[str, float]] = []
+    token = _REQUEST.set(spans)
+    try:
+        yield spans
+    finally:
+        _REQUEST.reset(token)
+
+
+def server_timing(spans: List[Tuple[str, float]], total: Optional[float] = None,
+                  limit: int = 20) -> str:
+    """`Server-Timing` header value; repeated stages are summed, in first-seen order."""
+    agg: Dict[str, float] = {}
+    for stage, seconds in spans:
+        agg[stage] = agg.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in list(agg.items())[:limit]]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _labels(key: LabelKey, extra: str = "") -> str:
+    items = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        items.append(extra)
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _num(v: float) -> str:
+    v = float(v)
+    return str(int(v)) if v.is_integer() else repr(v)
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    lines: List[str] = []
+    with _LOCK:
+        histograms = {n: {k: (list(h.counts), h.sum, h.count) for k, h in s.items()}
+                      for n, s in _HISTOGRAMS.items()}
+        counters = {n: dict(s) for n, s in _COUNTERS.items()}
+    for name in sorted(histograms):
+        lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, (counts, total, count) in sorted(histograms[name].items()):
+            cum = 0
+            for bound, c in zip(BUCKETS, counts):
+                cum += c
+                le = 'le="%s"' % bound
+                lines.append(f"{name}_bucket{_labels(key, le)} {cum}")
+            lines.append(f"{name}_bucket{_labels(key, _LE_INF)} {count}")
+            lines.append(f"{name}_sum{_labels(key)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(key)} {count}")
+    for name in sorted(counters):
+        lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+        lines.append(f"# TYPE {name} counter")
+        for key, v in sorted(counters[name].items()):
+            lines.append(f"{name}{_labels(key)} {_num(v)}")
+    gauges: Dict[str, float] = {}
+    for fn in _GAUGES:
+        try:
+            gauges.update(fn())
+        except Exception as e:
+            print(f"metrics gauge failed: {e}")
+    for name in sorted(gauges):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {_num(gauges[name])}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _LOCK:
+        _HISTOGRAMS.clear()
+        _COUNTERS.clear()
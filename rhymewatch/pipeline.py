@@ -1,10 +1,33 @@
-"""End-to-end per-ticker analyze pipeline."""
+"""End-to-end per-ticker analyze pipeline.
+
+Every stage (headlines, sentiment, prices, vix, features, cv, ...) is a
+`metrics` span, so its latency lands in `rw_stage_seconds` and in the
+request's `Server-Timing` header.
+"""
 from __future__ import annotations
+import os
+import time
+import asyncio
+import contextvars
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Any, Dict, List
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 
-from . import scraper, sentiment, features, predictor, cache
+from . import scraper, sentiment, dedup, features, predictor, prices, registry, cache, metrics
+
+STREAM_NEWS_BATCH = int(os.getenv("RW_STREAM_NEWS_BATCH", "32"))
+
+# analyze payloads are fresh for ANALYZE_TTL, then served stale while a
+# background refresh runs, until ANALYZE_MAX_AGE (see `cache`)
+ANALYZE_TTL = 1800
+ANALYZE_MAX_AGE = 6 * 3600
+# rw:predict:* as written by the cron; same as app.PREDICT_*
+PREDICT_TTL = 12 * 3600
+PREDICT_MAX_AGE = 36 * 3600
 
 
 def _ohlcv(symbol: str, days: int):
@@ -12,8 +35,12 @@ def _ohlcv(symbol: str, days: int):
         import yfinance as yf
     except ImportError:
         return pd.DataFrame()
+    try:
+        return prices.history(symbol, days)
+    except Exception as e:
+        print(f"price store failed for {symbol}, downloading: {e}")
     hist = yf.Ticker(symbol).history(period=f"{days}d", auto_adjust=True)
-    return hist
+    return prices.naive(hist)  # tz-aware from yfinance; the store's VIX is naive
 
 
 def _vix(days: int):
@@ -21,59 +48,304 @@ def _vix(days: int):
         import yfinance as yf
     except ImportError:
         return None
+    try:
+        return prices.history("^VIX", days)["Close"]
+    except Exception:
+        pass
     try:
         hist = yf.Ticker("^VIX").history(period=f"{days}d", auto_adjust=True)
-        return hist["Close"]
+        return prices.naive(hist["Close"])
     except Exception:
         return None
 
 
-def analyze(symbol: str, days: int = 180) -> Dict[str, Any]:
-    key = f"rw:analyze:{symbol}:{days}"
-    cached = cache.get(key)
-    if cached:
-        return cached
+def analyze(symbol: str, days: int = 180, serve_stale: bool = True,
+            hit: Optional[Tuple[Optional[Any], bool]] = None) -> Dict[str, Any]:
+    """Cached analyze payload. Concurrent misses for the same (symbol, days)
+    share one computation, in-process and across workers. A stale payload
+    is returned at once and refreshed in the background, unless
+    `serve_stale=False`. `hit` is a `cache.get_stale` result the caller
+    already has for the key."""
+    return cache.get_or_compute(
+        f"rw:analyze:{symbol}:{days}", lambda: _analyze(symbol, days),
+        ex=ANALYZE_MAX_AGE, stale_after=ANALYZE_TTL, serve_stale=serve_stale, hit=hit,
+    )
+
+
+def analyze_many(symbols: List[str], days: int = 180,
+                 concurrency: int = 4) -> Dict[str, Any]:
+    """`analyze` for several symbols: {symbol: payload or Exception}.
+
+    Cached payloads come back in one `get_many` round-trip (stale ones are
+    refreshed in the background); the misses are computed on up to
+    `concurrency` threads, each through `analyze`, so they still coalesce
+    with concurrent requests for the same symbol.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    keys = [f"rw:analyze:{s}:{days}" for s in symbols]
+    out: Dict[str, Any] = {}
+    for symbol, key, (cached, fresh) in zip(symbols, keys, cache.get_stale_many(keys)):
+        if cached is not None:
+            out[symbol] = cached
+            if not fresh:
+                cache.revalidate(key, partial(_analyze, symbol, days),
+                                 ANALYZE_MAX_AGE, ANALYZE_TTL)
+    misses = [s for s in symbols if s not in out]
+    if misses:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(misses)))) as pool:
+            futures = {s: _submit(pool, analyze, s, days) for s in misses}
+            for symbol, f in futures.items():
+                try:
+                    out[symbol] = f.result()
+                except Exception as e:
+                    out[symbol] = e
+    return out
+
+
+def _train(hist: pd.DataFrame, vix, symbol: Optional[str] = None,
+           days: int = 0, retrain: bool = False) -> Optional[predictor.PredictionReport]:
+    """Features + model report. Module-level so a process pool can run it.
+    With a `symbol`, features come from its kept engine (`features.for_symbol`).
+
+    With a `symbol`, the registry model for it and the `days` window `hist`
+    was fetched with is loaded if it has the same feature schema, and scored
+    on the newest row instead of training as long as its training data is
+    unchanged or it is younger than `registry.MAX_AGE`; otherwise it is
+    retrained and stored. `retrain=True` (the cron) refits
+    whenever the training data changed, whatever the model's age.
+    """
+    with metrics.span("features"):
+        feat = (features.for_symbol(symbol, hist, vix) if symbol
+                else features.build_features(hist, vix=vix))
+    if len(feat) < 60:
+        return None
+    cols = [c for c in feat.columns if c != "y_logret"]
+    X = feat[cols].values.astype(np.float64)
+    entry = registry.load(symbol, days) if symbol else None
+    digest = registry.data_hash(X, feat["y_logret"].values) if symbol else None
+    if entry is not None and entry.schema_hash == registry.schema_hash(cols):
+        if registry.is_current(entry, digest, max_age=0 if retrain else None):
+            try:
+                with metrics.span("rescore"):
+                    return predictor.rescore(registry.model_of(entry),
+                                             entry.prediction_report(), X)
+            except Exception as e:
+                print(f"registry model unusable for {symbol}, retraining: {e}")
+    model, report = predictor.train_and_report(feat, feature_cols=cols)
+    if symbol:
+        with metrics.span("registry.save"):
+            registry.save(symbol, days, model, report, cols, digest)
+    return report
+
 
+def _analyze(symbol: str, days: int) -> Dict[str, Any]:
     # 1. headlines + sentiment
-    headlines = scraper.get_headlines(symbol, days=min(days, 60))
-    titles = [t for t, _ in headlines]
-    dates = [d.isoformat() for _, d in headlines]
-    results = sentiment.classify_many(titles)
-    counts = sentiment.counts(results)
+    with metrics.span("headlines"):
+        headlines = scraper.get_headlines(symbol, days=min(days, 60))
+    with metrics.span("sentiment"):
+        results, clusters = _classify_headlines(headlines)
 
     # 2. prices + features + model
-    hist = _ohlcv(symbol, days)
-    price_history: List[float] = []
-    volume_history: List[float] = []
+    with metrics.span("prices"):
+        hist = _ohlcv(symbol, days)
     report = None
-
     if not hist.empty:
-        price_history = hist["Close"].round(4).tolist()
-        volume_history = hist["Volume"].fillna(0).astype(int).tolist()
         try:
-            vix = _vix(days)
-            feat = features.build_features(hist, vix=vix)
-            if len(feat) >= 60:
-                _, report = predictor.train_and_report(feat)
+            with metrics.span("vix"):
+                vix = _vix(days)
+            report = _train(hist, vix, symbol, days)
         except Exception as e:
             print(f"features/predictor failed for {symbol}: {e}")
+    return _payload(symbol, days, headlines, results, hist, report, clusters)
 
-    news = [
-        {
-            "headline": titles[i],
-            "date": dates[i],
-            "sentiment": results[i].label,
-            "confidence": round(results[i].confidence, 3),
-            "tier": results[i].tier,
-        }
-        for i in range(len(titles))
-    ]
 
+def _classify_headlines(headlines: list):
+    """Sentiment for `headlines` with near-duplicates collapsed: one
+    representative per `dedup` cluster is classified and its result fanned
+    out to the members. Returns (SentimentBatch, cluster ids)."""
+    titles = [t for t, _ in headlines]
+    clusters, reps = _clusters(titles)
+    results = sentiment.classify_many([titles[i] for i in reps.tolist()])
+    return results.take(np.searchsorted(reps, clusters)), clusters
+
+
+def _clusters(titles: List[str]):
+    """(cluster id per title, representative indices)."""
+    with metrics.span("dedup"):
+        clusters = dedup.cluster(titles)
+    reps = dedup.representatives(clusters)
+    metrics.inc("rw_headline_duplicates_total", len(titles) - len(reps))
+    return clusters, reps
+
+
+def analyze_stream(symbol: str, days: int = 180,
+                   batch: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """`analyze` as events, each yielded as soon as its stage is done:
+
+        {"event": "prices", "priceHistory": [...], "volumeHistory": [...]}
+        {"event": "news", "items": [...]}     one per classified batch
+        {"event": "sentiment", "total_headlines", "sentimentCounts", ...}
+        {"event": "nextDay", "nextDay": {...}}
+        {"event": "done", "generatedAt": ...}
+
+    Prices, VIX and headlines are fetched concurrently; training starts as
+    soon as prices are in and runs while headlines are classified in
+    batches of `batch` (RW_STREAM_NEWS_BATCH, default 32); as in `analyze`,
+    only one headline per near-duplicate cluster is classified. The assembled
+    payload is cached under `rw:analyze:{symbol}:{days}` like `analyze`
+    does, and a cached payload is replayed as the same events (a stale one
+    is refreshed in the background).
+
+    A miss takes the same single flight as `analyze` (`cache.lead`):
+    concurrent `analyze` calls for the symbol wait for this stream's
+    payload, and a stream that finds the symbol already being computed
+    waits for it and replays it.
+    """
+    key = f"rw:analyze:{symbol}:{days}"
+    cached, fresh = cache.get_stale(key)
+    if cached is not None:
+        if not fresh:
+            cache.revalidate(key, partial(_analyze, symbol, days),
+                             ANALYZE_MAX_AGE, ANALYZE_TTL)
+        yield from _replay(cached)
+        return
+    with cache.lead(key, ANALYZE_MAX_AGE, ANALYZE_TTL) as publish:
+        if publish is not None:
+            yield from _stream(symbol, days, max(1, batch or STREAM_NEWS_BATCH), publish)
+            return
+    # being computed elsewhere (or just stored): wait for it, outside our lead
+    yield from _replay(analyze(symbol, days))
+
+
+def _stream(symbol: str, days: int, size: int, publish) -> Iterator[Dict[str, Any]]:
+    pool = ThreadPoolExecutor(max_workers=4)
+    try:
+        f_hist = _submit(pool, _spanned, "prices", _ohlcv, symbol, days)
+        f_vix = _submit(pool, _spanned, "vix", _vix, days)
+        f_news = _submit(pool, _spanned, "headlines", scraper.get_headlines,
+                         symbol, min(days, 60))
+
+        hist = f_hist.result()
+        yield {"event": "prices", **_price_series(hist)}
+        f_report = _submit(pool, _train_soft, hist, f_vix, symbol, days) if not hist.empty else None
+
+        headlines = f_news.result()
+        titles = [t for t, _ in headlines]
+        clusters, reps = _clusters(titles)
+        dups = dedup.duplicates(clusters)
+        classified = sentiment.SentimentBatch.empty()
+        for start in range(0, len(headlines), size):
+            end = start + size
+            # a representative precedes its members, so it is classified by now
+            new = reps[(reps >= start) & (reps < end)]
+            if len(new):
+                with metrics.span("sentiment"):
+                    out = sentiment.classify_many([titles[i] for i in new.tolist()])
+                classified = sentiment.SentimentBatch.concat([classified, out])
+            ids = clusters[start:end]
+            yield {"event": "news", "items": _news_items(
+                headlines[start:end], classified.take(np.searchsorted(reps, ids)),
+                ids, dups[start:end])}
+        results = classified.take(np.searchsorted(reps, clusters))
+        yield {"event": "sentiment", "total_headlines": len(headlines),
+               **_sentiment_summary(results)}
+
+        report = f_report.result() if f_report is not None else None
+        payload = _payload(symbol, days, headlines, results, hist, report, clusters)
+        publish(payload)
+        yield {"event": "nextDay", "nextDay": payload["nextDay"]}
+        yield {"event": "done", "generatedAt": payload["generatedAt"]}
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _replay(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield {"event": "prices", "priceHistory": payload.get("priceHistory", []),
+           "volumeHistory": payload.get("volumeHistory", [])}
+    yield {"event": "news", "items": payload.get("news", [])}
+    yield {"event": "sentiment", "total_headlines": payload.get("total_headlines", 0),
+           **{k: payload.get(k) for k in ("sentimentCounts", "escalations", "sentimentModel")}}
+    yield {"event": "nextDay", "nextDay": payload.get("nextDay")}
+    yield {"event": "done", "generatedAt": payload.get("generatedAt"), "cached": True}
+
+
+def _submit(pool: ThreadPoolExecutor, fn, *args):
+    """Submit with the caller's contextvars, so spans reach its request scope."""
+    return pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _spanned(stage: str, fn, *args):
+    with metrics.span(stage):
+        return fn(*args)
+
+
+def _train_soft(hist: pd.DataFrame, f_vix, symbol: str,
+                days: int) -> Optional[predictor.PredictionReport]:
+    try:
+        return _train(hist, f_vix.result(), symbol, days)
+    except Exception as e:
+        print(f"features/predictor failed for {symbol}: {e}")
+        return None
+
+
+def _payload(symbol: str, days: int, headlines: list, results,
+             hist: pd.DataFrame, report, clusters: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    news = _news_items(headlines, results, clusters)
     payload = {
         "symbol": symbol,
         "days_analyzed": days,
         "news": news,
         "total_headlines": len(news),
+        **_sentiment_summary(results),
+        **_price_series(hist),
+        "nextDay": _next_day(report),
+        "generatedAt": _now_iso(),
+    }
+    return payload
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def _price_series(hist: pd.DataFrame) -> Dict[str, List[float]]:
+    price_history: List[float] = []
+    volume_history: List[float] = []
+    if not hist.empty:
+        price_history = hist["Close"].round(4).tolist()
+        volume_history = hist["Volume"].fillna(0).astype(int).tolist()
+    return {"priceHistory": price_history, "volumeHistory": volume_history}
+
+
+def _news_items(headlines: list, results, clusters: Optional[np.ndarray] = None,
+                dups: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+    """News entries. `cluster` is the index of the item's near-duplicate
+    representative in the full headline list, `duplicates` the number of
+    other headlines in its cluster (pass both sliced for a slice)."""
+    batch = sentiment.as_batch(results)
+    if clusters is None:
+        clusters = np.arange(len(headlines))
+    if dups is None:
+        dups = dedup.duplicates(clusters)
+    return [
+        {
+            "headline": title,
+            "date": date.isoformat(),
+            "sentiment": label,
+            "confidence": round(conf, 3),
+            "tier": tier,
+            "cluster": cluster,
+            "duplicates": dup,
+        }
+        for (title, date), label, conf, tier, cluster, dup in zip(
+            headlines, batch.labels(), batch.confidence.tolist(), batch.tier.tolist(),
+            clusters.tolist(), dups.tolist())
+    ]
+
+
+def _sentiment_summary(results) -> Dict[str, Any]:
+    counts = sentiment.counts(results)
+    return {
         "sentimentCounts": {
             "positive": counts.get("positive", 0),
             "neutral": counts.get("neutral", 0),
@@ -81,21 +353,189 @@ def analyze(symbol: str, days: int = 180) -> Dict[str, Any]:
         },
         "escalations": counts.get("escalations", 0),
         "sentimentModel": "finbert-tone-int8 + gemini-flash-lite escalation",
-        "priceHistory": price_history,
-        "volumeHistory": volume_history,
-        "nextDay": {
-            "direction": report.direction if report else "—",
-            "expectedReturn": (report.expected_return * 100) if report else None,
-            "directionalAccuracy": (report.directional_accuracy * 100) if report else None,
-            "sharpe": f"{report.sharpe_net_10bps:.2f}" if report else "—",
-            "mae": report.mae if report else None,
-            "features": (f"{report.features} (technicals + sentiment + event flags)"
-                         if report else None),
-            "model": report.model if report else None,
-            "trainedAt": report.trained_at if report else None,
-            "nPredictions": report.n_predictions if report else None,
-        },
-        "generatedAt": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
     }
-    cache.set(key, payload, ex=1800)
-    return payload
+
+
+def _next_day(report) -> Dict[str, Any]:
+    return {
+        "direction": report.direction if report else "—",
+        "expectedReturn": (report.expected_return * 100) if report else None,
+        "directionalAccuracy": (report.directional_accuracy * 100) if report else None,
+        "sharpe": f"{report.sharpe_net_10bps:.2f}" if report else "—",
+        "mae": report.mae if report else None,
+        "features": (f"{report.features} (technicals + sentiment + event flags)"
+                     if report else None),
+        "model": report.model if report else None,
+        "trainedAt": report.trained_at if report else None,
+        "nPredictions": report.n_predictions if report else None,
+    }
+
+
+def _train_panel(hists: Dict[str, pd.DataFrame], vix) -> Dict[str, predictor.PredictionReport]:
+    """Features for every ticker + one pooled model (`predictor.train_panel`).
+    Module-level so a process pool can run it."""
+    frames = {}
+    for symbol, hist in hists.items():
+        try:
+            feat = features.for_symbol(symbol, hist, vix)
+        except Exception as e:
+            print(f"features failed for {symbol}: {e}")
+            continue
+        if len(feat) >= 60:
+            frames[symbol] = feat
+    if not frames:
+        return {}
+    _, reports = predictor.train_panel(frames)
+    return reports
+
+
+def recompute(symbols: List[str], days: int = 365, concurrency: int = 4,
+              timeout: float = 120.0, processes: Optional[int] = None,
+              panel: bool = False) -> Dict[str, Any]:
+    """Recompute analyze payloads for a watchlist in parallel (cron path).
+
+    Up to `concurrency` tickers are in flight at once. Headline fetches run
+    on the event loop, yfinance and ONNX on a thread pool, and feature
+    building + walk-forward training on a process pool of `processes`
+    workers (0 trains on threads instead). VIX is downloaded once for the
+    whole batch. A ticker that exceeds `timeout` seconds is reported as an
+    error without holding up the rest. Fresh payloads and predictions are
+    written to the cache in one `set_many` each.
+
+    With `panel=True` the per-ticker models are replaced by one model trained
+    on the whole watchlist (`predictor.train_panel`) once every ticker's
+    prices are in; its timing is reported under `timings["_panel"]`. Panel
+    models are not stored in the registry.
+    """
+    return asyncio.run(_arecompute(symbols, days, concurrency, timeout, processes, panel))
+
+
+def _mp_context():
+    """forkserver (spawn where it doesn't exist) for the training pool: its
+    workers start lazily, and a plain fork taken while an io-pool, llm or
+    SWR thread holds a lock (`metrics`, the cache's L1) would inherit it
+    held and deadlock, which the cron only reports as ticker timeouts."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+async def _arecompute(symbols: List[str], days: int, concurrency: int,
+                      timeout: float, processes: Optional[int],
+                      panel: bool = False) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    concurrency = max(1, concurrency)
+    if processes is None:
+        processes = min(concurrency, os.cpu_count() or 1)
+    io_pool = ThreadPoolExecutor(max_workers=2 * concurrency)
+    cpu_pool = None
+    if processes > 0:
+        try:
+            cpu_pool = ProcessPoolExecutor(max_workers=processes, mp_context=_mp_context())
+        except (OSError, NotImplementedError) as e:
+            # e.g. no POSIX semaphores in the sandbox; train on threads
+            print(f"process pool unavailable, training on threads: {e}")
+    sem = asyncio.Semaphore(concurrency)
+    hists: Optional[Dict[str, pd.DataFrame]] = {} if panel else None
+    panel_timings: Dict[str, float] = {}
+    try:
+        vix = await loop.run_in_executor(io_pool, _vix, days)
+
+        async def one(symbol: str):
+            async with sem:
+                timings: Dict[str, float] = {}
+                start = time.perf_counter()
+                try:
+                    payload = await asyncio.wait_for(
+                        _analyze_staged(symbol, days, vix, io_pool, cpu_pool or io_pool,
+                                        timings, hists),
+                        timeout,
+                    )
+                    return symbol, payload, None, timings
+                except asyncio.TimeoutError:
+                    return symbol, None, f"timed out after {timeout:.0f}s", timings
+                except Exception as e:
+                    return symbol, None, str(e), timings
+                finally:
+                    timings["total"] = round(time.perf_counter() - start, 3)
+
+        outcomes = await asyncio.gather(*(one(s) for s in symbols))
+        if panel:
+            ok = {s for s, _, error, _ in outcomes if error is None}
+            t0 = time.perf_counter()
+            try:
+                reports = await loop.run_in_executor(
+                    cpu_pool or io_pool, _train_panel,
+                    {s: h for s, h in hists.items() if s in ok}, vix)
+            except Exception as e:
+                print(f"panel training failed: {e}")
+                reports = {}
+            panel_timings["train"] = round(time.perf_counter() - t0, 3)
+            for symbol, payload, error, _ in outcomes:
+                if error is None:
+                    payload["nextDay"] = _next_day(reports.get(symbol))
+    finally:
+        io_pool.shutdown(wait=False, cancel_futures=True)
+        if cpu_pool is not None:
+            cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+    updated, errors, timings, analyzed, predictions = [], [], {}, {}, {}
+    for symbol, payload, error, stage_times in outcomes:
+        timings[symbol] = stage_times
+        if error is not None:
+            errors.append({"symbol": symbol, "error": error})
+            continue
+        updated.append(symbol)
+        analyzed[f"rw:analyze:{symbol}:{days}"] = payload
+        predictions[f"rw:predict:{symbol}"] = {
+            "symbol": symbol, "nextDay": payload["nextDay"],
+            "generatedAt": payload["generatedAt"],
+        }
+    cache.set_many(analyzed, ex=ANALYZE_MAX_AGE, stale_after=ANALYZE_TTL)
+    cache.set_many(predictions, ex=PREDICT_MAX_AGE, stale_after=PREDICT_TTL)
+    if panel:
+        timings["_panel"] = panel_timings
+    return {"updated": updated, "errors": errors, "timings": timings}
+
+
+async def _analyze_staged(symbol: str, days: int, vix, io_pool, cpu_pool,
+                          timings: Dict[str, float],
+                          hists: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, Any]:
+    """`_analyze` split into two concurrent chains (news → sentiment and
+    prices → model), recording each stage's wall time into `timings`.
+
+    If `hists` is given the model is left to the caller (panel mode): the
+    price history is stored there and the payload has no prediction yet.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def timed(stage: str, aw):
+        t0 = time.perf_counter()
+        try:
+            return await aw
+        finally:
+            elapsed = time.perf_counter() - t0
+            timings[stage] = round(elapsed, 3)
+            metrics.record(stage, elapsed)
+
+    async def news():
+        headlines = await timed("headlines", scraper.aget_headlines(symbol, min(days, 60)))
+        results = await timed("sentiment", loop.run_in_executor(
+            io_pool, _classify_headlines, headlines))
+        return headlines, results
+
+    async def model():
+        hist = await timed("prices", loop.run_in_executor(io_pool, _ohlcv, symbol, days))
+        report = None
+        if hists is not None:
+            if not hist.empty:
+                hists[symbol] = hist
+        elif not hist.empty:
+            try:
+                report = await timed("train", loop.run_in_executor(
+                    cpu_pool, _train, hist, vix, symbol, days, True))
+            except Exception as e:
+                print(f"features/predictor failed for {symbol}: {e}")
+        return hist, report
+
+    (headlines, (results, clusters)), (hist, report) = await asyncio.gather(news(), model())
+    return _payload(symbol, days, headlines, results, hist, report, clusters)
@@ -9,23 +9,47 @@ faster cold starts. Not bundled here to keep the Vercel image lean; the
 project ships the `.pkl` by default and can drop to ONNX when needed.
 """
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional, Tuple
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, timezone
 import numpy as np
 import pandas as pd
 
-try:
+from . import validation
+from .metrics import span
+
+if TYPE_CHECKING:  # annotations only; imported lazily by `_lightgbm`
     import lightgbm as lgb  # type: ignore[import-untyped]
-    _HAS_LGBM = True
-except Exception:
-    # Catches ImportError (package missing) AND OSError (macOS libomp.dylib
-    # missing — LightGBM's shared library can't dlopen without `brew install
-    # libomp`). Either way we fall back to ridge-OLS so the app still runs.
-    lgb = None  # type: ignore[assignment]
-    _HAS_LGBM = False
 
-from . import validation
+_LGB = None  # lightgbm module once imported, False if unavailable
+
+
+def _lightgbm():
+    """lightgbm, imported on first use (it pulls in scikit-learn and scipy,
+    over a second of a cold start); None if it can't be loaded."""
+    global _LGB
+    if _LGB is None:
+        try:
+            import lightgbm  # type: ignore[import-untyped]
+            _LGB = lightgbm
+        except Exception:
+            # Catches ImportError (package missing) AND OSError (macOS libomp.dylib
+            # missing — LightGBM's shared library can't dlopen without `brew install
+            # libomp`). Either way we fall back to ridge-OLS so the app still runs.
+            _LGB = False
+    return _LGB or None
+
+
+def __getattr__(name: str):
+    # `predictor.lgb` / `predictor._HAS_LGBM` resolve lazily for callers
+    if name == "lgb":
+        return _lightgbm()
+    if name == "_HAS_LGBM":
+        return _lightgbm() is not None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 @dataclass
@@ -41,28 +65,6 @@ class PredictionReport:
     trained_at: str
 
 
-def _fit_lgbm(X_train: np.ndarray, y_train: np.ndarray) -> "lgb.LGBMRegressor":
-    if not _HAS_LGBM:
-        raise RuntimeError("lightgbm not installed")
-    model = lgb.LGBMRegressor(
-        n_estimators=400,
-        learning_rate=0.03,
-        num_leaves=31,
-        max_depth=-1,
-        min_child_samples=20,
-        subsample=0.85,
-        subsample_freq=1,
-        colsample_bytree=0.85,
-        reg_alpha=0.05,
-        reg_lambda=0.05,
-        random_state=42,
-        verbosity=-1,
-        n_jobs=1,
-    )
-    model.fit(X_train, y_train)
-    return model
-
-
 def _fallback_fit_predict(X_train: np.ndarray, y_train: np.ndarray,
                           X_test: np.ndarray) -> np.ndarray:
     """Ridge-ish OLS fallback when lightgbm isn't available (e.g. in unit
@@ -76,31 +78,187 @@ def _fallback_fit_predict(X_train: np.ndarray, y_train: np.ndarray,
 
 def fit_predict(X_train: np.ndarray, y_train: np.ndarray,
                 X_test: np.ndarray) -> np.ndarray:
-    if _HAS_LGBM:
-        m = _fit_lgbm(X_train, y_train)
-        return m.predict(X_test)
+    if _lightgbm() is not None:
+        return _fit_booster(X_train, y_train).predict(X_test)
     return _fallback_fit_predict(X_train, y_train, X_test)
 
 
+# LightGBM hyperparameters for every fit (native API: per-fold, `BinnedFolds`
+# and the final model).
+_LGB_PARAMS = {
+    "objective": "regression",
+    "learning_rate": 0.03,
+    "num_leaves": 31,
+    "max_depth": -1,
+    "min_data_in_leaf": 20,
+    "bagging_fraction": 0.85,
+    "bagging_freq": 1,
+    "feature_fraction": 0.85,
+    "lambda_l1": 0.05,
+    "lambda_l2": 0.05,
+    "seed": 42,
+    "verbosity": -1,
+    "num_threads": 1,
+}
+_N_ROUNDS = 400
+WARM_START = os.getenv("RW_CV_WARM_START", "0") == "1"
+BINNED = os.getenv("RW_CV_BINNED", "1") == "1"
+
+
+def _fit_booster(X: np.ndarray, y: np.ndarray,
+                 categorical: Sequence[int] = ()) -> "lgb.Booster":
+    """`_LGB_PARAMS` booster binned on exactly the rows it trains on."""
+    lgb = _lightgbm()
+    if lgb is None:
+        raise RuntimeError("lightgbm not installed")
+    data = lgb.Dataset(X, y, params=_LGB_PARAMS,
+                       categorical_feature=list(categorical) or "auto")
+    return lgb.train(_LGB_PARAMS, data, num_boost_round=_N_ROUNDS)
+
+
+class BinnedFolds:
+    """Walk-forward fold engine over one pre-binned `lgb.Dataset`.
+
+    Every fold, and the final model, trains on a row subset of one dataset
+    that shares its histogram bin mappers instead of re-binning raw floats.
+    The mappers are built from the first fold's training rows only (`bin`)
+    and applied to the rest, so no fold is binned on feature values from
+    after its own training window.
+
+    With `warm_start=True` each fold continues from the previous fold's
+    booster with `warm_rounds` extra trees instead of starting over; see
+    `compare_warm_start` for what that costs in accuracy.
+    """
+
+    def __init__(self, X: np.ndarray, y: np.ndarray, categorical: Sequence[int] = ()):
+        if _lightgbm() is None:
+            raise RuntimeError("lightgbm not installed")
+        self.X = X
+        self.y = y
+        self.categorical = list(categorical) or "auto"
+        self.bin_rows: Optional[slice] = None
+        self.full: Optional["lgb.Dataset"] = None
+
+    def bin(self, rows: slice) -> "BinnedFolds":
+        """Build the bin mappers from `rows`, then bin every row with them."""
+        lgb = _lightgbm()
+        ref = lgb.Dataset(self.X[rows], self.y[rows], params=_LGB_PARAMS,
+                          categorical_feature=self.categorical).construct()
+        self.full = lgb.Dataset(self.X, self.y, params=_LGB_PARAMS, reference=ref,
+                                free_raw_data=False,
+                                categorical_feature=self.categorical).construct()
+        self.bin_rows = rows
+        return self
+
+    def fit(self, rows: slice, init_score: Optional[np.ndarray] = None,
+            rounds: int = _N_ROUNDS) -> "lgb.Booster":
+        """Booster on `rows`; bins on every row if no folds were binned yet."""
+        if self.full is None:
+            self.bin(slice(0, len(self.y)))
+        if init_score is None and rows.start in (0, None) and (
+                rows.stop is None or rows.stop >= len(self.y)):
+            data = self.full
+        else:
+            data = self.full.subset(np.arange(rows.start or 0, rows.stop))
+            if init_score is not None:
+                # must follow construct(); a lazy subset drops it silently
+                data.construct().set_init_score(init_score)
+        return _lightgbm().train(_LGB_PARAMS, data, num_boost_round=rounds)
+
+    def cross_validate(self, initial: int = 1000, step: int = 21, embargo: int = 5,
+                       warm_start: bool = False, warm_rounds: int = 50,
+                       workers: Optional[int] = None) -> dict:
+        folds = validation.fold_slices(len(self.y), initial, step, embargo)
+        preds = self.predict_folds(folds, warm_start, warm_rounds, workers)
+        return validation.fold_metrics([self.y[te] for _, te in folds], preds)
+
+    def predict_folds(self, folds: List[Tuple[slice, slice]], warm_start: bool = False,
+                      warm_rounds: int = 50, workers: Optional[int] = None) -> List[np.ndarray]:
+        """Out-of-sample predictions for each (train, test) slice pair."""
+        if folds and self.bin_rows != folds[0][0]:
+            self.bin(folds[0][0])
+        if workers is None:
+            workers = validation.DEFAULT_WORKERS
+        if warm_start:
+            # Continuing a booster == boosting new trees from its raw score.
+            # Keep that score for every row and add only the new trees'
+            # output per fold, rather than re-scoring the whole ensemble.
+            preds, score = [], None
+            for tr, te in folds:
+                if score is None:
+                    score = self.fit(tr).predict(self.X)
+                else:
+                    score = score + self.fit(tr, init_score=score[tr],
+                                             rounds=warm_rounds).predict(self.X)
+                preds.append(score[te])
+        elif workers > 1 and len(folds) > 1:
+            with ThreadPoolExecutor(max_workers=min(workers, len(folds))) as pool:
+                preds = list(pool.map(lambda f: self.fit(f[0]).predict(self.X[f[1]]), folds))
+        else:
+            preds = [self.fit(tr).predict(self.X[te]) for tr, te in folds]
+        return preds
+
+
+def compare_warm_start(X: np.ndarray, y: np.ndarray, initial: int = 250,
+                       step: int = 21, embargo: int = 5, warm_rounds: int = 50) -> dict:
+    """Walk-forward metrics with and without fold warm-starting, plus the
+    accuracy/MAE difference (warm − cold) and the wall time of each."""
+    engine = BinnedFolds(X, y)
+    t0 = time.perf_counter()
+    cold = engine.cross_validate(initial, step, embargo, workers=1)
+    t1 = time.perf_counter()
+    warm = engine.cross_validate(initial, step, embargo, warm_start=True,
+                                 warm_rounds=warm_rounds)
+    t2 = time.perf_counter()
+    return {
+        "cold": cold,
+        "warm": warm,
+        "directional_accuracy_delta": warm["directional_accuracy"] - cold["directional_accuracy"],
+        "mae_delta": warm["mae"] - cold["mae"],
+        "seconds_cold": t1 - t0,
+        "seconds_warm": t2 - t1,
+    }
+
+
 def train_and_report(features: pd.DataFrame, target_col: str = "y_logret",
                      feature_cols: Optional[list] = None,
                      initial: int = 250, step: int = 21,
-                     embargo: int = 5) -> Tuple["object", PredictionReport]:
+                     embargo: int = 5,
+                     cv_workers: Optional[int] = None,
+                     warm_start: Optional[bool] = None,
+                     binned: Optional[bool] = None) -> Tuple["object", PredictionReport]:
     """Train a final model on all data AND compute walk-forward metrics.
 
     `initial` is set to 250 (1 trading year) so the toy per-ticker endpoint
     works; production cron should raise it to 1000+ for a proper five-year
-    window.
+    window. `cv_workers` fits folds in parallel (see
+    `validation.cross_validate`). LightGBM folds and the final model share
+    one dataset binned on the first training window (`BinnedFolds`);
+    `binned=False` (default RW_CV_BINNED) bins each fold on its own training
+    slice instead. `warm_start` (default RW_CV_WARM_START) chains the folds'
+    boosters and needs the binned engine.
     """
     if feature_cols is None:
         feature_cols = [c for c in features.columns if c != target_col]
     X = features[feature_cols].values.astype(np.float64)
     y = features[target_col].values.astype(np.float64)
 
+    if warm_start is None:
+        warm_start = WARM_START
+    if binned is None:
+        binned = BINNED
+    has_lgb = _lightgbm() is not None
+    engine = BinnedFolds(X, y) if has_lgb and (binned or warm_start) else None
     try:
-        metrics = validation.cross_validate(
-            X, y, fit_predict, initial=initial, step=step, embargo=embargo
-        )
+        with span("cv"):
+            if engine is not None:
+                metrics = engine.cross_validate(initial, step, embargo,
+                                                warm_start=warm_start, workers=cv_workers)
+            else:
+                metrics = validation.cross_validate(
+                    X, y, fit_predict, initial=initial, step=step, embargo=embargo,
+                    workers=cv_workers,
+                )
     except ValueError:
         metrics = {
             "mae": float("nan"),
@@ -110,22 +268,25 @@ def train_and_report(features: pd.DataFrame, target_col: str = "y_logret",
         }
 
     # Final model on everything.
-    if _HAS_LGBM:
-        model = _fit_lgbm(X, y)
-        model_name = "lightgbm · returns target"
-    else:
-        X_aug = np.hstack([np.ones((X.shape[0], 1)), X])
-        beta = np.linalg.solve(
-            X_aug.T @ X_aug + 1e-3 * np.eye(X_aug.shape[1]), X_aug.T @ y
-        )
-        model = {"beta": beta, "feature_cols": feature_cols}
-        model_name = "ridge-ols · returns target (lightgbm unavailable)"
+    with span("fit"):
+        if engine is not None:
+            model = engine.fit(slice(0, len(y)))
+            model_name = "lightgbm · returns target"
+        elif has_lgb:
+            model = _fit_booster(X, y)
+            model_name = "lightgbm · returns target"
+        else:
+            X_aug = np.hstack([np.ones((X.shape[0], 1)), X])
+            beta = np.linalg.solve(
+                X_aug.T @ X_aug + 1e-3 * np.eye(X_aug.shape[1]), X_aug.T @ y
+            )
+            model = {"beta": beta, "feature_cols": feature_cols}
+            model_name = "ridge-ols · returns target (lightgbm unavailable)"
 
     last = X[-1:]
     pred = _predict(model, last)[0] if len(last) else 0.0
-    direction = "↑" if pred > 1e-4 else "↓" if pred < -1e-4 else "→"
     return model, PredictionReport(
-        direction=direction,
+        direction=_direction(pred),
         expected_return=float(pred),
         directional_accuracy=float(metrics["directional_accuracy"]),
         sharpe_net_10bps=float(metrics["sharpe_net_10bps"]),
@@ -137,8 +298,19 @@ def train_and_report(features: pd.DataFrame, target_col: str = "y_logret",
     )
 
 
+def _direction(pred: float) -> str:
+    return "↑" if pred > 1e-4 else "↓" if pred < -1e-4 else "→"
+
+
+def rescore(model, report: PredictionReport, X: np.ndarray) -> PredictionReport:
+    """`report` with the forecast recomputed from `model` on the last row of
+    `X`; the walk-forward metrics and `trained_at` stay those of training."""
+    pred = float(_predict(model, X[-1:])[0]) if len(X) else 0.0
+    return replace(report, direction=_direction(pred), expected_return=pred)
+
+
 def _predict(model, X: np.ndarray) -> np.ndarray:
-    if _HAS_LGBM and hasattr(model, "predict"):
+    if hasattr(model, "predict"):  # a booster; ridge models are dicts
         return model.predict(X)
     X_aug = np.hstack([np.ones((X.shape[0], 1)), X])
     return X_aug @ model["beta"]
@@ -146,3 +318,94 @@ def _predict(model, X: np.ndarray) -> np.ndarray:
 
 def predict(model, X: np.ndarray) -> np.ndarray:
     return _predict(model, X)
+
+
+def train_panel(frames: Dict[str, pd.DataFrame], target_col: str = "y_logret",
+                feature_cols: Optional[list] = None,
+                sectors: Optional[Dict[str, str]] = None,
+                initial: int = 250, step: int = 21,
+                embargo: int = 5) -> Tuple["object", Dict[str, PredictionReport]]:
+    """One model for a whole watchlist.
+
+    `frames` maps symbol → `features.build_features` output. Rows are
+    stacked in date order with `ticker` and `sector` categorical codes,
+    walk-forward folds and the embargo are cut on trading dates (so no
+    ticker's test day is ever inside another ticker's training window),
+    and one final model scores every ticker's latest row in a single
+    `predict`. Metrics in each ticker's report are computed on that ticker's
+    out-of-sample rows of the pooled CV.
+    """
+    if sectors is None:
+        from .features import SECTOR_ETF
+        sectors = SECTOR_ETF
+    symbols = [s for s, f in frames.items() if len(f)]
+    if not symbols:
+        return None, {}
+    if feature_cols is None:
+        common = set.intersection(*(set(frames[s].columns) for s in symbols))
+        feature_cols = [c for c in frames[symbols[0]].columns if c in common and c != target_col]
+    sector_codes = {sec: i for i, sec in enumerate(sorted({sectors.get(s, "other") for s in symbols}))}
+
+    Xs, ys, dates, tick = [], [], [], []
+    for code, sym in enumerate(symbols):
+        f = frames[sym]
+        x = f[feature_cols].to_numpy(dtype=np.float64)
+        Xs.append(np.hstack([x, np.full((len(f), 1), code, dtype=np.float64),
+                             np.full((len(f), 1), sector_codes[sectors.get(sym, "other")],
+                                     dtype=np.float64)]))
+        ys.append(f[target_col].to_numpy(dtype=np.float64))
+        dates.append(pd.DatetimeIndex(f.index).tz_localize(None).values.astype("datetime64[D]"))
+        tick.append(np.full(len(f), code))
+    order = np.argsort(np.concatenate(dates), kind="stable")
+    X = np.vstack(Xs)[order]
+    y = np.concatenate(ys)[order]
+    day = np.concatenate(dates)[order]
+    ticker = np.concatenate(tick)[order]
+    cat = [X.shape[1] - 2, X.shape[1] - 1]
+
+    has_lgb = _lightgbm() is not None
+    engine = BinnedFolds(X, y, categorical=cat) if has_lgb and BINNED else None
+    try:
+        folds = validation.date_fold_slices(day, initial, step, embargo)
+        if engine is not None:
+            preds = engine.predict_folds(folds)
+        elif has_lgb:
+            preds = [_fit_booster(X[tr], y[tr], cat).predict(X[te]) for tr, te in folds]
+        else:
+            # ridge can't use the categorical codes; numeric features only
+            preds = [_fallback_fit_predict(X[tr, :-2], y[tr], X[te, :-2]) for tr, te in folds]
+    except ValueError:
+        folds, preds = [], []
+    test_rows = (np.concatenate([np.arange(te.start, te.stop) for _, te in folds])
+                 if folds else np.asarray([], dtype=np.int64))
+    oos = np.concatenate(preds) if preds else np.asarray([], dtype=np.float64)
+
+    last_rows = np.array([np.flatnonzero(ticker == c)[-1] for c in range(len(symbols))])
+    if has_lgb:
+        model = engine.fit(slice(0, len(y))) if engine is not None else _fit_booster(X, y, cat)
+        model_name = f"lightgbm · panel of {len(symbols)} · returns target"
+        latest = model.predict(X[last_rows])
+    else:
+        X_aug = np.hstack([np.ones((X.shape[0], 1)), X[:, :-2]])
+        beta = np.linalg.solve(X_aug.T @ X_aug + 1e-3 * np.eye(X_aug.shape[1]), X_aug.T @ y)
+        model = {"beta": beta, "feature_cols": feature_cols}
+        model_name = f"ridge-ols · panel of {len(symbols)} · returns target (lightgbm unavailable)"
+        latest = _predict(model, X[last_rows][:, :-2])
+
+    trained_at = datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+    reports: Dict[str, PredictionReport] = {}
+    for code, sym in enumerate(symbols):
+        mine = ticker[test_rows] == code
+        m = validation.fold_metrics([y[test_rows[mine]]], [oos[mine]])
+        reports[sym] = PredictionReport(
+            direction=_direction(latest[code]),
+            expected_return=float(latest[code]),
+            directional_accuracy=float(m["directional_accuracy"]),
+            sharpe_net_10bps=float(m["sharpe_net_10bps"]),
+            mae=float(m["mae"]) if m["n_predictions"] else float("nan"),
+            n_predictions=int(m["n_predictions"]),
+            features=len(feature_cols) + 2,
+            model=model_name,
+            trained_at=trained_at,
+        )
+    return model, reports
@@ -0,0 +1,197 @@
+"""Local column-oriented OHLCV store with incremental yfinance refresh.
+
+One file per symbol under `RW_PRICE_DIR` (default a tmp dir): a float64
+`.npy` of shape (6, n) whose rows are date (days since epoch), open, high,
+low, close and volume. Each column is contiguous, the file is opened
+memory-mapped, and any date window is a slice of it — no copy, no parsing.
+
+`history(symbol, days)` only asks yfinance for bars from the last two
+stored dates on, and not at all if the file was checked within
+`RW_PRICE_REFRESH` seconds (default 900). The last stored bar may have been
+written mid-session, so it is replaced by whatever comes back for its date.
+The bar before it is final; because prices are split/dividend adjusted, a
+moved close there means history was re-adjusted upstream and the whole
+series is fetched again. A ticker with less history than requested (a
+recent listing) is marked as stored back to its first bar, so it isn't
+downloaded in full again on every call.
+
+Readers that find the series current hold a shared `flock` on a
+per-symbol lock file, so they run concurrently; only a refresh that has to
+download takes it exclusively (re-checking first, in case another writer
+just did the work). Writes publish with an atomic rename, so readers never
+see a half-written file and keep a valid mapping of the old one.
+"""
+from __future__ import annotations
+import os
+import time
+import tempfile
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # not on POSIX; single-writer only
+    fcntl = None  # type: ignore[assignment]
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+_DIR = Path(os.getenv("RW_PRICE_DIR", str(Path(tempfile.gettempdir()) / "rhymewatch_prices")))
+_REFRESH = float(os.getenv("RW_PRICE_REFRESH", "900"))
+_ADJ_TOL = 1e-6
+
+
+def _path(symbol: str) -> Path:
+    return _DIR / f"{symbol.replace('^', '_').replace('/', '_')}.npy"
+
+
+@contextmanager
+def _lock(symbol: str, shared: bool = False):
+    _DIR.mkdir(parents=True, exist_ok=True)
+    with open(_path(symbol).with_suffix(".lock"), "a+") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _load(symbol: str) -> Optional[np.ndarray]:
+    try:
+        return np.load(_path(symbol), mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+
+
+def _write(symbol: str, arr: np.ndarray):
+    path = _path(symbol)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp.npy")
+    np.save(tmp, np.ascontiguousarray(arr, dtype=np.float64))
+    tmp.replace(path)
+
+
+def _download(symbol: str, start: Optional[date] = None, days: Optional[int] = None) -> np.ndarray:
+    """yfinance bars as a (6, n) array; empty (6, 0) if nothing came back."""
+    import yfinance as yf
+    t = yf.Ticker(symbol)
+    if start is not None:
+        hist = t.history(start=start.isoformat(), auto_adjust=True)
+    else:
+        hist = t.history(period=f"{days}d", auto_adjust=True)
+    if hist is None or hist.empty:
+        return np.empty((6, 0))
+    idx = hist.index
+    if getattr(idx, "tz", None) is not None:
+        idx = idx.tz_localize(None)
+    day = idx.normalize().values.astype("datetime64[D]").astype(np.int64)
+    cols = [hist[c].to_numpy(dtype=np.float64) if c in hist else np.zeros(len(hist))
+            for c in COLUMNS]
+    return np.vstack([day.astype(np.float64)] + cols)
+
+
+def _today() -> int:
+    return (datetime.now(timezone.utc).date() - date(1970, 1, 1)).days
+
+
+def _listed(symbol: str) -> Path:
+    """Marker: the stored series starts at the ticker's first bar."""
+    return _path(symbol).with_suffix(".listed")
+
+
+def _covers(cur: Optional[np.ndarray], days: int, symbol: str) -> bool:
+    if cur is None or cur.shape[1] == 0:
+        return False
+    return cur[0, 0] <= _today() - days + 7 or _listed(symbol).exists()
+
+
+def _full(symbol: str, days: int) -> Optional[np.ndarray]:
+    """Download `days` calendar days and replace the stored series."""
+    new = _download(symbol, days=days)
+    if new.shape[1]:
+        _write(symbol, new)
+        if new[0, 0] > _today() - days + 7:
+            _listed(symbol).touch()  # yfinance has nothing older
+    return _load(symbol)
+
+
+def _current(symbol: str, days: int) -> Optional[np.ndarray]:
+    """The stored series if it covers `days` and was checked within
+    RW_PRICE_REFRESH seconds, else None."""
+    cur = _load(symbol)
+    if not _covers(cur, days, symbol):
+        return None
+    try:
+        checked = _path(symbol).stat().st_mtime
+    except OSError:
+        return None
+    return cur if time.time() - checked < _REFRESH else None
+
+
+def refresh(symbol: str, days: int) -> Optional[np.ndarray]:
+    """Bring the stored series up to date and cover at least `days`
+    calendar days; returns the (memory-mapped) array."""
+    with _lock(symbol, shared=True):
+        cur = _current(symbol, days)
+    if cur is not None:
+        return cur
+    with _lock(symbol):
+        cur = _current(symbol, days)  # another writer may have just refreshed it
+        if cur is not None:
+            return cur
+        cur = _load(symbol)
+        if not _covers(cur, days, symbol):
+            # nothing stored, or not far enough back: one full download
+            span = days if cur is None or cur.shape[1] == 0 else max(days, _today() - int(cur[0, 0]))
+            return _full(symbol, span)
+        last = int(cur[0, -1])
+        final = int(cur[0, -2]) if cur.shape[1] > 1 else last
+        new = _download(symbol, start=date(1970, 1, 1) + timedelta(days=final))
+        if (final != last and new.shape[1] and new[0, 0] == final
+                and abs(new[4, 0] - cur[4, -2]) > _ADJ_TOL * abs(cur[4, -2])):
+            # upstream re-adjusted history (split/dividend): start over
+            return _full(symbol, max(days, _today() - int(cur[0, 0])))
+        # the last stored bar may be a live one: replace it, append the rest
+        tail = new[:, new[0] >= last]
+        keep = cur[:, :-1] if tail.shape[1] and tail[0, 0] == last else cur
+        merged = np.hstack([np.asarray(keep), tail])
+        if merged.shape != cur.shape or not np.array_equal(merged, cur, equal_nan=True):
+            _write(symbol, merged)
+        else:
+            os.utime(_path(symbol))  # checked, nothing new
+        return _load(symbol)
+
+
+def window(symbol: str, days: int, arr: Optional[np.ndarray] = None) -> np.ndarray:
+    """Zero-copy (6, k) view of the bars from the last `days` calendar days."""
+    if arr is None:
+        arr = _load(symbol)
+    if arr is None or arr.shape[1] == 0:
+        return np.empty((6, 0))
+    start = int(np.searchsorted(arr[0], _today() - days, side="left"))
+    return arr[:, start:]
+
+
+def naive(obj):
+    """A yfinance frame or series re-indexed like `history`: tz-naive
+    dates (exchange-local), so it aligns with the stored series."""
+    idx = pd.DatetimeIndex(obj.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    obj = obj.copy(deep=False)
+    obj.index = idx.normalize().rename("Date")
+    return obj
+
+
+def history(symbol: str, days: int) -> pd.DataFrame:
+    """`yf.Ticker(symbol).history(period=f"{days}d")`-shaped frame served
+    from the local store. The OHLCV block is a view of the mapped file."""
+    view = window(symbol, days, refresh(symbol, days))
+    if view.shape[1] == 0:
+        return pd.DataFrame(columns=COLUMNS)
+    index = pd.DatetimeIndex(view[0].astype("datetime64[D]").astype("datetime64[ns]"), name="Date")
+    return pd.DataFrame(view[1:].T, index=index, columns=COLUMNS, copy=False)
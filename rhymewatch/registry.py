@@ -0,0 +1,167 @@
+"""Persisted per-(symbol, window) model registry.
+
+The final model from `predictor.train_and_report` (LightGBM booster text or
+ridge `beta`) is stored together with its `PredictionReport`, the feature
+column list, a schema hash and a hash of the training matrix, keyed by symbol
+and training window in days: the cron's 365-day model and a 180-day request
+for the same symbol are different models and never replace each other.
+Requests load
+the entry and score the newest feature row instead of retraining; the cron
+retrains only when the training data or the feature schema changed.
+
+Entries live on local disk (`RW_MODEL_DIR`, default a tmp dir) and in the
+cache under `rw:model:{symbol}:{days}` so serverless instances that never ran the
+cron can still pick them up. The model text is zlib-compressed in the cache
+copy. Both copies expire after a week; requests score an entry only while
+its training data is unchanged or it is younger than `RW_MODEL_MAX_AGE`
+(default a day), see `is_current`.
+"""
+from __future__ import annotations
+import os
+import json
+import zlib
+import base64
+import hashlib
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import cache, predictor
+
+# Bump when the model family or its hyperparameters change in a way that
+# makes stored models incomparable.
+MODEL_VERSION = 1
+_TTL = 7 * 24 * 3600
+MAX_AGE = float(os.getenv("RW_MODEL_MAX_AGE", str(24 * 3600)))
+
+_DIR = Path(os.getenv("RW_MODEL_DIR", str(Path(tempfile.gettempdir()) / "rhymewatch_models")))
+
+_LOADED: Dict[Tuple[str, int], Tuple[str, Any]] = {}   # (symbol, days) -> (data_hash, model)
+_LOCK = threading.Lock()
+
+
+@dataclass
+class ModelEntry:
+    symbol: str
+    days: int                  # training window the model was fit on
+    kind: str                  # "lightgbm" | "ridge"
+    model: Any                 # booster text or beta list
+    report: Dict[str, Any]     # PredictionReport as a dict
+    feature_cols: List[str]
+    schema_hash: str
+    data_hash: str
+
+    def prediction_report(self) -> predictor.PredictionReport:
+        return predictor.PredictionReport(**self.report)
+
+    def age(self) -> float:
+        """Seconds since the model was trained (inf if unknown)."""
+        try:
+            trained = datetime.fromisoformat(self.report["trained_at"].replace("Z", "+00:00"))
+        except (KeyError, AttributeError, ValueError):
+            return float("inf")
+        return (datetime.now(timezone.utc) - trained).total_seconds()
+
+
+def schema_hash(feature_cols: List[str]) -> str:
+    """Identifies the feature layout + model family a stored model expects."""
+    spec = json.dumps([MODEL_VERSION, list(feature_cols), predictor._LGB_PARAMS,
+                       predictor._N_ROUNDS], sort_keys=True)
+    return hashlib.sha1(spec.encode("utf-8")).hexdigest()[:16]
+
+
+def data_hash(X: np.ndarray, y: np.ndarray) -> str:
+    h = hashlib.sha1()
+    for a in (X, y):
+        a = np.ascontiguousarray(a, dtype=np.float64)
+        h.update(str(a.shape).encode("ascii"))
+        h.update(a.tobytes())
+    return h.hexdigest()[:16]
+
+
+def is_current(entry: ModelEntry, digest: str, max_age: Optional[float] = None) -> bool:
+    """Whether `entry` may be scored for training data hashing to `digest`:
+    the data is unchanged, or the model is younger than `max_age`
+    (default RW_MODEL_MAX_AGE)."""
+    return entry.data_hash == digest or entry.age() < (MAX_AGE if max_age is None else max_age)
+
+
+def _path(symbol: str, days: int) -> Path:
+    return _DIR / f"{symbol}_{days}.json"
+
+
+def save(symbol: str, days: int, model, report: predictor.PredictionReport,
+         feature_cols: List[str], data_digest: str) -> ModelEntry:
+    if isinstance(model, dict):
+        kind, payload = "ridge", np.asarray(model["beta"]).tolist()
+    else:
+        kind, payload = "lightgbm", model.model_to_string()
+    entry = ModelEntry(
+        symbol=symbol, days=days, kind=kind, model=payload, report=asdict(report),
+        feature_cols=list(feature_cols), schema_hash=schema_hash(feature_cols),
+        data_hash=data_digest,
+    )
+    doc = asdict(entry)
+    try:
+        _DIR.mkdir(parents=True, exist_ok=True)
+        tmp = _path(symbol, days).with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(doc))
+        tmp.replace(_path(symbol, days))
+    except OSError as e:
+        print(f"registry: disk write failed for {symbol}: {e}")
+    if kind == "lightgbm":
+        doc["model"] = base64.b64encode(zlib.compress(payload.encode("utf-8"))).decode("ascii")
+        doc["compressed"] = True
+    cache.set(f"rw:model:{symbol}:{days}", doc, ex=_TTL)
+    with _LOCK:
+        _LOADED[(symbol, days)] = (data_digest, model)
+    return entry
+
+
+def load(symbol: str, days: int) -> Optional[ModelEntry]:
+    """Stored entry for `symbol` trained on a `days` window, from disk, else
+    from the cache, else None."""
+    doc = None
+    path = _path(symbol, days)
+    try:
+        if time.time() - path.stat().st_mtime > _TTL:
+            path.unlink()
+        else:
+            doc = json.loads(path.read_text())
+    except (OSError, ValueError):
+        pass
+    if doc is None:
+        doc = cache.get(f"rw:model:{symbol}:{days}")
+        if not isinstance(doc, dict):
+            return None
+        if doc.pop("compressed", False):
+            doc["model"] = zlib.decompress(base64.b64decode(doc["model"])).decode("utf-8")
+    try:
+        return ModelEntry(**doc)
+    except TypeError:
+        return None  # written by an incompatible version
+
+
+def model_of(entry: ModelEntry):
+    """Deserialized model for an entry, memoized per (symbol, days, data hash)."""
+    with _LOCK:
+        hit = _LOADED.get((entry.symbol, entry.days))
+    if hit and hit[0] == entry.data_hash:
+        return hit[1]
+    if entry.kind == "ridge":
+        model = {"beta": np.asarray(entry.model, dtype=np.float64),
+                 "feature_cols": entry.feature_cols}
+    else:
+        lgb = predictor._lightgbm()
+        if lgb is None:
+            raise RuntimeError("lightgbm not installed")
+        model = lgb.Booster(model_str=entry.model)
+    with _LOCK:
+        _LOADED[(entry.symbol, entry.days)] = (entry.data_hash, model)
+    return model
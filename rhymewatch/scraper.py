@@ -3,11 +3,16 @@
 Moved here unchanged in behavior from the old top-level scraper.py, but the
 env file is now `.env` (not `PersonalKeys.env`) so it works in standard
 `python-dotenv` setups.
+
+The three providers are fetched concurrently (`aget_headlines`) on a shared
+`httpx.AsyncClient`; `get_headlines` is the blocking entry point.
 """
 from __future__ import annotations
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import httpx
 import feedparser
@@ -18,13 +23,58 @@ except Exception:
     pass
 
 
+SOURCE_TIMEOUT = float(os.getenv("RW_HEADLINE_SOURCE_TIMEOUT", "10"))
+DEADLINE = float(os.getenv("RW_HEADLINE_DEADLINE", "12"))
+
+
 def get_headlines(symbol: str, days: int = 60) -> List[Tuple[str, datetime]]:
-    out: List[Tuple[str, datetime]] = []
-    for fn in (_finnhub, _google_rss, _newsapi):
-        try:
-            out.extend(fn(symbol, days))
-        except Exception as e:
-            print(f"{fn.__name__}: {e}")
+    """Sync wrapper around `aget_headlines` for the existing callers."""
+    coro = aget_headlines(symbol, days)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Called from inside an event loop: run ours on a helper thread.
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, coro).result()
+
+
+async def aget_headlines(symbol: str, days: int = 60,
+                         source_timeout: float = SOURCE_TIMEOUT,
+                         deadline: float = DEADLINE,
+                         client: Optional[httpx.AsyncClient] = None,
+                         ) -> List[Tuple[str, datetime]]:
+    """Fetch all providers concurrently on one AsyncClient.
+
+    Each source gets `source_timeout` seconds; after `deadline` seconds
+    whatever has arrived is returned and the stragglers are cancelled.
+    """
+    own = client is None
+    if own:
+        client = httpx.AsyncClient(timeout=source_timeout, follow_redirects=True)
+    try:
+        fns = (_finnhub, _google_rss, _newsapi)
+        tasks = {
+            asyncio.ensure_future(asyncio.wait_for(fn(client, symbol, days), source_timeout)): fn
+            for fn in fns
+        }
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for t in pending:
+            t.cancel()
+            print(f"{tasks[t].__name__}: deadline exceeded")
+        out: List[Tuple[str, datetime]] = []
+        for t in tasks:
+            if t not in done:
+                continue
+            try:
+                out.extend(t.result())
+            except asyncio.TimeoutError:
+                print(f"{tasks[t].__name__}: timed out")
+            except Exception as e:
+                print(f"{tasks[t].__name__}: {e}")
+    finally:
+        if own:
+            await client.aclose()
     uniq: dict[str, datetime] = {}
     for t, d in out:
         if t not in uniq:
@@ -32,7 +82,7 @@ def get_headlines(symbol: str, days: int = 60) -> List[Tuple[str, datetime]]:
     return sorted(uniq.items(), key=lambda x: x[1], reverse=True)
 
 
-def _finnhub(symbol: str, days: int) -> List[Tuple[str, datetime]]:
+async def _finnhub(client: httpx.AsyncClient, symbol: str, days: int) -> List[Tuple[str, datetime]]:
     key = os.getenv("FINNHUB_KEY")
     if not key:
         return []
@@ -40,7 +90,7 @@ def _finnhub(symbol: str, days: int) -> List[Tuple[str, datetime]]:
     f = (now - timedelta(days=days)).strftime("%Y-%m-%d")
     t = now.strftime("%Y-%m-%d")
     url = f"https://finnhub.io/api/v1/company-news?symbol={symbol}&from={f}&to={t}&token={key}"
-    r = httpx.get(url, timeout=10)
+    r = await client.get(url)
     r.raise_for_status()
     items = r.json() or []
     return [
@@ -56,10 +106,14 @@ COMPANY = {
 }
 
 
-def _google_rss(symbol: str, days: int) -> List[Tuple[str, datetime]]:
+async def _google_rss(client: httpx.AsyncClient, symbol: str, days: int) -> List[Tuple[str, datetime]]:
     q = COMPANY.get(symbol, symbol) + " stock"
-    url = f"https://news.google.com/rss/search?q={q}&hl=en-US&gl=US&ceid=US:en"
-    feed = feedparser.parse(url)
+    r = await client.get(
+        "https://news.google.com/rss/search",
+        params={"q": q, "hl": "en-US", "gl": "US", "ceid": "US:en"},
+    )
+    r.raise_for_status()
+    feed = feedparser.parse(r.text)
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
     out = []
     for e in feed.entries[:30]:
@@ -72,16 +126,15 @@ def _google_rss(symbol: str, days: int) -> List[Tuple[str, datetime]]:
     return out
 
 
-def _newsapi(symbol: str, days: int) -> List[Tuple[str, datetime]]:
+async def _newsapi(client: httpx.AsyncClient, symbol: str, days: int) -> List[Tuple[str, datetime]]:
     key = os.getenv("NEWSAPI_KEY")
     if not key:
         return []
     f = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
-    r = httpx.get(
+    r = await client.get(
         "https://newsapi.org/v2/everything",
         params={"q": symbol, "from": f, "sortBy": "relevancy",
                 "apiKey": key, "language": "en"},
-        timeout=10,
     )
     if r.status_code == 426:
         return []
@@ -5,13 +5,26 @@
     Tier 2  Gemini Flash-Lite      ~400ms/text   (sarcasm, aspects, multi-ticker)
 
 Each result is cached in Upstash under `rw:sent:{hash(text)}` with a 4-hour TTL.
+`classify_many` runs the cascade batch-wise: one cache pass, a lexicon pass
+over the misses, a single ONNX batch for whatever tier 0 leaves open, then
+batched LLM escalation (`llm.escalate_batch`) for the rest. Each tier is a
+`sentiment.*` metrics span, and results are counted per tier in
+`rw_sentiment_results_total`.
+
+Batches come back as a columnar `SentimentBatch` (label code, confidence and
+tier as NumPy arrays, tier-2 extras in sparse side tables) rather than one
+object per text; `classify_one` still returns a `SentimentResult`.
 """
 from __future__ import annotations
+import os
+import json
 import hashlib
-from dataclasses import dataclass, asdict
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
 
-from . import cache, lexicon, llm
+from . import cache, lexicon, llm, metrics
 
 try:
     from .onnx_sentiment import ONNXSentiment
@@ -19,79 +32,311 @@ try:
 except Exception:
     _HAS_ONNX = False
 
+# label codes in SentimentBatch.label; lexicon's -1/0/1 map onto them with `% 3`
+LABELS = ("neutral", "positive", "negative")
+_CODE = {label: i for i, label in enumerate(LABELS)}
+_LABEL_JSON = tuple('{"label":%s,"confidence":' % json.dumps(label) for label in LABELS)
+_TIER_JSON = tuple(',"tier":%d}' % tier for tier in range(3))
+
 
-@dataclass
 class SentimentResult:
-    label: str              # positive | negative | neutral
-    confidence: float
-    tier: int               # 0, 1, 2
-    aspect: Optional[str] = None
-    targets: Optional[List[str]] = None
-    is_sarcastic: Optional[bool] = None
+    __slots__ = ("label", "confidence", "tier", "aspect", "targets", "is_sarcastic")
+
+    def __init__(self, label: str, confidence: float, tier: int,   # tier 0, 1, 2
+                 aspect: Optional[str] = None, targets: Optional[List[str]] = None,
+                 is_sarcastic: Optional[bool] = None):
+        self.label = label              # positive | negative | neutral
+        self.confidence = confidence
+        self.tier = tier
+        self.aspect = aspect
+        self.targets = targets
+        self.is_sarcastic = is_sarcastic
 
     def to_dict(self) -> dict:
-        return {k: v for k, v in asdict(self).items() if v is not None}
+        d = {"label": self.label, "confidence": self.confidence, "tier": self.tier}
+        if self.aspect is not None:
+            d["aspect"] = self.aspect
+        if self.targets is not None:
+            d["targets"] = self.targets
+        if self.is_sarcastic is not None:
+            d["is_sarcastic"] = self.is_sarcastic
+        return d
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SentimentResult):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    def __repr__(self) -> str:
+        return "SentimentResult(%s)" % ", ".join(
+            f"{a}={getattr(self, a)!r}" for a in self.__slots__)
+
+
+class SentimentBatch:
+    """Results for a batch of texts, in input order, as columns.
+
+    `label` (int8 index into `LABELS`), `confidence` (float64) and `tier`
+    (int8) hold one entry per text. `aspect`, `targets` and `is_sarcastic`
+    only exist for tier-2 rows and are {row: value} side tables. Indexing and
+    iteration produce `SentimentResult`s, so code written against a list of
+    results keeps working.
+    """
+    __slots__ = ("label", "confidence", "tier", "aspect", "targets", "is_sarcastic")
+
+    def __init__(self, label: np.ndarray, confidence: np.ndarray, tier: np.ndarray,
+                 aspect: Optional[Dict[int, str]] = None,
+                 targets: Optional[Dict[int, List[str]]] = None,
+                 is_sarcastic: Optional[Dict[int, bool]] = None):
+        self.label = np.asarray(label, dtype=np.int8)
+        self.confidence = np.asarray(confidence, dtype=np.float64)
+        self.tier = np.asarray(tier, dtype=np.int8)
+        self.aspect = aspect or {}
+        self.targets = targets or {}
+        self.is_sarcastic = is_sarcastic or {}
+
+    @classmethod
+    def empty(cls, n: int = 0) -> "SentimentBatch":
+        return cls(np.zeros(n, np.int8), np.zeros(n), np.zeros(n, np.int8))
+
+    @classmethod
+    def from_results(cls, results: Iterable[SentimentResult]) -> "SentimentBatch":
+        results = list(results)
+        out = cls(np.array([_CODE.get(r.label, 0) for r in results], dtype=np.int8),
+                  np.array([r.confidence for r in results], dtype=np.float64),
+                  np.array([r.tier for r in results], dtype=np.int8))
+        for i, r in enumerate(results):
+            out._set_extras(i, r.aspect, r.targets, r.is_sarcastic)
+        return out
+
+    @classmethod
+    def concat(cls, batches: Sequence["SentimentBatch"]) -> "SentimentBatch":
+        if not batches:
+            return cls.empty()
+        out = cls(np.concatenate([b.label for b in batches]),
+                  np.concatenate([b.confidence for b in batches]),
+                  np.concatenate([b.tier for b in batches]))
+        offset = 0
+        for b in batches:
+            for table, side in ((out.aspect, b.aspect), (out.targets, b.targets),
+                                (out.is_sarcastic, b.is_sarcastic)):
+                table.update((offset + i, v) for i, v in side.items())
+            offset += len(b)
+        return out
+
+    def _set_extras(self, i: int, aspect, targets, is_sarcastic):
+        if aspect is not None:
+            self.aspect[i] = aspect
+        if targets is not None:
+            self.targets[i] = targets
+        if is_sarcastic is not None:
+            self.is_sarcastic[i] = is_sarcastic
+
+    def take(self, rows: np.ndarray) -> "SentimentBatch":
+        """The batch with rows `rows` (in that order, repeats allowed)."""
+        rows = np.asarray(rows, dtype=np.intp)
+        out = SentimentBatch(self.label[rows], self.confidence[rows], self.tier[rows])
+        sparse = set(self.aspect) | set(self.targets) | set(self.is_sarcastic)
+        for src in sparse:
+            for dst in np.flatnonzero(rows == src).tolist():
+                out._set_extras(dst, self.aspect.get(src), self.targets.get(src),
+                                self.is_sarcastic.get(src))
+        return out
+
+    def __len__(self) -> int:
+        return len(self.label)
+
+    def __getitem__(self, i: int) -> SentimentResult:
+        i = range(len(self))[i]
+        return SentimentResult(LABELS[self.label[i]], float(self.confidence[i]),
+                               int(self.tier[i]), self.aspect.get(i),
+                               self.targets.get(i), self.is_sarcastic.get(i))
+
+    def __iter__(self) -> Iterator[SentimentResult]:
+        return (self[i] for i in range(len(self)))
+
+    def labels(self) -> List[str]:
+        return [LABELS[c] for c in self.label.tolist()]
+
+    def counts(self) -> dict:
+        by_label = np.bincount(self.label, minlength=len(LABELS))
+        c = {label: int(n) for label, n in zip(LABELS, by_label)}
+        c["escalations"] = int(np.count_nonzero(self.tier == 2))
+        return c
+
+    def by_date(self, dates: Sequence[Union[datetime, date, str]]) -> List[Dict[str, Any]]:
+        """Per-day label counts, escalations and mean net score (+confidence
+        for positive, -confidence for negative), oldest day first. `dates` is
+        one datetime, date or ISO string per row."""
+        if len(dates) != len(self):
+            raise ValueError(f"{len(dates)} dates for {len(self)} results")
+        if not len(self):
+            return []
+        days = np.array([d.date().isoformat() if isinstance(d, datetime)
+                         else d.isoformat() if isinstance(d, date) else str(d)[:10]
+                         for d in dates])
+        uniq, inv = np.unique(days, return_inverse=True)
+        k = len(uniq)
+        by_label = np.bincount(inv * len(LABELS) + self.label, minlength=k * len(LABELS))
+        by_label = by_label.reshape(k, len(LABELS))
+        esc = np.bincount(inv, weights=self.tier == 2, minlength=k)
+        sign = np.array([0.0, 1.0, -1.0])[self.label]
+        net = np.bincount(inv, weights=sign * self.confidence, minlength=k)
+        n = by_label.sum(axis=1)
+        rows = zip(uniq.tolist(), by_label.tolist(), esc.tolist(), (net / n).tolist(), n.tolist())
+        return [{"date": day, "positive": c[1], "neutral": c[0], "negative": c[2],
+                 "escalations": int(e), "net": round(s, 4), "n": total}
+                for day, c, e, s, total in rows]
+
+    def to_dicts(self) -> List[dict]:
+        return [r.to_dict() for r in self]
+
+    def to_json(self) -> str:
+        """`json.dumps(self.to_dicts(), separators=(",", ":"))` without
+        building the dicts: one C-level dump formats every confidence, rows
+        are spliced from prebuilt label/tier fragments, and only the sparse
+        tier-2 rows get per-row JSON for their extras."""
+        confs = json.dumps(self.confidence.tolist())[1:-1].split(", ") if len(self) else []
+        rows = [_LABEL_JSON[code] + conf + _TIER_JSON[tier]
+                for code, conf, tier in zip(self.label.tolist(), confs, self.tier.tolist())]
+        for i in sorted(set(self.aspect) | set(self.targets) | set(self.is_sarcastic)):
+            extras = "".join(
+                f',"{name}":{json.dumps(table[i], separators=(",", ":"))}'
+                for name, table in (("aspect", self.aspect), ("targets", self.targets),
+                                    ("is_sarcastic", self.is_sarcastic))
+                if table.get(i) is not None)
+            rows[i] = rows[i][:-1] + extras + "}"
+        return "[" + ",".join(rows) + "]"
 
 
 def _key(text: str) -> str:
     return "rw:sent:" + hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:16]
 
 
-def classify_one(text: str, force_escalate: bool = False) -> SentimentResult:
-    cached = cache.get(_key(text))
-    if cached and not force_escalate:
-        return SentimentResult(**cached)
+def preload():
+    """Start loading the tier-1 model in the background, if it's configured."""
+    if not _HAS_ONNX:
+        return None
+    if not (os.getenv("ONNX_SENTIMENT_MODEL_URL") and os.getenv("ONNX_SENTIMENT_TOKENIZER_URL")):
+        return None
+    return ONNXSentiment.preload()
+
+
+def _tickers_in(text: str) -> int:
+    return sum(1 for tok in (text or "").split() if tok.isupper() and 2 <= len(tok) <= 5)
+
+
+def _tier1(texts: List[str]) -> Optional[list]:
+    """One batched ONNX run over `texts`; None when tier 1 is unavailable."""
+    if not _HAS_ONNX or not texts:
+        return None
+    try:
+        out = ONNXSentiment.get().classify(texts)
+    except Exception:
+        return None  # soft-fail to lexicon result
+    return out if len(out) == len(texts) else None
+
+
+def _classify_batch(texts: List[str], force_escalate: bool = False) -> SentimentBatch:
+    """Run the tier cascade over a whole batch.
+
+    Identical texts share one cache key and are classified once: the tiers
+    fill the columns of a batch over the unique texts, which is then
+    gathered back into input order. Every tier works on the rows the
+    previous tier left unresolved, so tier 1 is a single batched ONNX call
+    and tier 2 sees one grouped escalation.
+    """
+    keys = [_key(t) for t in texts]
+    first: Dict[str, int] = {}
+    uniq: List[str] = []
+    for k, t in zip(keys, texts):
+        if k not in first:
+            first[k] = len(uniq)
+            uniq.append(t)
+    n = len(uniq)
+    out = SentimentBatch.empty(n)
+    done = np.zeros(n, dtype=bool)
+
+    # Cache
+    if not force_escalate:
+        with metrics.span("sentiment.cache"):
+            for i, cached in enumerate(cache.get_many(list(first))):
+                if cached:
+                    out.label[i] = _CODE.get(cached.get("label"), 0)
+                    out.confidence[i] = cached.get("confidence", 0.0)
+                    out.tier[i] = cached.get("tier", 0)
+                    out._set_extras(i, cached.get("aspect"), cached.get("targets"),
+                                    cached.get("is_sarcastic"))
+                    done[i] = True
+    n_cached = int(done.sum())
 
     # Tier 0 — regex / lexicon
-    lex = lexicon.lexicon_score(text)
-    if lex.score >= 0.6 and lex.label != "neutral" and not force_escalate:
-        r = SentimentResult(label=lex.label, confidence=lex.score, tier=0)
-        cache.set(_key(text), r.to_dict(), ex=4 * 3600)
-        return r
-
-    # Tier 1 — ONNX
-    tier1_label = lex.label
-    tier1_conf = lex.score
-    if _HAS_ONNX:
-        try:
-            m = ONNXSentiment.get()
-            batch = m.classify([text])
-            if batch:
-                tier1_label = batch[0].label
-                tier1_conf = batch[0].score
-        except Exception:
-            pass  # soft-fail to lexicon result
-
-    n_tickers = sum(1 for tok in (text or "").split() if tok.isupper() and 2 <= len(tok) <= 5)
-
-    # Tier 2 — LLM escalation
-    if force_escalate or llm.needs_escalation(text, tier1_conf, n_tickers):
-        aspect = llm.escalate(text)
+    misses = np.flatnonzero(~done)
+    with metrics.span("sentiment.tier0"):
+        scored = lexicon.lexicon_score_batch([uniq[i] for i in misses.tolist()])
+        lex_label = scored.label % 3
+        out.label[misses] = lex_label
+        out.confidence[misses] = scored.score
+        if force_escalate:
+            pending = misses
+        else:
+            strong = (scored.score >= 0.6) & (lex_label != _CODE["neutral"])
+            pending = misses[~strong]
+
+    # Tier 1 — ONNX, one batch for everything tier 0 didn't settle;
+    # lexicon label/score stay as the fallback
+    if len(pending):
+        out.tier[pending] = 1
+        with metrics.span("sentiment.tier1"):
+            onnx = _tier1([uniq[i] for i in pending.tolist()])
+        if onnx:
+            for i, o in zip(pending.tolist(), onnx):
+                out.label[i] = _CODE.get(o.label, 0)
+                out.confidence[i] = o.score
+
+    # Tier 2 — LLM escalation, grouped
+    escalate = [
+        i for i in pending.tolist()
+        if force_escalate or llm.needs_escalation(uniq[i], float(out.confidence[i]),
+                                                  _tickers_in(uniq[i]))
+    ]
+    aspects = []
+    if escalate:
+        metrics.inc("rw_sentiment_escalations_total", len(escalate))
+        with metrics.span("sentiment.tier2"):
+            aspects = llm.escalate_batch([uniq[i] for i in escalate])
+    for i, aspect in zip(escalate, aspects):
         if aspect:
-            r = SentimentResult(
-                label=aspect.sentiment,
-                confidence=aspect.confidence,
-                tier=2,
-                aspect=aspect.aspect,
-                targets=aspect.targets,
-                is_sarcastic=aspect.is_sarcastic,
-            )
-            cache.set(_key(text), r.to_dict(), ex=4 * 3600)
-            return r
-
-    r = SentimentResult(label=tier1_label, confidence=tier1_conf, tier=1)
-    cache.set(_key(text), r.to_dict(), ex=4 * 3600)
-    return r
-
-
-def classify_many(texts: List[str]) -> List[SentimentResult]:
-    return [classify_one(t) for t in texts]
-
-
-def counts(results: List[SentimentResult]) -> dict:
-    c = {"positive": 0, "neutral": 0, "negative": 0, "escalations": 0}
-    for r in results:
-        c[r.label] = c.get(r.label, 0) + 1
-        if r.tier == 2:
-            c["escalations"] += 1
-    return c
+            out.label[i] = _CODE.get(aspect.sentiment, 0)
+            out.confidence[i] = aspect.confidence
+            out.tier[i] = 2
+            out._set_extras(i, aspect.aspect, aspect.targets, aspect.is_sarcastic)
+
+    if metrics.ENABLED:
+        metrics.inc("rw_sentiment_results_total", n_cached, tier="cache")
+        by_tier = np.bincount(out.tier[misses], minlength=3)
+        for tier in (0, 1, 2):
+            metrics.inc("rw_sentiment_results_total", int(by_tier[tier]), tier=str(tier))
+    if len(misses):
+        ukeys = list(first)
+        cache.set_many(dict(zip([ukeys[i] for i in misses.tolist()], out.take(misses).to_dicts())),
+                       ex=4 * 3600)
+    if n == len(texts):
+        return out
+    return out.take(np.fromiter((first[k] for k in keys), dtype=np.intp, count=len(keys)))
+
+
+def classify_one(text: str, force_escalate: bool = False) -> SentimentResult:
+    return _classify_batch([text], force_escalate=force_escalate)[0]
+
+
+def classify_many(texts: List[str], force_escalate: bool = False) -> SentimentBatch:
+    """Classify a batch of texts; results come back in input order."""
+    return _classify_batch(list(texts), force_escalate=force_escalate)
+
+
+def as_batch(results: Union[SentimentBatch, Iterable[SentimentResult]]) -> SentimentBatch:
+    return results if isinstance(results, SentimentBatch) else SentimentBatch.from_results(results)
+
+
+def counts(results: Union[SentimentBatch, Iterable[SentimentResult]]) -> dict:
+    return as_batch(results).counts()
@@ -5,9 +5,13 @@ on time-series data inflates reported accuracy by 5–15pp vs. honest out-of-
 sample evaluation.
 """
 from __future__ import annotations
-from typing import Iterator, Tuple, Callable, List
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterator, Tuple, Callable, List, Optional
 import numpy as np
 
+DEFAULT_WORKERS = int(os.getenv("RW_CV_WORKERS", "1"))
+
 
 def walk_forward(n: int, initial: int = 1000, step: int = 21,
                  embargo: int = 5) -> Iterator[Tuple[range, range]]:
@@ -60,19 +64,62 @@ def sharpe_net(y_true: np.ndarray, y_pred: np.ndarray,
 
 def cross_validate(X: np.ndarray, y: np.ndarray,
                    fit_predict: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray],
-                   initial: int = 1000, step: int = 21, embargo: int = 5) -> dict:
+                   initial: int = 1000, step: int = 21, embargo: int = 5,
+                   workers: Optional[int] = None, executor: str = "thread") -> dict:
     """Generic walk-forward driver. `fit_predict(X_train, y_train, X_test)`
-    returns predictions for X_test. Returns aggregated metrics."""
-    preds: List[float] = []
-    trues: List[float] = []
-    for tr, te in walk_forward(len(X), initial, step, embargo):
-        if len(tr) == 0:
+    returns predictions for X_test. Returns aggregated metrics.
+
+    Folds are independent, so with `workers > 1` (default RW_CV_WORKERS)
+    they run on a thread or process pool (`executor`). Every fold writes
+    into its own slot, so the result is identical to the serial path.
+    Windows are contiguous, so folds get slice views, not copies.
+    """
+    if workers is None:
+        workers = DEFAULT_WORKERS
+    folds = fold_slices(len(X), initial, step, embargo)
+    if workers > 1 and len(folds) > 1:
+        pool_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+        with pool_cls(max_workers=min(workers, len(folds))) as pool:
+            futures = [pool.submit(fit_predict, X[tr], y[tr], X[te]) for tr, te in folds]
+            fold_preds = [np.asarray(f.result()) for f in futures]
+    else:
+        fold_preds = [np.asarray(fit_predict(X[tr], y[tr], X[te])) for tr, te in folds]
+    return fold_metrics([y[te] for _, te in folds], fold_preds)
+
+
+def fold_slices(n: int, initial: int = 1000, step: int = 21,
+                embargo: int = 5) -> List[Tuple[slice, slice]]:
+    """`walk_forward` as contiguous slices, skipping empty training windows."""
+    return [(slice(tr.start, tr.stop), slice(te.start, te.stop))
+            for tr, te in walk_forward(n, initial, step, embargo) if len(tr)]
+
+
+def date_fold_slices(dates: np.ndarray, initial: int = 1000, step: int = 21,
+                     embargo: int = 5) -> List[Tuple[slice, slice]]:
+    """Walk-forward folds over a panel whose rows are sorted by date.
+
+    `initial`, `step` and `embargo` count trading dates, not rows, so every
+    ticker's rows for a date land on the same side of a split.
+    """
+    days = np.unique(dates)
+    out = []
+    for tr, te in walk_forward(len(days), initial, step, embargo):
+        if not len(tr):
             continue
-        p = fit_predict(X[list(tr)], y[list(tr)], X[list(te)])
-        preds.extend(p.tolist())
-        trues.extend(y[list(te)].tolist())
-    preds_a = np.asarray(preds)
-    trues_a = np.asarray(trues)
+        train_end = int(np.searchsorted(dates, days[tr.stop - 1], side="right"))
+        test_start = int(np.searchsorted(dates, days[te.start], side="left"))
+        test_end = int(np.searchsorted(dates, days[te.stop - 1], side="right"))
+        out.append((slice(0, train_end), slice(test_start, test_end)))
+    return out
+
+
+def fold_metrics(trues: List[np.ndarray], preds: List[np.ndarray]) -> dict:
+    """Aggregate per-fold (truth, prediction) arrays into the reported metrics."""
+    if trues:
+        trues_a = np.concatenate(trues).astype(np.float64)
+        preds_a = np.concatenate(preds).astype(np.float64)
+    else:
+        preds_a = trues_a = np.asarray([], dtype=np.float64)
     return {
         "mae": mae(trues_a, preds_a),
         "directional_accuracy": directional_accuracy(trues_a, preds_a),